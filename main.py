@@ -11,15 +11,21 @@ from aiogram.webhook.aiohttp_server import (
 )
 
 from src import config
-from src.common import bot
-from src.database import Database, schedule_backup
+from src.broadcasts import broadcast_manager
+from src.common import bot, redis
+from src.compute_pool import compute_pool
+from src.database import AsyncDatabase, Database, schedule_backup
+from src.database.database import async_engine
+from src.image_processing.generate_images import preload_assets
 from src.keyboard_manager import KeyboardManager
 from src.middlewares import (
     AddDataInRedis,
     ClearKeyboardFromMessageMiddleware,
     DeleteMessagesMiddleware,
+    LastSeenMiddleware,
     MediaGroupMiddleware,
     NullMiddleware,
+    SessionMiddleware,
     SkipGroupsUpdates
 )
 from src.routers import admin_router, user_router
@@ -49,8 +55,15 @@ async def on_startup(bot: Bot, scheduler: EveryDayPredictionScheduler) -> None:
         allowed_updates=['message', 'callback_query'],
         drop_pending_updates=True
     )
+    compute_pool.start()
+    preload_assets()
     scheduler.start()
+    await scheduler.add_void_of_course_job()
+    await scheduler.add_prerender_job()
+    await scheduler.add_dispatch_job()
+    await scheduler.add_reconcile_job()
     asyncio.create_task(scheduler.check_users_and_schedule())
+    await broadcast_manager.resume_all()
 
     if DO_BACKUP:
         asyncio.create_task(schedule_backup(bot))
@@ -62,6 +75,10 @@ async def on_shutdown(bot: Bot, scheduler: EveryDayPredictionScheduler):
     if scheduler.running:
         scheduler.shutdown(wait=False)
 
+    broadcast_manager.shutdown()
+    compute_pool.shutdown(wait=False)
+    await async_engine.dispose()
+
     # aiogram's setup_application only emits the dispatcher shutdown; it does
     # not close the bot's aiohttp session. Close it explicitly to avoid the
     # "Unclosed client session"/"Unclosed connector" warnings on exit.
@@ -72,23 +89,31 @@ def main():
     scheduler = EveryDayPredictionScheduler()
 
     dp = Dispatcher(
-        storage=RedisStorage.from_url('redis://localhost:6379'),
+        storage=RedisStorage(redis),
         database=Database,
+        async_database=AsyncDatabase,
         keyboards=KeyboardManager(Database),
         scheduler=scheduler
     )
 
+    last_seen_middleware = LastSeenMiddleware()
+
+    # Update: одна единица работы с базой на всё обновление
+    dp.update.outer_middleware(SessionMiddleware())
+
     # Message
     dp.message.middleware(MediaGroupMiddleware())
     dp.message.middleware(SkipGroupsUpdates())
     dp.message.middleware(DeleteMessagesMiddleware())
     dp.message.middleware(AddDataInRedis())
+    dp.message.middleware(last_seen_middleware)
 
     # Callback
     dp.callback_query.middleware(NullMiddleware())
     dp.callback_query.middleware(DeleteMessagesMiddleware())
     dp.callback_query.middleware(ClearKeyboardFromMessageMiddleware())
     dp.callback_query.middleware(AddDataInRedis())
+    dp.callback_query.middleware(last_seen_middleware)
 
     # Include routers
     dp.include_routers(user_router, admin_router)
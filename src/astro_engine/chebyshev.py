@@ -0,0 +1,272 @@
+"""
+Эфемериды планет в виде отрезков многочленов Чебышёва.
+
+Сборка (python -m src.astro_engine.chebyshev) вписывает многочлены в
+долготу, широту и расстояние каждой планеты по swe.calc на заданном
+промежутке лет и пишет их в cache/. Файл открывается через np.memmap,
+поэтому процессы пула вычислений делят одни и те же страницы памяти,
+а вычисление векторизуется по любому числу моментов.
+"""
+import json
+import logging
+import os
+
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import swisseph as swe
+
+from numpy.polynomial import chebyshev
+
+from src import config
+from src.enums import SwissEphPlanet
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_FILE_PATH = "cache/chebyshev_ephemeris.npy"
+DEFAULT_START_YEAR = 1930
+DEFAULT_END_YEAR = 2060
+# Допустимое отклонение от swe.calc по долготе и широте, градусы. Без
+# файлов .se1 swe.calc считает по теории Мошье, в которой у планет есть
+# скачки до ~3e-4°, поэтому точнее 1e-3° в общем случае не вписать.
+# С файлами Swiss Ephemeris достижимо 1e-6°. Орбис аспектов - 0.1°.
+DEFAULT_TOLERANCE = 1e-3
+
+DEGREE = 12
+# Начальная длина отрезка в сутках, при превышении допуска делится пополам.
+# Даже у медленных планет видимая долгота содержит нутацию с периодами
+# 9-14 суток, поэтому отрезки длиннее 16 суток не укладываются в допуск.
+SEGMENT_DAYS = {
+    SwissEphPlanet.SUN: 16,
+    SwissEphPlanet.MOON: 4,
+    SwissEphPlanet.MERCURY: 16,
+    SwissEphPlanet.VENUS: 16,
+    SwissEphPlanet.MARS: 16,
+    SwissEphPlanet.JUPITER: 16,
+    SwissEphPlanet.SATURN: 16,
+    SwissEphPlanet.URANUS: 16,
+    SwissEphPlanet.NEPTUNE: 16,
+    SwissEphPlanet.PLUTO: 16,
+}
+MIN_SEGMENT_DAYS = 0.5
+
+FLAGS = swe.FLG_SWIEPH + swe.FLG_SPEED
+
+
+def _get_setting(key: str, default):
+    try:
+        return config.get(f"ephemeris.{key}")
+    except KeyError:
+        return default
+
+
+def _get_metadata_path(file_path: str) -> str:
+    return os.path.splitext(file_path)[0] + ".json"
+
+
+def _calc(juliday: float, planet: int) -> Tuple[float, ...]:
+    return swe.calc(juliday, planet, FLAGS)[0]
+
+
+def _fit_segment(
+    planet: int,
+    segment_start: float,
+    segment_days: float
+) -> np.ndarray:
+    """Коэффициенты (координата, степень) на одном отрезке."""
+    nodes = chebyshev.chebpts1(DEGREE + 1)
+    julidays = segment_start + (nodes + 1) * segment_days / 2
+
+    values = np.array([_calc(juliday, planet)[:3] for juliday in julidays])
+    # Долгота непрерывна внутри отрезка, переход через 0° Овна убираем
+    values[:, 0] = np.unwrap(values[:, 0], period=360)
+
+    return chebyshev.chebfit(nodes, values, DEGREE).T
+
+
+def _segment_error(
+    planet: int,
+    coefficients: np.ndarray,
+    segment_start: float,
+    segment_days: float
+) -> float:
+    """Максимальное отклонение долготы и широты между узлами отрезка."""
+    x = np.linspace(-0.95, 0.95, 7)
+    error = 0.0
+    for point in x:
+        expected = _calc(segment_start + (point + 1) * segment_days / 2, planet)
+        longitude, latitude = (
+            chebyshev.chebval(point, coefficients[0]),
+            chebyshev.chebval(point, coefficients[1])
+        )
+        error = max(
+            error,
+            abs((longitude - expected[0] + 180) % 360 - 180),
+            abs(latitude - expected[1])
+        )
+    return error
+
+
+def build(
+    file_path: str = DEFAULT_FILE_PATH,
+    start_year: int = DEFAULT_START_YEAR,
+    end_year: int = DEFAULT_END_YEAR,
+    tolerance: float = DEFAULT_TOLERANCE
+):
+    """
+    Строит файл эфемерид на годы [start_year, end_year). Рядом с ним
+    пишется .json с раскладкой отрезков по планетам.
+    """
+    start_juliday = swe.julday(start_year, 1, 1, 0)
+    end_juliday = swe.julday(end_year, 1, 1, 0)
+
+    blocks = []
+    planets_metadata = {}
+    offset = 0
+    for planet in SwissEphPlanet:
+        segment_days = SEGMENT_DAYS[planet]
+        while True:
+            segments_count = int(
+                np.ceil((end_juliday - start_juliday) / segment_days)
+            )
+            block = np.empty((segments_count, 3, DEGREE + 1))
+            max_error = 0.0
+            for index in range(segments_count):
+                segment_start = start_juliday + index * segment_days
+                block[index] = _fit_segment(planet, segment_start, segment_days)
+                max_error = max(
+                    max_error,
+                    _segment_error(
+                        planet,
+                        block[index],
+                        segment_start,
+                        segment_days
+                    )
+                )
+
+            if max_error <= tolerance:
+                break
+
+            if segment_days / 2 < MIN_SEGMENT_DAYS:
+                raise ValueError(
+                    f"{planet.name}: tolerance {tolerance} is unreachable, "
+                    f"error {max_error:.2e} with {segment_days} days segments"
+                )
+
+            LOGGER.info(
+                f"{planet.name}: error {max_error:.2e} with "
+                f"{segment_days} days segments, splitting"
+            )
+            segment_days /= 2
+
+        LOGGER.info(
+            f"{planet.name}: {segments_count} segments of {segment_days} days, "
+            f"max error {max_error:.2e}°"
+        )
+        blocks.append(block)
+        planets_metadata[int(planet)] = {
+            "offset": offset,
+            "segments": segments_count,
+            "segment_days": segment_days,
+        }
+        offset += segments_count
+
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    np.save(file_path, np.concatenate(blocks))
+    with open(_get_metadata_path(file_path), "w") as file:
+        json.dump(
+            {
+                "start_juliday": start_juliday,
+                "end_juliday": end_juliday,
+                "degree": DEGREE,
+                "tolerance": tolerance,
+                "planets": planets_metadata,
+            },
+            file,
+            indent=2
+        )
+
+
+@lru_cache(maxsize=None)
+def load(file_path: str = DEFAULT_FILE_PATH) -> Tuple[np.ndarray, Dict]:
+    """Открывает файл эфемерид через memmap (без чтения в память)."""
+    with open(_get_metadata_path(file_path)) as file:
+        metadata = json.load(file)
+    metadata["planets"] = {
+        int(planet): planet_metadata
+        for planet, planet_metadata in metadata["planets"].items()
+    }
+    return np.load(file_path, mmap_mode="r"), metadata
+
+
+def evaluate(
+    planet: int,
+    julidays: np.ndarray,
+    file_path: str = DEFAULT_FILE_PATH
+) -> np.ndarray:
+    """
+    Координаты планеты в моменты julidays (шкала как у swe.calc): массив
+    формы (момент, 6) - долгота, широта, расстояние и их скорости в сутки,
+    в том же порядке, что и у swe.calc.
+    """
+    data, metadata = load(file_path)
+    planet_metadata = metadata["planets"][int(planet)]
+    segment_days = planet_metadata["segment_days"]
+
+    julidays = np.asarray(julidays, dtype=float)
+    offsets = (julidays - metadata["start_juliday"]) / segment_days
+    if np.any(offsets < 0) or np.any(julidays >= metadata["end_juliday"]):
+        raise ValueError("Moment is out of the Chebyshev ephemeris span")
+
+    segments = offsets.astype(int)
+    x = 2 * (offsets - segments) - 1
+    # (момент, координата, степень)
+    coefficients = np.asarray(data[planet_metadata["offset"] + segments])
+    derivatives = chebyshev.chebder(coefficients, axis=-1) * 2 / segment_days
+
+    result = np.empty(julidays.shape + (6,))
+    result[..., :3] = _clenshaw(coefficients, x)
+    result[..., 3:] = _clenshaw(derivatives, x)
+    result[..., 0] %= 360
+    return result
+
+
+def _clenshaw(coefficients: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Значения рядов Чебышёва (момент, координата) в точках x."""
+    x = x[..., None]
+    b1 = np.zeros(coefficients.shape[:-1])
+    b2 = np.zeros(coefficients.shape[:-1])
+    for index in range(coefficients.shape[-1] - 1, 0, -1):
+        b1, b2 = 2 * x * b1 - b2 + coefficients[..., index], b1
+    return x * b1 - b2 + coefficients[..., 0]
+
+
+def get_file_path() -> Optional[str]:
+    """
+    Путь к файлу эфемерид, если в конфиге включён бэкенд chebyshev
+    и файл собран.
+    """
+    if _get_setting("backend", "swisseph") != "chebyshev":
+        return None
+
+    file_path = _get_setting("chebyshev_file", DEFAULT_FILE_PATH)
+    if not os.path.exists(file_path):
+        LOGGER.warning(
+            f"Chebyshev ephemeris {file_path} is not built, using swisseph. "
+            "Run: python -m src.astro_engine.chebyshev"
+        )
+        return None
+
+    return file_path
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    build(
+        file_path=_get_setting("chebyshev_file", DEFAULT_FILE_PATH),
+        start_year=_get_setting("start_year", DEFAULT_START_YEAR),
+        end_year=_get_setting("end_year", DEFAULT_END_YEAR),
+        tolerance=_get_setting("tolerance", DEFAULT_TOLERANCE)
+    )
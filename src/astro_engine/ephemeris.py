@@ -0,0 +1,204 @@
+"""
+Общая для всех пользователей сетка эфемерид транзитных планет.
+
+Долготы транзитных планет в момент времени не зависят от пользователя,
+поэтому считаются один раз на процесс: для каждых UTC-суток лениво
+строится сетка долгот и скоростей с шагом GRID_STEP, последние сутки
+хранятся в LRU-кэше. Между узлами сетки положение восстанавливается
+кубическим интерполянтом Эрмита по долготам и скоростям.
+
+С бэкендом chebyshev (см. chebyshev.py) узлы суток считаются одним
+векторным вычислением на планету вместо swe.calc_ut на каждый узел.
+"""
+from functools import lru_cache
+from math import floor
+from typing import List, Tuple
+
+import numpy as np
+import swisseph as swe
+
+from src.enums import SwissEphPlanet
+
+from . import chebyshev
+
+
+TRANSIT_PLANETS = [
+    SwissEphPlanet.SUN,
+    SwissEphPlanet.MOON,
+    SwissEphPlanet.MERCURY,
+    SwissEphPlanet.VENUS,
+    SwissEphPlanet.MARS
+]
+
+# Шаг сетки в сутках. Погрешность интерполяции Эрмита для Луны при
+# двухчасовом шаге ~2e-6°, что на порядки меньше орбиса. Луна за 2 часа
+# проходит ~1.1°, а соседние точки аспектов к одной натальной планете
+# разнесены минимум на 30°, поэтому на одном интервале сетки не бывает
+# двух пересечений.
+GRID_STEP = 1 / 12
+SAMPLES_PER_DAY = 12
+
+# Больше года суток - хватает на подбор дней до конца подписки
+DAYS_CACHE_SIZE = 1024
+
+PLANET_INDEX = {planet: index for index, planet in enumerate(TRANSIT_PLANETS)}
+
+FLAGS = swe.FLG_SWIEPH | swe.FLG_SPEED
+
+# Файл эфемерид Чебышёва, если он включён в конфиге и собран
+CHEBYSHEV_FILE_PATH = chebyshev.get_file_path()
+
+
+def get_day_number(juliday: float) -> int:
+    """Номер UTC-суток: юлианские сутки начинаются в полдень."""
+    return floor(juliday + 0.5)
+
+
+def get_day_start(day_number: int) -> float:
+    return day_number - 0.5
+
+
+@lru_cache(maxsize=DAYS_CACHE_SIZE)
+def get_day_grid(day_number: int) -> np.ndarray:
+    """
+    Сетка на UTC-сутки: массив формы (планета, узел, [долгота, скорость]),
+    узлы от начала суток до начала следующих включительно.
+    """
+    julidays = get_day_start(day_number) + np.arange(
+        SAMPLES_PER_DAY + 1
+    ) * GRID_STEP
+
+    grid = None
+    if CHEBYSHEV_FILE_PATH is not None:
+        try:
+            grid = _calculate_grid_chebyshev(julidays, CHEBYSHEV_FILE_PATH)
+        except ValueError:
+            # Сутки вне промежутка файла
+            pass
+
+    if grid is None:
+        grid = _calculate_grid_swisseph(julidays)
+
+    grid.setflags(write=False)
+    return grid
+
+
+def _calculate_grid_swisseph(julidays: np.ndarray) -> np.ndarray:
+    grid = np.empty((len(TRANSIT_PLANETS), len(julidays), 2))
+
+    for planet_index, planet in enumerate(TRANSIT_PLANETS):
+        for node, juliday in enumerate(julidays):
+            data = swe.calc_ut(juliday, planet, FLAGS)[0]
+            grid[planet_index, node] = data[0], data[3]
+
+    return grid
+
+
+def _calculate_grid_chebyshev(
+    julidays: np.ndarray,
+    file_path: str
+) -> np.ndarray:
+    # Файл построен по swe.calc, то есть в эфемеридном времени
+    ephemeris_julidays = julidays + np.array(
+        [swe.deltat(juliday) for juliday in julidays]
+    )
+    grid = np.empty((len(TRANSIT_PLANETS), len(julidays), 2))
+
+    for planet_index, planet in enumerate(TRANSIT_PLANETS):
+        data = chebyshev.evaluate(planet, ephemeris_julidays, file_path)
+        grid[planet_index, :, 0] = data[:, 0]
+        grid[planet_index, :, 1] = data[:, 3]
+
+    return grid
+
+
+def _get_node(planet: int, day_number: int, node: int) -> Tuple[float, float]:
+    day_number += node // SAMPLES_PER_DAY
+    node %= SAMPLES_PER_DAY
+    longitude, speed = get_day_grid(day_number)[PLANET_INDEX[planet], node]
+    return float(longitude), float(speed)
+
+
+def get_transit_position(planet: int, juliday: float) -> Tuple[float, float]:
+    """Долгота (градусы) и скорость (градусы в сутки) транзитной планеты."""
+    day_number = get_day_number(juliday)
+    offset = (juliday - get_day_start(day_number)) / GRID_STEP
+    node = min(int(offset), SAMPLES_PER_DAY - 1)
+    t = offset - node
+
+    left_position, left_speed = _get_node(planet, day_number, node)
+    right_position, right_speed = _get_node(planet, day_number, node + 1)
+
+    # Переход через 0° Овна
+    right_position = left_position + (
+        (right_position - left_position + 180) % 360 - 180
+    )
+
+    h00 = 2 * t ** 3 - 3 * t ** 2 + 1
+    h10 = t ** 3 - 2 * t ** 2 + t
+    h01 = -2 * t ** 3 + 3 * t ** 2
+    h11 = t ** 3 - t ** 2
+    position = (
+        h00 * left_position
+        + h10 * GRID_STEP * left_speed
+        + h01 * right_position
+        + h11 * GRID_STEP * right_speed
+    )
+
+    d00 = 6 * t ** 2 - 6 * t
+    d10 = 3 * t ** 2 - 4 * t + 1
+    d01 = -6 * t ** 2 + 6 * t
+    d11 = 3 * t ** 2 - 2 * t
+    speed = (
+        d00 * left_position / GRID_STEP
+        + d10 * left_speed
+        + d01 * right_position / GRID_STEP
+        + d11 * right_speed
+    )
+
+    return position % 360, speed
+
+
+def get_transit_samples(
+    planet: int,
+    start_juliday: float,
+    finish_juliday: float
+) -> List[Tuple[float, float, float]]:
+    """
+    Узлы сетки (юлианская дата, долгота, скорость) внутри периода плюс
+    по одному узлу за каждой границей. Сами границы периода тоже входят
+    в список, их значения интерполируются.
+    """
+    start_day = get_day_number(start_juliday)
+    day_start = get_day_start(start_day)
+
+    # Последний узел строго до начала периода
+    node = floor((start_juliday - day_start) / GRID_STEP)
+    if day_start + node * GRID_STEP >= start_juliday:
+        node -= 1
+
+    samples = [
+        (day_start + node * GRID_STEP, *_get_node(planet, start_day, node)),
+        (start_juliday, *get_transit_position(planet, start_juliday)),
+    ]
+
+    node += 1
+    juliday = day_start + node * GRID_STEP
+    while juliday < finish_juliday:
+        if juliday > start_juliday:
+            samples.append((juliday, *_get_node(planet, start_day, node)))
+        node += 1
+        juliday = day_start + node * GRID_STEP
+
+    if finish_juliday > start_juliday:
+        samples.append(
+            (finish_juliday, *get_transit_position(planet, finish_juliday))
+        )
+
+    # Первый узел строго после конца периода
+    if juliday <= finish_juliday:
+        node += 1
+        juliday = day_start + node * GRID_STEP
+    samples.append((juliday, *_get_node(planet, start_day, node)))
+
+    return samples
@@ -0,0 +1,278 @@
+"""
+Календарь ингрессий - моментов перехода планет из знака в знак.
+
+Координаты геоцентрические, поэтому ингрессии одни для всех
+пользователей. Они решаются один раз методом Брента с точностью до
+долей секунды на промежуток лет вперёд и сохраняются в cache/, а знак
+планеты и границы её пребывания в знаке ищутся бинарным поиском по
+списку ингрессий без обращения к эфемеридам.
+"""
+import bisect
+import logging
+import os
+import threading
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import swisseph as swe
+
+from src.enums import SwissEphPlanet
+
+from .utils import calculate_planet_degrees_ut, find_root, wrap_degrees
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_FILE_PATH = "cache/ingress_calendar.npz"
+# Календарь строится с начала года запроса на столько лет вперёд
+YEARS_AHEAD = 5
+# Запас вокруг запрошенного момента, который календарь должен покрывать:
+# Луна проходит знак за 2.5 суток, так что месяца хватает с избытком
+COVERAGE_MARGIN_DAYS = 30
+# Точность момента ингрессии в сутках (~0.01 с)
+TOLERANCE = 1e-7
+
+# Шаг поиска смены знака в сутках. На шаге планета проходит заметно
+# меньше знака, а попятные Меркурий, Венера и Марс не успевают пересечь
+# границу дважды.
+STEP_DAYS = {
+    SwissEphPlanet.SUN: 1,
+    SwissEphPlanet.MOON: 0.25,
+    SwissEphPlanet.MERCURY: 0.5,
+    SwissEphPlanet.VENUS: 0.5,
+    SwissEphPlanet.MARS: 0.5,
+    SwissEphPlanet.JUPITER: 1,
+    SwissEphPlanet.SATURN: 1,
+    SwissEphPlanet.URANUS: 1,
+    SwissEphPlanet.NEPTUNE: 1,
+    SwissEphPlanet.PLUTO: 1,
+}
+
+
+def get_sign_index(degrees: float) -> int:
+    """Номер знака зодиака от Овна (0) до Рыб (11)."""
+    return int(degrees // 30) % 12
+
+
+def _get_year_start(juliday: float, years: int = 0) -> float:
+    year = swe.revjul(juliday)[0]
+    return swe.julday(year + years, 1, 1, 0)
+
+
+def solve_ingresses(
+    planet: SwissEphPlanet,
+    start_juliday: float,
+    end_juliday: float
+) -> Tuple[List[float], List[int]]:
+    """
+    Ингрессии планеты в промежутке [start_juliday, end_juliday): моменты
+    и номера знаков, в которые планета входит (при попятном движении -
+    предыдущий знак).
+    """
+    def longitude(juliday: float) -> float:
+        return calculate_planet_degrees_ut(juliday, planet)
+
+    step = STEP_DAYS[planet]
+    julidays = []
+    signs = []
+
+    left = start_juliday
+    left_sign = get_sign_index(longitude(left))
+    while left < end_juliday:
+        right = min(left + step, end_juliday)
+        right_sign = get_sign_index(longitude(right))
+
+        if right_sign != left_sign:
+            forward = (right_sign - left_sign) % 12 == 1
+            boundary = 30 * (right_sign if forward else left_sign)
+
+            def distance(juliday: float) -> float:
+                return wrap_degrees(longitude(juliday) - boundary)
+
+            julidays.append(
+                find_root(
+                    distance,
+                    left,
+                    right,
+                    distance(left),
+                    distance(right),
+                    TOLERANCE
+                )
+            )
+            signs.append(right_sign)
+
+        left, left_sign = right, right_sign
+
+    return julidays, signs
+
+
+class IngressCalendar:
+    """
+    Ингрессии всех планет на общий промежуток [start_juliday, end_juliday).
+    Если запрошенный момент выходит за промежуток, календарь досчитывает
+    недостающие годы и перезаписывает файл.
+    """
+
+    def __init__(self, file_path: str = DEFAULT_FILE_PATH):
+        self.file_path = file_path
+
+        self.start_juliday: Optional[float] = None
+        self.end_juliday: Optional[float] = None
+        # Знак на начало промежутка, моменты ингрессий и знаки после них
+        self._initial_signs: Dict[int, int] = {}
+        self._julidays: Dict[int, List[float]] = {}
+        self._signs: Dict[int, List[int]] = {}
+
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _covers(self, start_juliday: float, end_juliday: float) -> bool:
+        return (
+            self.start_juliday is not None
+            and self.start_juliday <= start_juliday
+            and end_juliday <= self.end_juliday
+        )
+
+    def _ensure(self, juliday: float):
+        start_juliday = juliday - COVERAGE_MARGIN_DAYS
+        end_juliday = juliday + COVERAGE_MARGIN_DAYS
+        if self._covers(start_juliday, end_juliday):
+            return
+
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+            if self._covers(start_juliday, end_juliday):
+                return
+
+            self._extend(
+                _get_year_start(start_juliday),
+                _get_year_start(end_juliday, YEARS_AHEAD)
+            )
+            self._save()
+
+    def _extend(self, start_juliday: float, end_juliday: float):
+        if self.start_juliday is None:
+            self.start_juliday = self.end_juliday = start_juliday
+            for planet in SwissEphPlanet:
+                self._initial_signs[planet] = get_sign_index(
+                    calculate_planet_degrees_ut(start_juliday, planet)
+                )
+                self._julidays[planet] = []
+                self._signs[planet] = []
+
+        for planet in SwissEphPlanet:
+            if start_juliday < self.start_juliday:
+                julidays, signs = solve_ingresses(
+                    planet,
+                    start_juliday,
+                    self.start_juliday
+                )
+                self._initial_signs[planet] = get_sign_index(
+                    calculate_planet_degrees_ut(start_juliday, planet)
+                )
+                self._julidays[planet] = julidays + self._julidays[planet]
+                self._signs[planet] = signs + self._signs[planet]
+
+            if end_juliday > self.end_juliday:
+                julidays, signs = solve_ingresses(
+                    planet,
+                    self.end_juliday,
+                    end_juliday
+                )
+                self._julidays[planet] += julidays
+                self._signs[planet] += signs
+
+        self.start_juliday = min(self.start_juliday, start_juliday)
+        self.end_juliday = max(self.end_juliday, end_juliday)
+        LOGGER.info(
+            f"Ingress calendar covers {swe.revjul(self.start_juliday)[0]}"
+            f"-{swe.revjul(self.end_juliday)[0]}"
+        )
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return
+
+        with np.load(self.file_path) as data:
+            self.start_juliday = float(data["start_juliday"])
+            self.end_juliday = float(data["end_juliday"])
+            for planet in SwissEphPlanet:
+                self._initial_signs[planet] = int(data["initial_signs"][planet])
+                self._julidays[planet] = data[f"julidays_{planet}"].tolist()
+                self._signs[planet] = data[f"signs_{planet}"].tolist()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+
+        arrays = {
+            "start_juliday": self.start_juliday,
+            "end_juliday": self.end_juliday,
+            "initial_signs": [
+                self._initial_signs[planet] for planet in SwissEphPlanet
+            ],
+        }
+        for planet in SwissEphPlanet:
+            arrays[f"julidays_{planet}"] = np.array(
+                self._julidays[planet],
+                dtype=float
+            )
+            arrays[f"signs_{planet}"] = np.array(
+                self._signs[planet],
+                dtype=np.int8
+            )
+
+        # Пишем во временный файл, чтобы процессы пула не прочитали
+        # недописанный календарь
+        temporary_path = f"{self.file_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(temporary_path, self.file_path)
+
+    def get_sign(self, planet: SwissEphPlanet, juliday: float) -> int:
+        self._ensure(juliday)
+
+        index = bisect.bisect_right(self._julidays[planet], juliday) - 1
+        if index < 0:
+            return self._initial_signs[planet]
+        return self._signs[planet][index]
+
+    def get_sign_period(
+        self,
+        planet: SwissEphPlanet,
+        juliday: float
+    ) -> Tuple[float, float, int]:
+        """
+        Начало и конец пребывания планеты в знаке, в котором она
+        находится в момент juliday, и номер знака.
+        """
+        self._ensure(juliday)
+
+        julidays = self._julidays[planet]
+        index = bisect.bisect_right(julidays, juliday) - 1
+        if index < 0 or index + 1 >= len(julidays):
+            raise ValueError(
+                f"Sign period of {planet.name} is beyond the ingress calendar"
+            )
+        return julidays[index], julidays[index + 1], self._signs[planet][index]
+
+    def get_ingresses(
+        self,
+        planet: SwissEphPlanet,
+        start_juliday: float,
+        end_juliday: float
+    ) -> List[Tuple[float, int]]:
+        """Ингрессии в промежутке [start_juliday, end_juliday)."""
+        self._ensure(start_juliday)
+        self._ensure(end_juliday)
+
+        julidays = self._julidays[planet]
+        left = bisect.bisect_left(julidays, start_juliday)
+        right = bisect.bisect_left(julidays, end_juliday)
+        return list(zip(julidays[left:right], self._signs[planet][left:right]))
+
+
+ingress_calendar = IngressCalendar()
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Dict
 
 from src.enums import SwissEphPlanet
 
@@ -17,6 +18,13 @@ class User:
     current_location: Location
 
 
+@dataclass
+class NatalChart:
+    birth_datetime_utc: datetime
+    birth_timezone_offset: int
+    positions: Dict[SwissEphPlanet, float]
+
+
 @dataclass
 class AstroEvent:
     natal_planet: int
@@ -1,4 +1,4 @@
-from .blank_moon import get_blank_moon_period
+from .blank_moon import get_blank_moon_period, get_void_of_course_periods
 from .sign import get_moon_signs_at_date, get_moon_sign_period
 from .lunar_day import (
     get_main_lunar_day_at_date,
@@ -1,14 +1,22 @@
 import logging
 
 from datetime import datetime, timedelta
+from math import ceil
 from typing import List, Optional
 
 from src import config
 from src.enums import SwissEphPlanet
 
-from .sign import get_moon_sign_period
+from ..ingress import ingress_calendar
 from ..models import User, TimePeriod, MonoAstroEvent
-from ..utils import get_juliday, get_planet_data
+from ..utils import (
+    calculate_planet_degrees_ut,
+    find_root,
+    get_datetime,
+    get_juliday,
+    get_planet_data,
+    wrap_degrees
+)
 
 
 # Константы
@@ -16,6 +24,9 @@ LOGGER = logging.getLogger(__name__)
 ORBIS = 0.1
 ASPECTS = [0, 60, 90, 120, 180, 240, 270, 300]
 DATETIME_FORMAT = config.get("database.datetime_format")
+# Шаг поиска аспектов Луны в сутках и точность момента аспекта (~0.01 с)
+VOID_OF_COURSE_STEP = 0.25
+TOLERANCE = 1e-7
 
 
 def get_blank_moon_period(
@@ -23,49 +34,126 @@ def get_blank_moon_period(
     user: User,
     timezone_offset: int
 ) -> TimePeriod:
-    moon_sign_period = get_moon_sign_period(date, user)
+    """
+    Холостая луна в знаке, где Луна находится в момент date (UTC):
+    от последнего точного аспекта Луны в знаке до выхода из знака.
+    Границы - по местному времени.
+    """
+    sign_start, sign_end, _ = ingress_calendar.get_sign_period(
+        SwissEphPlanet.MOON,
+        get_juliday(date)
+    )
+    void_of_course = _get_void_of_course(sign_start, sign_end)
 
-    LOGGER.info(
-        '\nMoon sign period:\n\nstart: {start}\nend: {end}'.format(
-            start=moon_sign_period.start.strftime(DATETIME_FORMAT),
-            end=moon_sign_period.end.strftime(DATETIME_FORMAT)
-        )
+    timezone_timedelta = timedelta(hours=timezone_offset)
+    return TimePeriod(
+        start=void_of_course.start + timezone_timedelta,
+        end=void_of_course.end + timezone_timedelta
     )
 
-    latest_event_peak = _get_latest_event_peak(moon_sign_period, user)
 
-    timezone_timedelta = timedelta(hours=timezone_offset)
+def get_void_of_course_periods(
+    start: datetime,
+    finish: datetime
+) -> List[TimePeriod]:
+    """
+    Периоды холостой луны (UTC), пересекающиеся с [start, finish).
+    От пользователя не зависят - координаты геоцентрические.
+    """
+    periods = []
+
+    juliday = get_juliday(start)
+    finish_juliday = get_juliday(finish)
+    while juliday < finish_juliday:
+        sign_start, sign_end, _ = ingress_calendar.get_sign_period(
+            SwissEphPlanet.MOON,
+            juliday
+        )
+        period = _get_void_of_course(sign_start, sign_end)
+        if period.end > start and period.start < finish:
+            periods.append(period)
 
-    if latest_event_peak is None:
-        start = moon_sign_period.start + timezone_timedelta,
-        end = moon_sign_period.end + timezone_timedelta
-    else:
-        start = latest_event_peak + timezone_timedelta
-        end = moon_sign_period.end + timezone_timedelta
+        juliday = sign_end
 
-    return TimePeriod(start, end)
+    return periods
 
 
-def _get_latest_event_peak(
-    moon_sign_period: TimePeriod,
-    user: User
-) -> datetime | None:
-    """
-    Находит время последнего точного аспекта луны в периоде знака.
-    """
-    events = get_astro_events_from_period(
-        moon_sign_period.start,
-        moon_sign_period.end,
-        user
+def _get_void_of_course(sign_start: float, sign_end: float) -> TimePeriod:
+    last_aspect = _find_last_aspect(sign_start, sign_end)
+    return TimePeriod(
+        start=get_datetime(
+            last_aspect if last_aspect is not None else sign_start
+        ),
+        end=get_datetime(sign_end)
     )
 
-    events_with_peak = [e for e in events if e.peak is not None]
 
-    if not events_with_peak:
-        return None
+def _find_last_aspect(
+    start_juliday: float,
+    finish_juliday: float
+) -> Optional[float]:
+    """
+    Момент последнего точного аспекта Луны к планетам в промежутке.
+    Луна обгоняет любую планету минимум на ~11° в сутки, а точки аспектов
+    разнесены минимум на 30°, поэтому на шаге VOID_OF_COURSE_STEP не
+    бывает двух пересечений одной точки.
+    """
+    steps = max(1, ceil((finish_juliday - start_juliday) / VOID_OF_COURSE_STEP))
+    julidays = [
+        start_juliday + (finish_juliday - start_juliday) * index / steps
+        for index in range(steps + 1)
+    ]
+    moon_positions = [
+        calculate_planet_degrees_ut(juliday, SwissEphPlanet.MOON)
+        for juliday in julidays
+    ]
+
+    last_aspect = None
+    for planet in SwissEphPlanet:
+        if planet == SwissEphPlanet.MOON:
+            continue
+
+        planet_positions = [
+            calculate_planet_degrees_ut(juliday, planet)
+            for juliday in julidays
+        ]
+
+        for aspect in ASPECTS:
+            def distance(juliday: float) -> float:
+                return wrap_degrees(
+                    calculate_planet_degrees_ut(juliday, SwissEphPlanet.MOON)
+                    - calculate_planet_degrees_ut(juliday, planet)
+                    - aspect
+                )
+
+            # С конца: нужен только последний точный аспект к планете
+            for index in range(steps, 0, -1):
+                if last_aspect is not None and julidays[index] <= last_aspect:
+                    break
 
-    latest_event = max(events_with_peak, key=lambda e: e.peak)  # type: ignore
-    return latest_event.peak
+                left = wrap_degrees(
+                    moon_positions[index - 1]
+                    - planet_positions[index - 1]
+                    - aspect
+                )
+                right = wrap_degrees(
+                    moon_positions[index] - planet_positions[index] - aspect
+                )
+                # Переход через ноль, а не скачок с 180° на -180°
+                if left < 0 <= right and right - left < 90:
+                    peak = find_root(
+                        distance,
+                        julidays[index - 1],
+                        julidays[index],
+                        left,
+                        right,
+                        TOLERANCE
+                    )
+                    if last_aspect is None or peak > last_aspect:
+                        last_aspect = peak
+                    break
+
+    return last_aspect
 
 
 def calculate_aspect(
@@ -268,8 +356,5 @@ def create_event_with_middle_peak(
     middle = start + (end - start) / 2
     first_planet, second_planet, aspect = signature
 
-    event = MonoAstroEvent(first_planet, second_planet, aspect, middle)
-    print(f"event {event.first_planet} - {event.second_planet}, {event.aspect}")
-    print(f"{start.strftime('%d/%m/%Y, %H:%M:%S')} -> {end.strftime('%d/%m/%Y, %H:%M:%S')}\n")
-    return event
+    return MonoAstroEvent(first_planet, second_planet, aspect, middle)
 
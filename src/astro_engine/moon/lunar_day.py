@@ -1,8 +1,13 @@
+import bisect
 import logging
 import ephem
+import h3
 from ephem import AlwaysUpError, NeverUpError
 
 from datetime import datetime, timedelta
+from functools import lru_cache
+from math import floor
+from typing import List, Tuple
 
 from src import config
 from ..models import LunarDay
@@ -11,6 +16,16 @@ from src.exceptions import InfinityCycleError
 # Константы
 SECONDS_IN_DAY = 24 * 60 * 60
 
+# Восход Луны сдвигается примерно на 4 минуты на градус долготы. Ячейка
+# H3 разрешения 6 - около 36 км² (ребро ~4 км), внутри неё восходы
+# расходятся меньше чем на полминуты, поэтому жители одного города
+# делят один таймлайн лунных дней.
+H3_RESOLUTION = 6
+LUNATIONS_CACHE_SIZE = 4096
+
+SYNODIC_MONTH = timedelta(days=29.530588)
+REFERENCE_NEW_MOON = datetime(2000, 1, 6, 18, 14)
+
 ISO_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 TIME_FORMAT: str = config.get("database.time_format")
 DATETIME_FORMAT = "%Y-%m-%d %H:%M"
@@ -67,137 +82,65 @@ def _get_main_lunar_day_when_3_lunar_days_at_date(
     longitude: float,
     latitude: float
 ) -> LunarDay:
-    lunar_days = []
-
-    # 25, а не 24 чтобы учитывать последний час и избежать равнозначного
-    # результата, когда каждый лунный день занимает по 8 часов.
-    for hour in range(25):
-        time_point = utcdate + timedelta(hours=hour)
-
-        lunar_day = get_lunar_day(time_point, longitude, latitude)
-        lunar_days.append(lunar_day)
-
-    lunar_day_durations = {}
-
-    for ld in lunar_days:
-        # Увеличиваем продолжительность на единицу (час)
-        lunar_day_number_already_in_dict = ld.number in lunar_day_durations
-        if lunar_day_number_already_in_dict:
-            lunar_day_durations[ld.number] += 1
-        else:
-            lunar_day_durations[ld.number] = 1
-
-    most_common_lunar_day_number = max(
-        lunar_day_durations,
-        key=lunar_day_durations.get
+    lunar_days = get_lunar_days(
+        utcdate,
+        utcdate + timedelta(hours=24),
+        longitude,
+        latitude
     )
 
-    # Находим соответствующий объект LunarDay
-    for ld in lunar_days:
-        if ld.number == most_common_lunar_day_number:
-            return ld
-
-
-def get_lunar_day_end(
-    utcdate: datetime,
-    longitude: float,
-    latitude: float
-) -> datetime:
-    """
-    Bычисляет время следующего восхода Луны или следующего новолуния
-    после заданной даты и времени.
-    """
-    observer = ephem.Observer()
-    observer.lat = str(latitude)
-    observer.lon = str(longitude)
-    observer.date = utcdate
-
-    moon = ephem.Moon(observer)
-    moon_rise = observer.next_rising(moon).datetime().replace(tzinfo=None)
-
-    next_new_moon = ephem.next_new_moon(utcdate).datetime()
-
-    return moon_rise if moon_rise < next_new_moon else next_new_moon
-
-
-def get_lunar_day_start(
-    utcdate: datetime,
-    longitude: float,
-    latitude: float
-) -> datetime:
-    """
-    Вычисляет время следующего восхода Луны или следующего новолуния
-    после заданной даты и времени.
-    """
-    observer = ephem.Observer()
-    observer.lat = str(latitude)
-    observer.lon = str(longitude)
-    observer.date = utcdate
-
-    moon = ephem.Moon(observer)
-    moon_rise = observer.previous_rising(moon).datetime().replace(tzinfo=None)
-
-    previous_new_moon = ephem.previous_new_moon(utcdate).datetime()
+    # Продолжительность в часах: 25 точек, а не 24, чтобы учитывать
+    # последний час и избежать равнозначного результата, когда каждый
+    # лунный день занимает по 8 часов.
+    def duration(lunar_day: LunarDay) -> int:
+        return sum(
+            lunar_day.start <= utcdate + timedelta(hours=hour) < lunar_day.end
+            for hour in range(25)
+        )
 
-    return moon_rise if moon_rise > previous_new_moon else previous_new_moon
+    return max(lunar_days, key=duration)
 
 
-def get_lunar_day_number(
-    utcdate: datetime,
+def get_lunar_day(
+    time_point: datetime,
     longitude: float,
     latitude: float
-) -> int:
+) -> LunarDay:
     """
-    Вычисляет лунный день для заданной даты и координат.
-
-    Алгоритм работает следующим образом: он находит время последнего новолуния,
-    затем вычисляет последовательность восходов Луны после этого новолуния
-    до заданной даты.
+    Возвращает лунный день, который соответствует временной
+    точке которую передали.
 
-    Номер лунного дня определяется как количество этих восходов.
+    Первый лунный день начинается в новолуние, каждый следующий - с
+    восходом Луны, последний заканчивается в следующее новолуние.
+    Границы лунных дней считаются один раз на лунацию и ячейку H3,
+    дальше день находится бинарным поиском.
     """
-    previous_new_moon = ephem.previous_new_moon(utcdate).datetime()
-
-    observer = ephem.Observer()
-    observer.lat = str(latitude)
-    observer.lon = str(longitude)
-
-    lunar_day_count = 1
-    current_time = previous_new_moon
+    cell = h3.geo_to_h3(latitude, longitude, H3_RESOLUTION)
 
-    while current_time <= utcdate:
-        next_moon_rise = find_next_moon_rise(observer, current_time)
+    lunation = _get_lunation_number(time_point)
+    boundaries = _get_lunar_days_boundaries(cell, lunation)
 
-        # Проверяем, не вышла ли следующая дата
-        # восхода за пределы заданной даты
-        if next_moon_rise > utcdate:
-            break
-
-        lunar_day_count += 1
-        current_time = next_moon_rise
-
-    return lunar_day_count
+    index = bisect.bisect_right(boundaries, time_point) - 1
+    return LunarDay(
+        number=index + 1,
+        start=boundaries[index],
+        end=boundaries[index + 1]
+    )
 
 
-def get_lunar_day(
-    time_point: datetime,
+def get_lunar_days(
+    start: datetime,
+    finish: datetime,
     longitude: float,
     latitude: float
-) -> LunarDay:
-    """
-    Возвращает лунный день, который соответствует временной
-    точке которую передали
-    """
-    lunar_day_number = get_lunar_day_number(time_point, longitude, latitude)
-    lunar_day_start = get_lunar_day_start(time_point, longitude, latitude)
-    lunar_day_end = get_lunar_day_end(time_point, longitude, latitude)
-
-    lunar_day = LunarDay(
-        number=lunar_day_number,
-        start=lunar_day_start,
-        end=lunar_day_end
-    )
-    return lunar_day
+) -> List[LunarDay]:
+    """Лунные дни, пересекающиеся с промежутком [start, finish]."""
+    lunar_days = [get_lunar_day(start, longitude, latitude)]
+    while lunar_days[-1].end <= finish:
+        lunar_days.append(
+            get_lunar_day(lunar_days[-1].end, longitude, latitude)
+        )
+    return lunar_days
 
 
 def get_next_lunar_day(
@@ -208,9 +151,7 @@ def get_next_lunar_day(
     """
     Определяет следующий лунный день после заданного.
     """
-    next_lunar_day_start = lunar_day.end + timedelta(minutes=10)
-    lunar_day = get_lunar_day(next_lunar_day_start, longitude, latitude)
-    return lunar_day
+    return get_lunar_day(lunar_day.end, longitude, latitude)
 
 
 def get_previous_lunar_day(
@@ -219,12 +160,53 @@ def get_previous_lunar_day(
     """
     Определяет предыдущий лунный день до заданного.
     """
-    # Находим начало предыдущего лунного дня,
-    # которое является началом текущего минус 10 минут
-    previous_lunar_day_end = lunar_day.start - timedelta(minutes=10)
+    return get_lunar_day(
+        lunar_day.start - timedelta(microseconds=1),
+        longitude,
+        latitude
+    )
+
+
+@lru_cache(maxsize=LUNATIONS_CACHE_SIZE)
+def _get_new_moon(lunation: int) -> datetime:
+    """Новолуние с номером lunation, считая от новолуния 6.01.2000."""
+    # Истинное новолуние отходит от среднего меньше чем на сутки
+    approximate_time = REFERENCE_NEW_MOON + SYNODIC_MONTH * (lunation - 0.5)
+    return ephem.next_new_moon(approximate_time).datetime()
+
+
+def _get_lunation_number(time_point: datetime) -> int:
+    """Номер лунации, в которой находится time_point."""
+    lunation = floor((time_point - REFERENCE_NEW_MOON) / SYNODIC_MONTH)
+    if time_point < _get_new_moon(lunation):
+        return lunation - 1
+    if time_point >= _get_new_moon(lunation + 1):
+        return lunation + 1
+    return lunation
+
+
+@lru_cache(maxsize=LUNATIONS_CACHE_SIZE)
+def _get_lunar_days_boundaries(cell: str, lunation: int) -> Tuple[datetime]:
+    """
+    Границы лунных дней лунации для центра ячейки H3: новолуние,
+    восходы Луны до следующего новолуния и само следующее новолуние.
+    """
+    latitude, longitude = h3.h3_to_geo(cell)
+    observer = ephem.Observer()
+    observer.lat = str(latitude)
+    observer.lon = str(longitude)
+
+    new_moon = _get_new_moon(lunation)
+    next_new_moon = _get_new_moon(lunation + 1)
+
+    boundaries = [new_moon]
+    moon_rise = find_next_moon_rise(observer, new_moon)
+    while moon_rise < next_new_moon:
+        boundaries.append(moon_rise)
+        moon_rise = find_next_moon_rise(observer, moon_rise)
+    boundaries.append(next_new_moon)
 
-    lunar_day = get_lunar_day(previous_lunar_day_end, longitude, latitude)
-    return lunar_day
+    return tuple(boundaries)
 
 
 def find_next_moon_rise(observer: ephem.Observer, time: datetime):
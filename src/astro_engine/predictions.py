@@ -1,13 +1,24 @@
-import asyncio
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import swisseph as swe
 
-from src.astro_engine.models import AstroEvent, User
+from src.astro_engine.models import AstroEvent, NatalChart, User
 from src.enums import SwissEphPlanet
 from src.utils import get_timezone_offset
-from .utils import get_juliday, sort_astro_events
+from .ephemeris import (
+    TRANSIT_PLANETS,
+    get_transit_position,
+    get_transit_samples
+)
+from .utils import (
+    SECONDS_IN_DAY,
+    find_root,
+    get_juliday,
+    sort_astro_events,
+    wrap_degrees
+)
 
 
 NATAL_PLANETS = [
@@ -22,18 +33,26 @@ NATAL_PLANETS = [
     SwissEphPlanet.NEPTUNE,
     SwissEphPlanet.PLUTO,
 ]
-TRANSIT_PLANETS = [
-    SwissEphPlanet.SUN,
-    SwissEphPlanet.MOON,
-    SwissEphPlanet.MERCURY,
-    SwissEphPlanet.VENUS,
-    SwissEphPlanet.MARS
-]
-
 ASPECTS = [0, 30, 60, 90, 120, 180, 240, 270, 300, 330, 360]
 ORBIS = 0.1
 ZODIAC_BOUNDS = [30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330, 360]
 
+# Углы аспектов в диапазоне [0, 180], как их возвращает calculate_aspect
+EXACT_ASPECTS = sorted({
+    aspect if aspect <= 180 else 360 - aspect
+    for aspect in ASPECTS
+})
+
+# Смещения точек аспектов от натальной позиции в порядке _get_aspect_points
+ASPECT_OFFSETS = [
+    (aspect, offset)
+    for aspect in EXACT_ASPECTS
+    for offset in ((aspect, -aspect) if 0 < aspect < 180 else (aspect,))
+]
+
+# Точность поиска момента точного аспекта в сутках (~10 секунд)
+PEAK_TIME_TOLERANCE = 1 / (24 * 60 * 6)
+
 
 def find_peak_time(
     time: datetime,
@@ -77,7 +96,8 @@ def calculate_aspect(
 def get_astro_event_at_time(
     time: datetime,
     user: User,
-    birth_datetime_utc: Optional[datetime] = None
+    birth_datetime_utc: Optional[datetime] = None,
+    natal_chart: Optional[NatalChart] = None
 ) -> List[AstroEvent]:
     """
     Получить все астрологические события для заданного времени.
@@ -92,27 +112,20 @@ def get_astro_event_at_time(
         time.hour + time.minute / 60
     )
 
-    # Преобразование времени рождения пользователя в юлианскую дату
-    # birth_datetime_utc уже конвертировано из локального в UTC вызывающей функцией
-    birth_dt = birth_datetime_utc if birth_datetime_utc is not None else user.birth_datetime
-    julian_day_birth = swe.julday(
-        birth_dt.year,
-        birth_dt.month,
-        birth_dt.day,
-        birth_dt.hour + birth_dt.minute / 60,
-    )
-
-    # Вычисление натальных позиций для всех планет на основе даты рождения пользователя
-    natal_positions = {
-        planet: swe.calc_ut(julian_day_birth, planet, swe.FLG_SWIEPH)[0][0]
-        for planet in NATAL_PLANETS
-    }
+    if natal_chart is not None:
+        natal_positions = natal_chart.positions
+    else:
+        # Вычисление натальных позиций для всех планет на основе даты рождения пользователя
+        # birth_datetime_utc уже конвертировано из локального в UTC вызывающей функцией
+        birth_dt = birth_datetime_utc if birth_datetime_utc is not None else user.birth_datetime
+        natal_positions = get_natal_positions(birth_dt)
 
     for transit_planet in TRANSIT_PLANETS:
         # Получение текущей позиции планеты в движении
-        transit_planet_position = swe.calc_ut(
-            julian_day_time, transit_planet, swe.FLG_SWIEPH
-        )[0][0]
+        transit_planet_position = get_transit_position(
+            transit_planet,
+            julian_day_time
+        )[0]
 
         for natal_planet, natal_planet_position in natal_positions.items():
             # Вычисление аспекта между
@@ -139,85 +152,472 @@ def get_astro_event_at_time(
 def get_astro_events_from_period(
     start: datetime,
     finish: datetime,
-    user: User
+    user: User,
+    natal_chart: Optional[NatalChart] = None
 ) -> List[AstroEvent]:
-    # Конвертируем время рождения из локального в UTC один раз для всего скана
-    birth_tz_offset = get_timezone_offset(
-        user.birth_location.latitude,
-        user.birth_location.longitude
+    """
+    Находит точные транзитные аспекты к натальной карте за период.
+
+    Вместо перебора с шагом 10 минут долгота каждой транзитной планеты
+    считается на грубой сетке, пересечения точек аспектов берутся в вилку
+    по смене знака углового расстояния, а точный момент ищется методом
+    Брента. Аспекты, которые в периоде только касаются орбиса (станция
+    планеты или точный аспект за границей периода), тоже попадают в список.
+
+    Натальная карта не зависит от периода, поэтому её можно посчитать один
+    раз (get_natal_chart) и передавать готовой.
+    """
+    if natal_chart is None:
+        natal_chart = get_natal_chart(user)
+    natal_positions = natal_chart.positions
+
+    start_juliday = get_juliday(start)
+    finish_juliday = start_juliday + (
+        (finish - start).total_seconds() / SECONDS_IN_DAY
     )
-    birth_datetime_utc = user.birth_datetime - timedelta(hours=birth_tz_offset)
 
-    step = timedelta(minutes=10)
-    current_time = start
-
-    all_events = []
-    while current_time <= finish:
-        events_at_current_time = get_astro_event_at_time(current_time, user, birth_datetime_utc)
-        all_events.extend(events_at_current_time)
-        current_time += step
-
-    # Удаление дубликатов на основе натальной планеты, транзитной планеты и аспекта
-    unique_events_dict = {
-        (
-            event.natal_planet,
-            event.transit_planet,
-            event.aspect
-        ): event
-        for event in all_events
-    }
+    unique_events_dict: Dict[Tuple[int, int, int], AstroEvent] = {}
+    for transit_planet in TRANSIT_PLANETS:
+        samples = _get_transit_samples(
+            transit_planet,
+            start_juliday,
+            finish_juliday
+        )
+        stations = _find_stations(transit_planet, samples)
+
+        for natal_planet, natal_planet_position in natal_positions.items():
+            for aspect, aspect_point in _get_aspect_points(natal_planet_position):
+                peak_julidays = _find_aspect_peaks(
+                    transit_planet,
+                    aspect_point,
+                    samples,
+                    stations,
+                    start_juliday,
+                    finish_juliday
+                )
+
+                if not peak_julidays:
+                    continue
+
+                # Как и раньше, на одну тройку планета-планета-аспект
+                # остаётся одно событие - последнее в периоде
+                peak_at = _juliday_to_datetime(
+                    max(peak_julidays),
+                    start,
+                    start_juliday
+                )
+                key = (natal_planet, transit_planet, aspect)
+                if (
+                    key not in unique_events_dict
+                    or unique_events_dict[key].peak_at < peak_at
+                ):
+                    unique_events_dict[key] = AstroEvent(
+                        natal_planet=natal_planet,
+                        transit_planet=transit_planet,
+                        aspect=aspect,
+                        peak_at=peak_at
+                    )
 
-    # Преобразование словаря обратно в список
     unique_events = list(unique_events_dict.values())
 
     unique_sorted_events = sort_astro_events(unique_events)
     return unique_sorted_events
 
 
-async def get_astro_events_from_period_with_duplicates(
+def get_astro_events_for_users(
+    users: List[User],
     start: datetime,
     finish: datetime,
-    user: User
+    natal_charts: Optional[List[Optional[NatalChart]]] = None
+) -> List[List[AstroEvent]]:
+    """
+    Пакетный вариант get_astro_events_from_period для многих пользователей
+    сразу: результат для каждого пользователя совпадает со скалярным.
+
+    Опорная сетка и станции транзитных планет общие, а поиск пересечений
+    точек аспектов делается одной операцией NumPy над массивом
+    (узел сетки × пользователь × натальная планета × точка аспекта).
+    Уточнение методом Брента остаётся только для найденных пересечений.
+    """
+    if not users:
+        return []
+
+    if natal_charts is None:
+        natal_charts = [None] * len(users)
+    natal_charts = [
+        natal_chart if natal_chart is not None else get_natal_chart(user)
+        for user, natal_chart in zip(users, natal_charts)
+    ]
+
+    start_juliday = get_juliday(start)
+    finish_juliday = start_juliday + (
+        (finish - start).total_seconds() / SECONDS_IN_DAY
+    )
+
+    aspect_points = _get_users_aspect_points(natal_charts)
+    aspects = [aspect for aspect, _ in ASPECT_OFFSETS]
+
+    users_events: List[Dict[Tuple[int, int, int], AstroEvent]] = [
+        {} for _ in users
+    ]
+    for transit_planet in TRANSIT_PLANETS:
+        peaks, distances = _find_users_peaks(
+            transit_planet,
+            aspect_points,
+            start_juliday,
+            finish_juliday
+        )
+
+        # Точный аспект за границей периода, но на границе планета ещё в орбисе
+        without_peaks = np.ones(aspect_points.shape, dtype=bool)
+        for point, point_peaks in peaks.items():
+            if point_peaks:
+                without_peaks[point] = False
+
+        finish_in_orbis = without_peaks & (np.abs(distances[-2]) < ORBIS)
+        start_in_orbis = (
+            without_peaks
+            & ~finish_in_orbis
+            & (np.abs(distances[1]) < ORBIS)
+        )
+        for point in map(tuple, np.argwhere(finish_in_orbis).tolist()):
+            peaks[point] = [finish_juliday]
+        for point in map(tuple, np.argwhere(start_in_orbis).tolist()):
+            peaks[point] = [start_juliday]
+
+        # Порядок обхода как в скалярной версии: натальная планета,
+        # затем точки аспектов
+        for (user_index, natal_index, point_index), point_peaks in sorted(
+            peaks.items()
+        ):
+            if not point_peaks:
+                continue
+
+            natal_planet = NATAL_PLANETS[natal_index]
+            aspect = aspects[point_index]
+            peak_at = _juliday_to_datetime(
+                max(point_peaks),
+                start,
+                start_juliday
+            )
+
+            events = users_events[user_index]
+            key = (natal_planet, transit_planet, aspect)
+            if key not in events or events[key].peak_at < peak_at:
+                events[key] = AstroEvent(
+                    natal_planet=natal_planet,
+                    transit_planet=transit_planet,
+                    aspect=aspect,
+                    peak_at=peak_at
+                )
+
+    return [sort_astro_events(list(events.values())) for events in users_events]
+
+
+def _get_users_aspect_points(natal_charts: List[NatalChart]) -> np.ndarray:
+    """
+    Точки аспектов к натальным планетам пользователей, массив формы
+    (пользователь, натальная планета, точка аспекта) в порядке
+    NATAL_PLANETS и ASPECT_OFFSETS.
+    """
+    natal_positions = np.array([
+        [natal_chart.positions[planet] for planet in NATAL_PLANETS]
+        for natal_chart in natal_charts
+    ])
+    offsets = np.array([offset for _, offset in ASPECT_OFFSETS], dtype=float)
+    return (natal_positions[:, :, None] + offsets) % 360
+
+
+def _find_users_peaks(
+    transit_planet: int,
+    aspect_points: np.ndarray,
+    start_juliday: float,
+    finish_juliday: float
+) -> Tuple[Dict[Tuple[int, int, int], List[float]], np.ndarray]:
+    """
+    Точные аспекты транзитной планеты к точкам aspect_points внутри
+    периода: пересечения точек и касания орбиса в станциях.
+
+    Возвращает моменты по индексам (пользователь, натальная планета,
+    точка аспекта) и угловые расстояния в узлах опорной сетки.
+    """
+    samples = _get_transit_samples(
+        transit_planet,
+        start_juliday,
+        finish_juliday
+    )
+    stations = _find_stations(transit_planet, samples)
+
+    julidays = [juliday for juliday, _, _ in samples]
+    positions = np.array([position for _, position, _ in samples])
+
+    # (узел, пользователь, натальная планета, точка аспекта)
+    distances = (positions[:, None, None, None] - aspect_points + 180) % 360 - 180
+    left_distances = distances[:-1]
+    right_distances = distances[1:]
+    crossings = (
+        ((left_distances > 0) != (right_distances > 0))
+        # Скачок через ±180° - это противоположная точка, а не аспект
+        & (np.abs(left_distances - right_distances) < 180)
+    )
+
+    peaks: Dict[Tuple[int, int, int], List[float]] = {}
+    for sample, *point in np.argwhere(crossings).tolist():
+        point = tuple(point)
+        aspect_point = float(aspect_points[point])
+
+        peak = find_root(
+            lambda juliday: wrap_degrees(
+                _get_transit_data(juliday, transit_planet)[0] - aspect_point
+            ),
+            julidays[sample],
+            julidays[sample + 1],
+            float(left_distances[sample][point]),
+            float(right_distances[sample][point]),
+            PEAK_TIME_TOLERANCE
+        )
+        if start_juliday <= peak <= finish_juliday:
+            peaks.setdefault(point, []).append(peak)
+
+    # Касание орбиса в станции без пересечения точки аспекта
+    for juliday, position in stations:
+        if not start_juliday <= juliday <= finish_juliday:
+            continue
+
+        touches = np.abs(
+            (position - aspect_points + 180) % 360 - 180
+        ) < ORBIS
+        for point in map(tuple, np.argwhere(touches).tolist()):
+            point_peaks = peaks.setdefault(point, [])
+            if not any(abs(peak - juliday) < 1 for peak in point_peaks):
+                point_peaks.append(juliday)
+
+    return peaks, distances
+
+
+def get_transit_timeline(
+    start: datetime,
+    finish: datetime,
+    natal_chart: NatalChart
 ) -> List[AstroEvent]:
-    # Конвертируем время рождения из локального в UTC один раз для всего скана
-    birth_tz_offset = get_timezone_offset(
-        user.birth_location.latitude,
-        user.birth_location.longitude
+    """
+    Все точные транзитные аспекты к натальной карте с моментом в
+    полуинтервале [start, finish), по порядку времени. В отличие от
+    get_astro_events_from_period повторные аспекты не схлопываются,
+    а касания орбиса на границах периода не считаются событиями, поэтому
+    соседние периоды можно считать независимо и склеивать.
+    """
+    start_juliday = get_juliday(start)
+    finish_juliday = start_juliday + (
+        (finish - start).total_seconds() / SECONDS_IN_DAY
     )
+
+    aspect_points = _get_users_aspect_points([natal_chart])
+    aspects = [aspect for aspect, _ in ASPECT_OFFSETS]
+
+    events = []
+    for transit_planet in TRANSIT_PLANETS:
+        peaks, _ = _find_users_peaks(
+            transit_planet,
+            aspect_points,
+            start_juliday,
+            finish_juliday
+        )
+        for (_, natal_index, point_index), point_peaks in peaks.items():
+            for peak in point_peaks:
+                if peak >= finish_juliday:
+                    continue
+
+                events.append(
+                    AstroEvent(
+                        natal_planet=NATAL_PLANETS[natal_index],
+                        transit_planet=transit_planet,
+                        aspect=aspects[point_index],
+                        peak_at=_juliday_to_datetime(
+                            peak,
+                            start,
+                            start_juliday
+                        )
+                    )
+                )
+
+    return sorted(events, key=lambda event: event.peak_at)
+
+
+def get_natal_chart(user: User) -> NatalChart:
+    """
+    Натальная карта пользователя: момент рождения в UTC и долготы планет.
+    Зависит только от данных рождения, поэтому считается один раз.
+    """
+    birth_tz_offset = get_birth_timezone_offset(user)
     birth_datetime_utc = user.birth_datetime - timedelta(hours=birth_tz_offset)
 
-    step = timedelta(minutes=13)
-    current_time = start
-    all_events = []
-
-    while current_time <= finish:
-        events_at_current_time = get_astro_event_at_time(current_time, user, birth_datetime_utc)
-        all_events.extend(events_at_current_time)
-        current_time += step
-        await asyncio.sleep(0.001)
-
-    unique_events_dict: Dict[(int, int, int), List[List[AstroEvent]]] = {}
-    for event in all_events:
-        key = (event.natal_planet, event.transit_planet, event.aspect)
-        if key not in unique_events_dict:
-            unique_events_dict[key] = [[event]]
-        else:
-            last_group = unique_events_dict[key][-1]
-            if (event.peak_at - last_group[-1].peak_at) > timedelta(hours=2):
-                unique_events_dict[key].append([event])
-            else:
-                last_group.append(event)
-
-    unique_events = []
-    for events_groups_list in unique_events_dict.values():
-        for events_group in events_groups_list:
-            avg_peak_time = sum(
-                (event.peak_at.timestamp() for event in events_group)
-            ) / len(events_group)
-
-            avg_event = events_group[0]
-            avg_event.peak_at = datetime.fromtimestamp(avg_peak_time)
-
-            unique_events.append(avg_event)
-
-    return unique_events
+    return NatalChart(
+        birth_datetime_utc=birth_datetime_utc,
+        birth_timezone_offset=birth_tz_offset,
+        positions=get_natal_positions(birth_datetime_utc)
+    )
+
+
+def get_birth_timezone_offset(user: User) -> int:
+    """
+    Смещение пояса места рождения в момент рождения (летнее время и
+    смены поясов тех лет). Момент в UTC зависит от самого смещения,
+    поэтому смещение уточняется по моменту, посчитанному с первым
+    приближением.
+    """
+    latitude = user.birth_location.latitude
+    longitude = user.birth_location.longitude
+
+    offset = get_timezone_offset(latitude, longitude, at=user.birth_datetime)
+    return get_timezone_offset(
+        latitude,
+        longitude,
+        at=user.birth_datetime - timedelta(hours=offset)
+    )
+
+
+def get_natal_positions(birth_datetime_utc: datetime) -> Dict[int, float]:
+    julian_day_birth = swe.julday(
+        birth_datetime_utc.year,
+        birth_datetime_utc.month,
+        birth_datetime_utc.day,
+        birth_datetime_utc.hour + birth_datetime_utc.minute / 60,
+    )
+    return {
+        planet: swe.calc_ut(julian_day_birth, planet, swe.FLG_SWIEPH)[0][0]
+        for planet in NATAL_PLANETS
+    }
+
+
+def _get_transit_data(juliday: float, planet: int) -> Tuple[float, float]:
+    """Долгота (градусы) и скорость (градусы в сутки) транзитной планеты."""
+    return get_transit_position(planet, juliday)
+
+
+def _get_transit_samples(
+    planet: int,
+    start_juliday: float,
+    finish_juliday: float
+) -> List[Tuple[float, float, float]]:
+    """
+    Опорная сетка (юлианская дата, долгота, скорость) с запасом в один
+    узел по краям периода. Границы периода всегда входят в сетку.
+    """
+    return get_transit_samples(planet, start_juliday, finish_juliday)
+
+
+def _find_stations(
+    planet: int,
+    samples: List[Tuple[float, float, float]]
+) -> List[Tuple[float, float]]:
+    """
+    Станции планеты (смена направления движения) внутри сетки:
+    список (юлианская дата, долгота).
+    """
+    stations = []
+    for (left, _, left_speed), (right, _, right_speed) in zip(
+        samples,
+        samples[1:]
+    ):
+        if (left_speed > 0) == (right_speed > 0):
+            continue
+
+        juliday = find_root(
+            lambda jd: _get_transit_data(jd, planet)[1],
+            left,
+            right,
+            left_speed,
+            right_speed,
+            PEAK_TIME_TOLERANCE
+        )
+        stations.append((juliday, _get_transit_data(juliday, planet)[0]))
+
+    return stations
+
+
+def _get_aspect_points(natal_position: float):
+    """
+    Точки эклиптики, попадание транзитной планеты в которые даёт
+    аспект к натальной позиции: (аспект, долгота точки).
+    """
+    for aspect in EXACT_ASPECTS:
+        yield aspect, (natal_position + aspect) % 360
+        if 0 < aspect < 180:
+            yield aspect, (natal_position - aspect) % 360
+
+
+def _find_aspect_peaks(
+    planet: int,
+    aspect_point: float,
+    samples: List[Tuple[float, float, float]],
+    stations: List[Tuple[float, float]],
+    start_juliday: float,
+    finish_juliday: float
+) -> List[float]:
+    """
+    Моменты точного аспекта (юлианские даты) внутри периода.
+    """
+    def distance(juliday: float) -> float:
+        return wrap_degrees(_get_transit_data(juliday, planet)[0] - aspect_point)
+
+    peaks = []
+
+    for (left, left_position, _), (right, right_position, _) in zip(
+        samples,
+        samples[1:]
+    ):
+        left_distance = wrap_degrees(left_position - aspect_point)
+        right_distance = wrap_degrees(right_position - aspect_point)
+
+        is_crossing = (
+            (left_distance > 0) != (right_distance > 0)
+            # Скачок через ±180° - это противоположная точка, а не аспект
+            and abs(left_distance - right_distance) < 180
+        )
+        if not is_crossing:
+            continue
+
+        peak = find_root(
+            distance,
+            left,
+            right,
+            left_distance,
+            right_distance,
+            PEAK_TIME_TOLERANCE
+        )
+        if start_juliday <= peak <= finish_juliday:
+            peaks.append(peak)
+
+    # Касание орбиса в станции без пересечения точки аспекта
+    for juliday, position in stations:
+        if (
+            start_juliday <= juliday <= finish_juliday
+            and abs(wrap_degrees(position - aspect_point)) < ORBIS
+            and not any(abs(peak - juliday) < 1 for peak in peaks)
+        ):
+            peaks.append(juliday)
+
+    if peaks:
+        return peaks
+
+    # Точный аспект за границей периода, но на границе планета ещё в орбисе
+    _, start_position, _ = samples[1]
+    _, finish_position, _ = samples[-2]
+    if abs(wrap_degrees(finish_position - aspect_point)) < ORBIS:
+        return [finish_juliday]
+    if abs(wrap_degrees(start_position - aspect_point)) < ORBIS:
+        return [start_juliday]
+
+    return []
+
+
+def _juliday_to_datetime(
+    juliday: float,
+    base_time: datetime,
+    base_juliday: float
+) -> datetime:
+    """Переводит юлианскую дату обратно в datetime с точностью до минуты."""
+    minutes = round((juliday - base_juliday) * 24 * 60)
+    return base_time + timedelta(minutes=minutes)
+
@@ -3,7 +3,7 @@ import logging
 
 import swisseph as swe
 
-from typing import Optional, List
+from typing import Callable, Optional, List
 from datetime import datetime, timedelta
 
 from src.enums import SwissEphPlanet
@@ -18,6 +18,9 @@ ASPECTS = [0, 60, 90, 120, 180]
 ISO_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 TIME_FORMAT = "%H:%M"
 
+J2000_DATETIME = datetime(2000, 1, 1, 12)
+J2000_JULIDAY = 2451545.0
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -50,6 +53,12 @@ def get_juliday(utcdate: datetime) -> float:
     return julian_day
 
 
+def get_datetime(juliday: float) -> datetime:
+    """Обратно к get_juliday: UTC-время с точностью до секунды."""
+    seconds = round((juliday - J2000_JULIDAY) * SECONDS_IN_DAY)
+    return J2000_DATETIME + timedelta(seconds=seconds)
+
+
 def calculate_aspect(
     first_planet_position: float,
     second_planet_position: float,
@@ -93,6 +102,74 @@ def find_peak_time(
     return peak_time
 
 
+def wrap_degrees(value: float) -> float:
+    """Приводит угол к диапазону [-180, 180)."""
+    return (value + 180) % 360 - 180
+
+
+def find_root(
+    func: Callable[[float], float],
+    a: float,
+    b: float,
+    fa: float,
+    fb: float,
+    tolerance: float
+) -> float:
+    """
+    Метод Брента: ищет ноль функции на отрезке [a, b], где fa и fb
+    имеют разные знаки. Сочетает обратную квадратичную интерполяцию,
+    секущие и бисекцию, поэтому на гладких функциях (долгота планеты)
+    сходится за 4-6 вычислений.
+    """
+    c, fc = b, fb
+    d = e = b - a
+
+    for _ in range(100):
+        if (fb > 0) == (fc > 0):
+            c, fc = a, fa
+            d = e = b - a
+
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+
+        middle = (c - b) / 2
+        if abs(middle) <= tolerance or fb == 0:
+            return b
+
+        if abs(e) >= tolerance and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                # Секущая
+                p = 2 * middle * s
+                q = 1 - s
+            else:
+                # Обратная квадратичная интерполяция
+                q = fa / fc
+                r = fb / fc
+                p = s * (2 * middle * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+
+            if p > 0:
+                q = -q
+            p = abs(p)
+
+            if 2 * p < min(3 * middle * q - abs(tolerance * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = middle
+        else:
+            d = e = middle
+
+        a, fa = b, fb
+        b += d if abs(d) > tolerance else (
+            tolerance if middle > 0 else -tolerance
+        )
+        fb = func(b)
+
+    return b
+
+
 def sort_astro_events(events: List[AstroEvent | MonoAstroEvent]):
     events_with_peak = remove_duplicates(
         [event for event in events if event.peak_at is not None]
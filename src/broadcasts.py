@@ -0,0 +1,475 @@
+"""
+Рассылки по всем пользователям бота, до которых доходят сообщения.
+
+Задание рассылки (текст или file_id фотографии), курсор по id
+пользователей и счётчики хранятся в Redis. Пользователи обходятся
+страницами по возрастанию id, страница отправляется параллельно через
+конвейер отправки с приоритетом рассылки, после каждой страницы курсор
+и счётчики сохраняются. После перезапуска незавершённые рассылки
+продолжаются с курсора - повторно может уйти не больше одной страницы.
+Рассылку можно приостановить, продолжить и отменить из админ-панели.
+"""
+import asyncio
+import logging
+import time
+import uuid
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import Bot, exceptions
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+from src import config, messages
+from src.common import bot, redis
+from src.database import audience
+from src.enums import BroadcastStatus, SendPriority
+from src.exceptions import NoBroadcastDataError
+from src.keyboards import keyboards
+from src.send_pipeline import MAX_CONCURRENT_SENDS, send_priority
+from src.translations import BROADCAST_STATUS_RU_TRANSLATIONS
+
+
+LOGGER = logging.getLogger(__name__)
+
+DATETIME_FORMAT: str = config.get("database.datetime_format")
+
+KEY_PREFIX = "broadcast"
+ACTIVE_JOBS_KEY = "broadcasts:active"
+# Сколько пользователей между сохранениями курсора
+DEFAULT_PAGE_SIZE = 100
+# Как часто обновлять сообщение с прогрессом у администратора, секунды
+DEFAULT_PROGRESS_INTERVAL = 10
+MOSCOW_OFFSET = timedelta(hours=3)
+
+
+def _get_setting(key: str, default: Any) -> Any:
+    try:
+        return config.get(f"broadcast.{key}")
+    except KeyError:
+        return default
+
+
+@dataclass
+class BroadcastJob:
+    job_id: str
+    text: Optional[str]
+    photo_file_id: Optional[str]
+    status: BroadcastStatus
+    total: int
+    created_at: str  # "%d.%m.%Y %H:%M" UTC
+    # Последний обработанный id пользователя
+    cursor: Optional[int] = None
+    sent: int = 0
+    failed: int = 0
+    admin_chat_id: Optional[int] = None
+    status_message_id: Optional[int] = None
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed
+
+
+@dataclass
+class BroadcastProgress:
+    job: BroadcastJob
+    throughput: float  # сообщений в секунду
+    eta: Optional[timedelta]
+
+
+class BroadcastStore:
+    """
+    Задания рассылок в хэшах Redis. Статус и прогресс пишутся разными
+    полями, чтобы сохранение курсора не затирало паузу или отмену.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    @staticmethod
+    def _get_key(job_id: str) -> str:
+        return f"{KEY_PREFIX}:{job_id}"
+
+    async def save(self, job: BroadcastJob):
+        fields = {
+            "text": job.text,
+            "photo_file_id": job.photo_file_id,
+            "status": job.status.value,
+            "total": job.total,
+            "created_at": job.created_at,
+            "cursor": job.cursor,
+            "sent": job.sent,
+            "failed": job.failed,
+            "admin_chat_id": job.admin_chat_id,
+            "status_message_id": job.status_message_id,
+        }
+        await self.redis.hset(
+            self._get_key(job.job_id),
+            mapping={
+                key: "" if value is None else value
+                for key, value in fields.items()
+            }
+        )
+
+    async def get(self, job_id: str) -> Optional[BroadcastJob]:
+        data = await self.redis.hgetall(self._get_key(job_id))
+        if not data:
+            return None
+
+        fields = {key.decode(): value.decode() for key, value in data.items()}
+
+        def optional_int(key: str) -> Optional[int]:
+            return int(fields[key]) if fields.get(key) else None
+
+        return BroadcastJob(
+            job_id=job_id,
+            text=fields["text"] or None,
+            photo_file_id=fields["photo_file_id"] or None,
+            status=BroadcastStatus(fields["status"]),
+            total=int(fields["total"]),
+            created_at=fields["created_at"],
+            cursor=optional_int("cursor"),
+            sent=int(fields["sent"]),
+            failed=int(fields["failed"]),
+            admin_chat_id=optional_int("admin_chat_id"),
+            status_message_id=optional_int("status_message_id"),
+        )
+
+    async def set_status(self, job_id: str, status: BroadcastStatus):
+        await self.redis.hset(self._get_key(job_id), "status", status.value)
+
+    async def replace_status(
+        self,
+        job_id: str,
+        expected: BroadcastStatus,
+        status: BroadcastStatus
+    ) -> bool:
+        """
+        Меняет статус, только если он всё ещё expected. Проверка и запись
+        атомарны (WATCH/MULTI): отмена между ними не потеряется.
+        """
+        key = self._get_key(job_id)
+        async with self.redis.pipeline(transaction=True) as pipeline:
+            while True:
+                try:
+                    await pipeline.watch(key)
+                    current = await pipeline.hget(key, "status")
+                    if current is None or current.decode() != expected.value:
+                        return False
+
+                    pipeline.multi()
+                    pipeline.hset(key, "status", status.value)
+                    await pipeline.execute()
+                    return True
+
+                except WatchError:
+                    # Хэш изменился между проверкой и записью - проверяем снова
+                    continue
+
+    async def set_status_message(self, job_id: str, message_id: int):
+        await self.redis.hset(
+            self._get_key(job_id),
+            "status_message_id",
+            message_id
+        )
+
+    async def checkpoint(self, job_id: str, cursor: int, sent: int, failed: int):
+        await self.redis.hset(
+            self._get_key(job_id),
+            mapping={"cursor": cursor, "sent": sent, "failed": failed}
+        )
+
+    async def add_active(self, job_id: str):
+        await self.redis.sadd(ACTIVE_JOBS_KEY, job_id)
+
+    async def remove_active(self, job_id: str):
+        await self.redis.srem(ACTIVE_JOBS_KEY, job_id)
+
+    async def get_active_ids(self) -> List[str]:
+        return [
+            job_id.decode()
+            for job_id in await self.redis.smembers(ACTIVE_JOBS_KEY)
+        ]
+
+
+async def send_broadcast_message(
+    bot: Bot,
+    user_id: int,
+    photo_file_id: Optional[str],
+    text: Optional[str]
+) -> bool:
+    if photo_file_id is None and text is None:
+        raise NoBroadcastDataError()
+    try:
+        # Флуд-лимиты и повторы - забота конвейера отправки
+        if photo_file_id is None:
+            await bot.send_message(chat_id=user_id, text=text)
+        else:
+            await bot.send_photo(
+                photo=photo_file_id,
+                chat_id=user_id,
+                caption=text
+            )
+
+    except exceptions.TelegramAPIError:
+        LOGGER.info(f"Target [ID:{user_id}]: failed")
+        return False
+
+    return True
+
+
+def format_broadcast_progress(progress: BroadcastProgress) -> str:
+    job = progress.job
+
+    if progress.eta is None:
+        eta = "-"
+    else:
+        minutes, seconds = divmod(int(progress.eta.total_seconds()), 60)
+        hours, minutes = divmod(minutes, 60)
+        eta = f"{hours}:{minutes:02d}:{seconds:02d}"
+
+    return messages.BROADCAST_PROGRESS.format(
+        status=BROADCAST_STATUS_RU_TRANSLATIONS[job.status],
+        done=job.done,
+        total=job.total,
+        sent=job.sent,
+        failed=job.failed,
+        throughput=progress.throughput,
+        eta=eta
+    )
+
+
+class BroadcastManager:
+    """Запуск, пауза, отмена и возобновление рассылок после перезапуска."""
+
+    def __init__(
+        self,
+        store: BroadcastStore,
+        bot: Bot,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+        max_concurrent_sends: int = MAX_CONCURRENT_SENDS
+    ):
+        self.store = store
+        self.bot = bot
+        self.page_size = page_size
+        self.progress_interval = progress_interval
+        self.max_concurrent_sends = max_concurrent_sends
+
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Момент запуска в этом процессе и сколько было сделано к нему -
+        # для скорости и оставшегося времени
+        self._runs: Dict[str, Tuple[float, int]] = {}
+
+    async def create(
+        self,
+        text: Optional[str],
+        photo_file_id: Optional[str],
+        admin_chat_id: Optional[int] = None
+    ) -> BroadcastJob:
+        if photo_file_id is None and text is None:
+            raise NoBroadcastDataError()
+
+        job = BroadcastJob(
+            job_id=uuid.uuid4().hex[:12],
+            text=text,
+            photo_file_id=photo_file_id,
+            status=BroadcastStatus.RUNNING,
+            total=await asyncio.to_thread(
+                audience.count_users,
+                audience.deliverable()
+            ),
+            created_at=datetime.utcnow().strftime(DATETIME_FORMAT),
+            admin_chat_id=admin_chat_id
+        )
+        await self.store.save(job)
+        await self.store.add_active(job.job_id)
+
+        self._start(job.job_id)
+        return job
+
+    def _start(self, job_id: str):
+        task = self._tasks.get(job_id)
+        if task is not None and not task.done():
+            return
+
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def pause(self, job_id: str):
+        await self.store.set_status(job_id, BroadcastStatus.PAUSED)
+
+    async def resume(self, job_id: str):
+        job = await self.store.get(job_id)
+        if job is None or job.status != BroadcastStatus.PAUSED:
+            return
+
+        await self.store.set_status(job_id, BroadcastStatus.RUNNING)
+        self._start(job_id)
+
+    async def cancel(self, job_id: str):
+        await self.store.set_status(job_id, BroadcastStatus.CANCELLED)
+        await self.store.remove_active(job_id)
+
+    async def set_status_message(self, job_id: str, message_id: int):
+        await self.store.set_status_message(job_id, message_id)
+
+    async def resume_all(self):
+        """Продолжает рассылки, прерванные перезапуском."""
+        for job_id in await self.store.get_active_ids():
+            job = await self.store.get(job_id)
+            if job is None:
+                await self.store.remove_active(job_id)
+
+            elif job.status == BroadcastStatus.RUNNING:
+                LOGGER.info(
+                    f"Resuming broadcast {job_id} after user {job.cursor}"
+                )
+                self._start(job_id)
+
+    def shutdown(self):
+        for task in self._tasks.values():
+            task.cancel()
+
+    async def get_progress(self, job_id: str) -> Optional[BroadcastProgress]:
+        job = await self.store.get(job_id)
+        if job is None:
+            return None
+
+        throughput = 0.0
+        if job_id in self._runs:
+            started_at, done_at_start = self._runs[job_id]
+            elapsed = time.monotonic() - started_at
+            if elapsed > 0:
+                throughput = (job.done - done_at_start) / elapsed
+
+        eta = None
+        if job.status == BroadcastStatus.RUNNING and throughput > 0:
+            eta = timedelta(
+                seconds=max(job.total - job.done, 0) / throughput
+            )
+
+        return BroadcastProgress(job=job, throughput=throughput, eta=eta)
+
+    async def _run(self, job_id: str):
+        job = await self.store.get(job_id)
+        if job is None:
+            return
+
+        self._runs[job_id] = (time.monotonic(), job.done)
+        semaphore = asyncio.Semaphore(self.max_concurrent_sends)
+
+        async def send(user_id: int) -> bool:
+            async with semaphore:
+                return await send_broadcast_message(
+                    self.bot,
+                    user_id,
+                    job.photo_file_id,
+                    job.text
+                )
+
+        cursor, sent, failed = job.cursor, job.sent, job.failed
+        last_report = time.monotonic()
+
+        with send_priority(SendPriority.BROADCAST):
+            while True:
+                status = (await self.store.get(job_id)).status
+                if status != BroadcastStatus.RUNNING:
+                    await self._report(job_id)
+                    return
+
+                user_ids = await asyncio.to_thread(
+                    audience.get_user_ids_page,
+                    cursor,
+                    self.page_size,
+                    audience.deliverable()
+                )
+                if not user_ids:
+                    break
+
+                results = await asyncio.gather(
+                    *[send(user_id) for user_id in user_ids]
+                )
+                cursor = user_ids[-1]
+                sent += sum(results)
+                failed += len(results) - sum(results)
+                await self.store.checkpoint(job_id, cursor, sent, failed)
+
+                if time.monotonic() - last_report >= self.progress_interval:
+                    await self._report(job_id)
+                    last_report = time.monotonic()
+
+        # Пауза или отмена могла прийти, пока уходила последняя страница
+        finished = await self.store.replace_status(
+            job_id,
+            BroadcastStatus.RUNNING,
+            BroadcastStatus.FINISHED
+        )
+        if not finished:
+            await self._report(job_id)
+            return
+
+        await self.store.remove_active(job_id)
+        await self._report(job_id)
+        await self._send_statistic(job_id)
+        LOGGER.info(f"Broadcast {job_id}: {sent} sent, {failed} failed")
+
+    async def _report(self, job_id: str):
+        """Обновляет сообщение с прогрессом у администратора."""
+        progress = await self.get_progress(job_id)
+        job = progress.job
+        if job.admin_chat_id is None or job.status_message_id is None:
+            return
+
+        if job.status in (BroadcastStatus.RUNNING, BroadcastStatus.PAUSED):
+            reply_markup = keyboards.broadcast_control(
+                job_id,
+                paused=job.status == BroadcastStatus.PAUSED
+            )
+        else:
+            reply_markup = keyboards.back_to_adminpanel()
+
+        try:
+            with send_priority(SendPriority.INTERACTIVE):
+                await self.bot.edit_message_text(
+                    text=format_broadcast_progress(progress),
+                    chat_id=job.admin_chat_id,
+                    message_id=job.status_message_id,
+                    reply_markup=reply_markup
+                )
+        except exceptions.TelegramBadRequest:
+            # Текст не изменился или сообщение удалено
+            pass
+
+    async def _send_statistic(self, job_id: str):
+        job = await self.store.get(job_id)
+        if job.admin_chat_id is None:
+            return
+
+        start = datetime.strptime(job.created_at, DATETIME_FORMAT)
+        with send_priority(SendPriority.INTERACTIVE):
+            await self.bot.send_message(
+                chat_id=job.admin_chat_id,
+                text=messages.BROADCAST_STATISTIC.format(
+                    dead_users=job.failed,
+                    active_users=job.sent,
+                    broadcast_start_date_Moskow=(
+                        start + MOSCOW_OFFSET
+                    ).strftime(DATETIME_FORMAT),
+                    broadcast_end_date_Moskow=(
+                        datetime.utcnow() + MOSCOW_OFFSET
+                    ).strftime(DATETIME_FORMAT),
+                )
+            )
+
+
+broadcast_manager = BroadcastManager(
+    BroadcastStore(redis),
+    bot,
+    page_size=_get_setting("page_size", DEFAULT_PAGE_SIZE),
+    progress_interval=_get_setting(
+        "progress_interval",
+        DEFAULT_PROGRESS_INTERVAL
+    )
+)
@@ -3,6 +3,11 @@ import dotenv
 
 from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
+from redis.asyncio import Redis
+
+from src import config
+from src.delivery_status import delivery_status_middleware
+from src.send_pipeline import send_pipeline_middleware
 from src.utils import get_day_selection_database
 
 
@@ -11,6 +16,18 @@ dotenv.load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
 bot = Bot(BOT_TOKEN, default=DefaultBotProperties(parse_mode='html'))
+# Все отправки бота идут через общий ограничитель скорости
+bot.session.middleware(send_pipeline_middleware)
+# и отмечают пользователей, до которых сообщения не доходят
+bot.session.middleware(delivery_status_middleware)
+
+try:
+    REDIS_URL = config.get("redis.url")
+except KeyError:
+    REDIS_URL = "redis://localhost:6379"
+
+# Подключение открывается при первой команде
+redis = Redis.from_url(REDIS_URL)
 
 DAY_SELECTION_DATABASE: dict[str, dict] = get_day_selection_database()
 
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from src import config
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _get_setting(key: str, default: Any) -> Any:
+    try:
+        return config.get(f"compute_pool.{key}")
+    except KeyError:
+        return default
+
+
+def _warm_up_worker():
+    """
+    Инициализация процесса пула: импорт движка и текстов трактовок,
+    загрузка картинок для отрисовки, файлов эфемерид, календаря ингрессий
+    и сетки транзитов на дни ежедневных прогнозов (вчера - послезавтра).
+    Остальные сутки, например для таймлайна подбора дней, строятся по
+    первому запросу и остаются в кэше.
+    """
+    from src.astro_engine.ephemeris import get_day_grid, get_day_number
+    from src.astro_engine.ingress import ingress_calendar
+    from src.astro_engine.utils import get_juliday
+    from src.enums import SwissEphPlanet
+    from src.image_processing.generate_images import preload_assets
+    from src.routers.user.prediction import text_formatting  # noqa: F401
+
+    preload_assets()
+
+    now = get_juliday(datetime.utcnow())
+    ingress_calendar.get_sign(SwissEphPlanet.MOON, now)
+
+    today = get_day_number(now)
+    for day_number in range(today - 1, today + 3):
+        get_day_grid(day_number)
+
+
+class ComputePool:
+    """
+    Пул процессов для тяжёлых вычислений астродвижка.
+
+    Задачи выполняются в отдельных процессах, поэтому не держат GIL
+    основного процесса и не делят глобальное состояние pyswisseph между
+    потоками. Число задач в работе и в очереди ограничено семафором,
+    на каждую задачу есть таймаут. Пока пул не запущен (тесты, скрипты),
+    задачи выполняются в пуле потоков.
+
+    Таймаут прекращает ожидание, но не останавливает уже начатое
+    вычисление, поэтому место в семафоре освобождается только когда
+    задача действительно завершилась (или отменена, не начавшись).
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue_size: int = 100,
+        task_timeout: float = 60
+    ):
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.max_queue_size = max_queue_size
+        self.task_timeout = task_timeout
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._thread_executor = ThreadPoolExecutor(
+            max_workers=self.max_workers
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self):
+        if self._executor is not None:
+            return
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up_worker
+        )
+        LOGGER.info(f"Compute pool started with {self.max_workers} workers")
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is None:
+            return
+
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._executor = None
+        LOGGER.info("Compute pool stopped")
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Выполнить func(*args) в пуле. Функция и аргументы должны
+        сериализоваться pickle: объявленные на уровне модуля функции,
+        датаклассы, а не объекты ORM.
+
+        Если задач больше, чем воркеров и мест в очереди, вызов ждёт
+        освобождения места. По таймауту бросает asyncio.TimeoutError.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(
+                self.max_workers + self.max_queue_size
+            )
+
+        await self._semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            task = (executor or self._thread_executor).submit(func, *args)
+        except BrokenProcessPool:
+            self._semaphore.release()
+            self._restart(executor)
+            raise
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+        task.add_done_callback(lambda _: self._release(loop))
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(task),
+                self.task_timeout
+            )
+
+        except asyncio.TimeoutError:
+            LOGGER.error(
+                f"Compute pool task {func.__name__} timed out "
+                f"after {self.task_timeout} s"
+            )
+            raise
+
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+
+    def _release(self, loop: asyncio.AbstractEventLoop):
+        """Вызывается из потока пула, когда задача завершилась."""
+        try:
+            loop.call_soon_threadsafe(self._semaphore.release)
+        except RuntimeError:
+            # Цикл событий уже закрыт
+            pass
+
+    def _restart(self, failed_executor: Optional[ProcessPoolExecutor]):
+        """
+        Процесс воркера упал - пересоздаём пул для следующих задач.
+        Ошибку видят все задачи упавшего пула, а пересоздаёт его только
+        первая: остальные не трогают уже новый пул и задачи в нём.
+        """
+        if failed_executor is None or self._executor is not failed_executor:
+            return
+
+        LOGGER.error("Compute pool is broken, restarting")
+        self.shutdown(wait=False)
+        self.start()
+
+
+compute_pool = ComputePool(
+    max_workers=_get_setting("max_workers", 0),
+    max_queue_size=_get_setting("max_queue_size", 100),
+    task_timeout=_get_setting("task_timeout", 60)
+)
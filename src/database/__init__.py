@@ -1,3 +1,4 @@
-from .database import Session
+from .database import AsyncSession, Session
 from . import crud as Database
+from . import async_crud as AsyncDatabase
 from .utils import schedule_backup
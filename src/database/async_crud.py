@@ -0,0 +1,1018 @@
+"""
+Асинхронный вариант crud: те же функции с теми же параметрами, но
+через AsyncSession поверх aiosqlite, поэтому запросы не блокируют цикл
+событий.
+
+Обработчики переводятся по одному: вместо
+
+    async def handler(message: Message, database):
+        user = database.get_user(message.from_user.id)
+
+принимают async_database (модуль передаётся в Dispatcher) и ждут вызов:
+
+    async def handler(message: Message, async_database):
+        user = await async_database.get_user(message.from_user.id)
+
+Функции, которые в crud принимают сессию, здесь принимают AsyncSession.
+У асинхронной сессии нет ленивой подгрузки связей, поэтому пользователь
+загружается сразу с местоположениями.
+"""
+import json
+import logging
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.exc import DatabaseError, IntegrityError
+
+from src.astro_engine.models import AstroEvent
+from src.astro_engine.models import Location as PredictionLocation
+from src.astro_engine.models import NatalChart as AstroNatalChart
+from src.astro_engine.models import TimePeriod
+from src.astro_engine.models import User as PredictionUser
+from src.astro_engine.predictions import get_natal_chart as calculate_natal_chart
+from src.enums import DeliveryStatus, PaymentStatus, SwissEphPlanet
+from src.utils import get_timezone_offset, generate_random_sha1_key
+
+from .crud import (
+    ADMIN_LIST,
+    BIRTH_DATA_FIELDS,
+    DATETIME_FORMAT,
+    GATEBOT_SYNC_ISO_FORMAT,
+    SQL_IN_CHUNK_SIZE,
+    TIMELINE_DATETIME_FORMAT,
+    USER_LOCATIONS,
+    VOID_OF_COURSE_DATETIME_FORMAT,
+    _parse_iso_utc
+)
+from .database import AsyncSession
+from .models import (
+    CardOfDay,
+    GeneralPrediction,
+    Interpretation,
+    Location,
+    NatalChart,
+    Payment,
+    PendingSubscription,
+    Promocode,
+    ReminderSchedule,
+    TransitEvent,
+    TransitTimeline,
+    User,
+    ViewedPrediction,
+    VoidOfCoursePeriod
+)
+
+
+async def _get_user(session: AsyncSession, user_id: int) -> Optional[User]:
+    return await session.scalar(
+        select(User).options(*USER_LOCATIONS).filter_by(user_id=user_id)
+    )
+
+
+async def add_user(session: AsyncSession, user: User):
+    try:
+        session.add(user)
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        if user.user_id in ADMIN_LIST:
+            # Повторная регистрация - данные рождения могли поменяться
+            await _delete_natal_data(session, user.user_id)
+            await session.merge(user)
+            await session.commit()
+
+
+async def get_user(
+    user_id: int,
+    session: Optional[AsyncSession] = None
+) -> Optional[User]:
+    if session is not None:
+        return await _get_user(session, user_id)
+
+    async with AsyncSession() as session:
+        return await _get_user(session, user_id)
+
+
+async def update_user_last_seen(user_id: int, moment: datetime):
+    """Пользователь написал боту - заодно его чат снова доступен."""
+    async with AsyncSession() as session:
+        await session.execute(
+            update(User).where(User.user_id == user_id).values(
+                last_seen_at=moment,
+                delivery_status=None,
+                delivery_failed_at=None
+            )
+        )
+        await session.commit()
+
+
+async def update_user_delivery_status(
+    user_id: int,
+    status: DeliveryStatus,
+    moment: datetime
+):
+    async with AsyncSession() as session:
+        await session.execute(
+            update(User).where(User.user_id == user_id).values(
+                delivery_status=status.value,
+                delivery_failed_at=moment
+            )
+        )
+        await session.commit()
+
+
+async def get_user_delivery_status(user_id: int) -> Optional[DeliveryStatus]:
+    async with AsyncSession() as session:
+        status = await session.scalar(
+            select(User.delivery_status).filter_by(user_id=user_id)
+        )
+    return DeliveryStatus(status) if status is not None else None
+
+
+async def get_user_ids_by_prediction_minutes(
+    session: AsyncSession,
+    minutes: List[int]
+) -> List[int]:
+    """
+    Пользователи с доступным чатом, чей ежедневный прогноз приходится
+    на минуты UTC.
+    """
+    result = await session.scalars(
+        select(User.user_id).filter(
+            User.prediction_utc_minute.in_(minutes),
+            User.delivery_status.is_(None)
+        )
+    )
+    return list(result)
+
+
+async def get_reminder_schedule_changes(
+    session: AsyncSession,
+    user_id: Optional[int] = None,
+    limit: Optional[int] = None
+) -> tuple[
+    List[tuple[int, Optional[str], Optional[str]]],
+    List[tuple[int, Optional[str]]]
+]:
+    """См. crud.get_reminder_schedule_changes."""
+    changed = select(
+        User.user_id,
+        User.subscription_end_date,
+        ReminderSchedule.subscription_end_date
+    ).outerjoin(
+        ReminderSchedule,
+        ReminderSchedule.user_id == User.user_id
+    ).filter(
+        or_(
+            ReminderSchedule.user_id.is_(None),
+            ReminderSchedule.subscription_end_date.is_distinct_from(
+                User.subscription_end_date
+            )
+        )
+    )
+
+    deleted = select(
+        ReminderSchedule.user_id,
+        ReminderSchedule.subscription_end_date
+    ).outerjoin(
+        User,
+        User.user_id == ReminderSchedule.user_id
+    ).filter(
+        User.user_id.is_(None)
+    )
+
+    if user_id is not None:
+        changed = changed.filter(User.user_id == user_id)
+        deleted = deleted.filter(ReminderSchedule.user_id == user_id)
+
+    if limit is not None:
+        changed = changed.order_by(User.user_id).limit(limit)
+        deleted = deleted.order_by(ReminderSchedule.user_id).limit(limit)
+
+    return (
+        [tuple(row) for row in await session.execute(changed)],
+        [tuple(row) for row in await session.execute(deleted)]
+    )
+
+
+async def update_reminder_schedules(
+    session: AsyncSession,
+    changed: List[tuple[int, Optional[str], Optional[str]]],
+    deleted: List[tuple[int, Optional[str]]]
+):
+    """Запоминает, по каким датам теперь запланированы напоминания."""
+    user_ids = [row[0] for row in changed] + [row[0] for row in deleted]
+    for start in range(0, len(user_ids), SQL_IN_CHUNK_SIZE):
+        await session.execute(
+            delete(ReminderSchedule).where(
+                ReminderSchedule.user_id.in_(
+                    user_ids[start:start + SQL_IN_CHUNK_SIZE]
+                )
+            )
+        )
+
+    if changed:
+        await session.execute(
+            insert(ReminderSchedule),
+            [
+                {
+                    "user_id": user_id,
+                    "subscription_end_date": subscription_end_date,
+                }
+                for user_id, subscription_end_date, _ in changed
+            ]
+        )
+
+    await session.commit()
+
+
+async def update_user(user_id: int, **kwargs):
+    """
+    Обновление данных пользователя.
+
+    :param user_id: Идентификатор пользователя для обновления.
+    :param kwargs: Словарь с атрибутами и их новыми значениями.
+    """
+    async with AsyncSession() as session:
+        try:
+            user = await _get_user(session, user_id)
+            if not user:
+                logging.warning(f"Пользователь с ID {user_id} не найден.")
+                return False
+
+            for key, value in kwargs.items():
+                if hasattr(user, key):
+                    setattr(user, key, value)
+                else:
+                    logging.warning(
+                        f"Атрибут {key} не существует в модели User."
+                    )
+
+            # Натальная карта и таймлайн устарели вместе с данными рождения
+            if any(key in kwargs for key in BIRTH_DATA_FIELDS):
+                await _delete_natal_data(session, user_id)
+
+            await session.commit()
+            return True
+        except IntegrityError:
+            logging.error(
+                "Ошибка целостности данных при обновлении пользователя."
+            )
+            await session.rollback()
+            return False
+        except Exception as e:
+            logging.error(f"Ошибка при обновлении пользователя: {e}")
+            await session.rollback()
+            return False
+
+
+async def get_natal_chart(user_id: int) -> Optional[AstroNatalChart]:
+    """См. crud.get_natal_chart."""
+    async with AsyncSession() as session:
+        chart = await session.get(NatalChart, user_id)
+        if chart:
+            return AstroNatalChart(
+                birth_datetime_utc=datetime.strptime(
+                    chart.birth_datetime_utc,
+                    DATETIME_FORMAT
+                ),
+                birth_timezone_offset=chart.birth_timezone_offset,
+                positions={
+                    SwissEphPlanet(int(planet)): longitude
+                    for planet, longitude in json.loads(chart.positions).items()
+                }
+            )
+
+        user = await _get_user(session, user_id)
+        if not user:
+            return None
+
+        natal_chart = calculate_natal_chart(
+            PredictionUser(
+                birth_datetime=datetime.strptime(
+                    user.birth_datetime,
+                    DATETIME_FORMAT
+                ),
+                birth_location=PredictionLocation(
+                    longitude=user.birth_location.longitude,
+                    latitude=user.birth_location.latitude
+                ),
+                current_location=PredictionLocation(
+                    longitude=user.current_location.longitude,
+                    latitude=user.current_location.latitude
+                ),
+            )
+        )
+
+        await session.merge(
+            NatalChart(
+                user_id=user_id,
+                birth_datetime_utc=natal_chart.birth_datetime_utc.strftime(
+                    DATETIME_FORMAT
+                ),
+                birth_timezone_offset=natal_chart.birth_timezone_offset,
+                positions=json.dumps(
+                    {
+                        int(planet): longitude
+                        for planet, longitude in natal_chart.positions.items()
+                    }
+                )
+            )
+        )
+        await session.commit()
+
+        return natal_chart
+
+
+async def delete_natal_chart(user_id: int):
+    async with AsyncSession() as session:
+        await _delete_natal_data(session, user_id)
+        await session.commit()
+
+
+async def _delete_natal_data(session: AsyncSession, user_id: int):
+    """Удаляет всё, что посчитано от данных рождения пользователя."""
+    for model in (NatalChart, TransitEvent, TransitTimeline):
+        await session.execute(delete(model).filter_by(user_id=user_id))
+
+
+async def get_transit_timeline(user_id: int) -> Optional[TransitTimeline]:
+    async with AsyncSession() as session:
+        return await session.get(TransitTimeline, user_id)
+
+
+async def add_transit_events(
+    user_id: int,
+    events: List[AstroEvent],
+    computed_from: datetime,
+    computed_until: datetime
+):
+    """
+    Добавляет события в таймлайн пользователя и сдвигает его границы.
+    События старше computed_from удаляются.
+    """
+    computed_from_str = computed_from.strftime(TIMELINE_DATETIME_FORMAT)
+
+    async with AsyncSession() as session:
+        await session.execute(
+            delete(TransitEvent).where(
+                TransitEvent.user_id == user_id,
+                TransitEvent.peak_at < computed_from_str
+            )
+        )
+
+        for event in events:
+            await session.merge(
+                TransitEvent(
+                    user_id=user_id,
+                    natal_planet=int(event.natal_planet),
+                    transit_planet=int(event.transit_planet),
+                    aspect=event.aspect,
+                    peak_at=event.peak_at.strftime(TIMELINE_DATETIME_FORMAT)
+                )
+            )
+
+        await session.merge(
+            TransitTimeline(
+                user_id=user_id,
+                computed_from=computed_from_str,
+                computed_until=computed_until.strftime(
+                    TIMELINE_DATETIME_FORMAT
+                )
+            )
+        )
+        await session.commit()
+
+
+async def get_transit_events(
+    user_id: int,
+    aspects: List[tuple[int, int, List[int]]],
+    start: datetime,
+    finish: datetime
+) -> List[AstroEvent]:
+    """
+    События таймлайна пользователя за [start, finish) по списку
+    (натальная планета, транзитная планета, аспекты).
+    """
+    if not aspects:
+        return []
+
+    async with AsyncSession() as session:
+        rows = await session.scalars(
+            select(TransitEvent).filter(
+                TransitEvent.user_id == user_id,
+                TransitEvent.peak_at >= start.strftime(
+                    TIMELINE_DATETIME_FORMAT
+                ),
+                TransitEvent.peak_at < finish.strftime(
+                    TIMELINE_DATETIME_FORMAT
+                ),
+                or_(*[
+                    and_(
+                        TransitEvent.natal_planet == natal_planet,
+                        TransitEvent.transit_planet == transit_planet,
+                        TransitEvent.aspect.in_(degrees)
+                    )
+                    for natal_planet, transit_planet, degrees in aspects
+                ])
+            ).order_by(TransitEvent.peak_at)
+        )
+
+        return [
+            AstroEvent(
+                natal_planet=SwissEphPlanet(row.natal_planet),
+                transit_planet=SwissEphPlanet(row.transit_planet),
+                aspect=row.aspect,
+                peak_at=datetime.strptime(row.peak_at, TIMELINE_DATETIME_FORMAT)
+            )
+            for row in rows
+        ]
+
+
+# Void of course calendar
+
+
+async def add_void_of_course_periods(periods: List[TimePeriod]):
+    async with AsyncSession() as session:
+        for period in periods:
+            await session.merge(
+                VoidOfCoursePeriod(
+                    start=period.start.strftime(VOID_OF_COURSE_DATETIME_FORMAT),
+                    end=period.end.strftime(VOID_OF_COURSE_DATETIME_FORMAT)
+                )
+            )
+        await session.commit()
+
+
+async def get_void_of_course_periods(
+    start: datetime,
+    finish: datetime
+) -> List[TimePeriod]:
+    """Периоды холостой луны (UTC), пересекающиеся с [start, finish)."""
+    async with AsyncSession() as session:
+        rows = await session.scalars(
+            select(VoidOfCoursePeriod).filter(
+                VoidOfCoursePeriod.end > start.strftime(
+                    VOID_OF_COURSE_DATETIME_FORMAT
+                ),
+                VoidOfCoursePeriod.start < finish.strftime(
+                    VOID_OF_COURSE_DATETIME_FORMAT
+                )
+            ).order_by(VoidOfCoursePeriod.start)
+        )
+
+        return [
+            TimePeriod(
+                start=datetime.strptime(
+                    row.start,
+                    VOID_OF_COURSE_DATETIME_FORMAT
+                ),
+                end=datetime.strptime(row.end, VOID_OF_COURSE_DATETIME_FORMAT)
+            )
+            for row in rows
+        ]
+
+
+async def get_void_of_course_calendar_span() -> Optional[TimePeriod]:
+    """Начало первого и конец последнего посчитанных периодов."""
+    async with AsyncSession() as session:
+        start, end = (
+            await session.execute(
+                select(
+                    func.min(VoidOfCoursePeriod.start),
+                    func.max(VoidOfCoursePeriod.end)
+                )
+            )
+        ).one()
+        if start is None:
+            return None
+        return TimePeriod(
+            start=datetime.strptime(start, VOID_OF_COURSE_DATETIME_FORMAT),
+            end=datetime.strptime(end, VOID_OF_COURSE_DATETIME_FORMAT)
+        )
+
+
+async def delete_void_of_course_periods(before: datetime):
+    async with AsyncSession() as session:
+        await session.execute(
+            delete(VoidOfCoursePeriod).where(
+                VoidOfCoursePeriod.end < before.strftime(
+                    VOID_OF_COURSE_DATETIME_FORMAT
+                )
+            )
+        )
+        await session.commit()
+
+
+async def update_user_every_day_prediction_time(
+    user_id: int,
+    hour: int,
+    minute: int
+):
+    async with AsyncSession() as session:
+        user = await _get_user(session, user_id)
+        if user:
+            user.every_day_prediction_time = "{:02d}:{:02d}".format(hour, minute)
+            await session.commit()
+
+
+async def update_user_current_location(
+    session: AsyncSession,
+    user_id: int,
+    new_location: Location
+):
+    user = await _get_user(session, user_id)
+
+    if user:
+        old_location_id = user.current_location_id
+
+        # Добавляем новое местоположение и получаем его ID
+        new_location_id = await add_location(new_location)
+
+        # Обновляем ID текущего местоположения пользователя
+        user.current_location_id = new_location_id
+
+        # Удаляем старое местоположение
+        old_location = await session.get(Location, old_location_id)
+
+        if old_location:
+            await session.delete(old_location)
+
+        await session.commit()
+
+    else:
+        logging.info(f"User with ID {user_id} not found.")
+
+
+async def update_user_card_of_day(
+    user_id: int, card_message_id: int, card_update_time: str
+):
+    async with AsyncSession() as session:
+        user = await _get_user(session, user_id)
+        if user:
+            user.last_card_update = card_update_time
+            user.card_message_id = card_message_id
+            await session.commit()
+
+
+async def delete_user(user_id: int):
+    async with AsyncSession() as session:
+        user = await _get_user(session, user_id)
+        if user:
+            await _delete_natal_data(session, user_id)
+            await session.delete(user)
+            await session.commit()
+
+
+async def add_period_to_subscription_end_date(user_id: int, period: timedelta):
+    async with AsyncSession() as session:
+        user = await _get_user(session, user_id)
+        if user and user.current_location:
+            time_offset = get_timezone_offset(
+                user.current_location.latitude,
+                user.current_location.longitude
+            )
+            now = datetime.utcnow() + timedelta(hours=time_offset)
+            current_user_subscription_end_date = datetime.strptime(
+                user.subscription_end_date, DATETIME_FORMAT
+            )
+            start = max([current_user_subscription_end_date, now])
+            user.subscription_end_date = (start + period).strftime(
+                DATETIME_FORMAT
+            )
+            await session.commit()
+
+
+async def update_subscription_end_date(user_id: int, date: datetime):
+    async with AsyncSession() as session:
+        user = await _get_user(session, user_id)
+        if user:
+            new_subscription_end_date = date
+            if user.current_location:
+                time_offset: int = get_timezone_offset(
+                    user.current_location.latitude,
+                    user.current_location.longitude
+                )
+                new_subscription_end_date = date + timedelta(hours=time_offset)
+            user.subscription_end_date = new_subscription_end_date.strftime(
+                DATETIME_FORMAT
+            )
+            await session.commit()
+
+
+async def change_user_gender(user_id: int, gender: str | None):
+    async with AsyncSession() as session:
+        user = await _get_user(session, user_id)
+        if user:
+            user.gender = gender
+            await session.commit()
+
+
+# Location table methods
+
+async def add_location(location: Location) -> int:
+    """
+    Метод используется для добавления локации в список.
+    Тип может быть "birth" или "current".
+    """
+    async with AsyncSession() as session:
+        session.add(location)
+        await session.commit()
+        return location.id
+
+
+async def get_location(location_id: int) -> Location:
+    async with AsyncSession() as session:
+        location = await session.get(Location, location_id)
+        if location:
+            return location
+        raise Exception(
+            "Чет локейшн в табличке с юзерами записан, а самой локации нет. "
+            f"Айди - {location_id}"
+        )
+
+
+async def update_location(location: Location):
+    async with AsyncSession() as session:
+        existing_location = await session.get(Location, location.id)
+        if existing_location:
+            existing_location.longitude = location.longitude
+            existing_location.latitude = location.latitude
+            await session.commit()
+
+
+async def delete_location(location_id: int):
+    async with AsyncSession() as session:
+        location = await session.get(Location, location_id)
+        if location:
+            await session.delete(location)
+            await session.commit()
+
+
+# Interpretations table methods
+async def get_interpretation(
+    natal_planet: str, transit_planet: str, aspect: str
+) -> Optional[str]:
+    async with AsyncSession() as session:
+        return await session.scalar(
+            select(Interpretation.interpretation).filter_by(
+                natal_planet=natal_planet,
+                transit_planet=transit_planet,
+                aspect=aspect
+            ).limit(1)
+        )
+
+
+async def add_or_update_interpretation(interpretation_obj: Interpretation):
+    async with AsyncSession() as session:
+        existing_interpretation = await session.scalar(
+            select(Interpretation).filter_by(
+                natal_planet=interpretation_obj.natal_planet,
+                transit_planet=interpretation_obj.transit_planet,
+                aspect=interpretation_obj.aspect,
+            ).limit(1)
+        )
+        if existing_interpretation:
+            existing_interpretation.interpretation = (
+                interpretation_obj.interpretation
+            )
+        else:
+            session.add(interpretation_obj)
+        await session.commit()
+
+
+# General Predictions
+
+
+async def add_general_prediction(date: str, prediction: str):
+    async with AsyncSession() as session:
+        try:
+            await session.merge(
+                GeneralPrediction(date=date, prediction=prediction)
+            )
+            await session.commit()
+        except DatabaseError:
+            await session.rollback()
+
+
+async def get_general_prediction(date: str) -> Optional[str]:
+    async with AsyncSession() as session:
+        return await session.scalar(
+            select(GeneralPrediction.prediction).filter_by(date=date).limit(1)
+        )
+
+
+async def delete_general_prediction(date: str) -> Optional[str]:
+    async with AsyncSession() as session:
+        prediction = await session.get(GeneralPrediction, date)
+        if prediction:
+            await session.delete(prediction)
+            await session.commit()
+        else:
+            raise Exception(f"Нет прогноза для указанной даты: {date}")
+
+
+# Viewed Predictions
+async def add_viewed_prediction(user_id: int, prediction_date: str):
+    async with AsyncSession() as session:
+        try:
+            session.add(
+                ViewedPrediction(
+                    user_id=user_id,
+                    prediction_date=prediction_date,
+                    view_timestamp=datetime.utcnow().strftime(DATETIME_FORMAT),
+                )
+            )
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+
+
+async def get_viewed_predictions_by_user(user_id: int) -> list:
+    async with AsyncSession() as session:
+        rows = await session.execute(
+            select(
+                ViewedPrediction.prediction_date,
+                ViewedPrediction.view_timestamp
+            ).filter_by(user_id=user_id)
+        )
+        return [tuple(row) for row in rows]
+
+
+async def get_unviewed_predictions_count(
+    session: AsyncSession,
+    user_id: int
+) -> int:
+    user = await _get_user(session, user_id)
+
+    if not user or not user.current_location:
+        return 0
+
+    time_offset: int = get_timezone_offset(
+        user.current_location.latitude,
+        user.current_location.longitude
+    )
+    now = datetime.utcnow() + timedelta(hours=time_offset)
+
+    subscription_end_date = datetime.strptime(
+        user.subscription_end_date,
+        DATETIME_FORMAT
+    )
+    if subscription_end_date < now:
+        return 0
+
+    days_left = (subscription_end_date - now).days + 1
+
+    viewed_dates_strings = await session.scalars(
+        select(ViewedPrediction.prediction_date).filter(
+            ViewedPrediction.user_id == user_id
+        )
+    )
+    viewed_dates_count = len([
+        date
+        for date in viewed_dates_strings
+        if datetime.strptime(date, "%d.%m.%Y") >= now
+    ])
+
+    return max(0, days_left - viewed_dates_count)
+
+
+async def delete_viewed_prediction(user_id: int, prediction_date: str):
+    async with AsyncSession() as session:
+        prediction = await session.get(
+            ViewedPrediction,
+            (user_id, prediction_date)
+        )
+        if prediction:
+            await session.delete(prediction)
+            await session.commit()
+
+
+# Cards of Day table methods
+
+async def add_card_of_day(message_id: int) -> None:
+    async with AsyncSession() as session:
+        session.add(CardOfDay(message_id=message_id))
+        await session.commit()
+
+
+async def get_all_card_of_day() -> List[int]:
+    async with AsyncSession() as session:
+        return list(await session.scalars(select(CardOfDay.message_id)))
+
+
+async def delete_card_of_day(message_id: int) -> None:
+    async with AsyncSession() as session:
+        card_of_day = await session.get(CardOfDay, message_id)
+        if card_of_day:
+            await session.delete(card_of_day)
+            await session.commit()
+
+
+# Payments
+
+async def add_payment(payment: Payment):
+    async with AsyncSession() as session:
+        session.add(payment)
+        await session.commit()
+
+
+async def update_payment(payment_id: int, **kwargs):
+    async with AsyncSession() as session:
+        payment = await session.get(Payment, payment_id)
+        if not payment:
+            raise ValueError(f"No payment found with id {payment_id}")
+
+        for key, value in kwargs.items():
+            if hasattr(payment, key):
+                setattr(payment, key, value)
+
+        await session.commit()
+
+
+async def get_payments(session: AsyncSession, **filters) -> List[Payment]:
+    return list(await session.scalars(select(Payment).filter_by(**filters)))
+
+
+async def get_all_payments(session: AsyncSession, **filters) -> List[Payment]:
+    return list(await session.scalars(select(Payment)))
+
+
+async def get_payment(payment_id: str) -> Payment:
+    async with AsyncSession() as session:
+        payments = await session.scalars(
+            select(Payment).filter_by(payment_id=payment_id)
+        )
+        return payments.one()
+
+
+async def get_promocode(promocode_str: str) -> Promocode:
+    async with AsyncSession() as session:
+        return await session.get(Promocode, promocode_str)
+
+
+async def get_promocodes(session: AsyncSession, **filters) -> List[Promocode]:
+    return list(await session.scalars(select(Promocode).filter_by(**filters)))
+
+
+async def add_promocode(promocode_obj: Promocode):
+    async with AsyncSession() as session:
+        try:
+            session.add(promocode_obj)
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            raise
+
+
+async def update_promocode(promocode_str: str, **kwargs):
+    async with AsyncSession() as session:
+        try:
+            promocode = await session.get(Promocode, promocode_str)
+            if not promocode:
+                raise ValueError("Промокод не найден")
+
+            for key, value in kwargs.items():
+                if hasattr(promocode, key):
+                    setattr(promocode, key, value)
+                else:
+                    raise AttributeError(
+                        f"Атрибут '{key}' не существует в объекте Promocode"
+                    )
+
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+
+async def get_not_occupied_payment_id():
+    async with AsyncSession() as session:
+        while True:
+            hashcode = generate_random_sha1_key()
+            if await session.get(Payment, hashcode) is None:
+                return hashcode
+
+
+async def get_not_occupied_promocode():
+    async with AsyncSession() as session:
+        while True:
+            hashcode = generate_random_sha1_key()
+            if await session.get(Promocode, hashcode) is None:
+                return hashcode
+
+
+async def get_payment_status(payment_id: str) -> PaymentStatus:
+    payment = await get_payment(payment_id)
+
+    utcnow = datetime.utcnow()
+    payment_created_at = datetime.strptime(payment.created_at, DATETIME_FORMAT)
+    actual_payment_status = PaymentStatus(payment.status)
+
+    seven_hours_ago = utcnow - timedelta(hours=7)
+    if (
+        payment_created_at < seven_hours_ago
+        and
+        actual_payment_status == PaymentStatus.PENDING
+    ):
+        await update_payment(payment_id, status=PaymentStatus.FAILED.value)
+        return PaymentStatus.FAILED
+
+    return actual_payment_status
+
+
+async def get_clients(session: AsyncSession) -> int:
+    return await session.scalar(
+        select(func.count(func.distinct(Payment.user_id))).join(
+            User,
+            User.user_id == Payment.user_id
+        ).filter(
+            Payment.status == PaymentStatus.SUCCESS.value
+        )
+    )
+
+
+# Gatebot subscription sync
+
+async def merge_subscription_for_existing_user(
+    session: AsyncSession, user_id: int, incoming_utc: datetime
+) -> bool:
+    """См. crud.merge_subscription_for_existing_user."""
+    user = await _get_user(session, user_id)
+    if user is None:
+        return False
+    if user.current_location is None:
+        logging.warning(
+            "Gatebot sync: user %s has no current_location; "
+            "cannot translate UTC -> local time, skipping merge",
+            user_id,
+        )
+        return False
+    time_offset = get_timezone_offset(
+        user.current_location.latitude, user.current_location.longitude
+    )
+    incoming_local = incoming_utc + timedelta(hours=time_offset)
+    current_local: Optional[datetime] = None
+    if user.subscription_end_date:
+        try:
+            current_local = datetime.strptime(
+                user.subscription_end_date, DATETIME_FORMAT
+            )
+        except ValueError:
+            current_local = None
+    if current_local is not None and current_local >= incoming_local:
+        return False
+    user.subscription_end_date = incoming_local.strftime(DATETIME_FORMAT)
+    await session.commit()
+    logging.info(
+        "Gatebot sync: extended subscription for user %s until %s (local)",
+        user_id, user.subscription_end_date,
+    )
+    return True
+
+
+async def upsert_pending_subscription(
+    session: AsyncSession, user_id: int, incoming_utc: datetime
+) -> None:
+    """Store the latest gatebot subscription end (UTC) for an unknown user."""
+    incoming_str = incoming_utc.strftime(GATEBOT_SYNC_ISO_FORMAT)
+    existing = await session.get(PendingSubscription, user_id)
+    if existing is None:
+        session.add(
+            PendingSubscription(
+                user_id=user_id,
+                subscription_end_date_utc=incoming_str,
+            )
+        )
+        await session.commit()
+        logging.info(
+            "Gatebot sync: pending subscription stored for unknown user %s",
+            user_id,
+        )
+        return
+
+    existing_dt = _parse_iso_utc(existing.subscription_end_date_utc)
+    if existing_dt is None or incoming_utc > existing_dt:
+        existing.subscription_end_date_utc = incoming_str
+        await session.commit()
+
+
+async def apply_pending_subscription_to_user(
+    session: AsyncSession,
+    user_id: int
+) -> bool:
+    """См. crud.apply_pending_subscription_to_user."""
+    pending = await session.get(PendingSubscription, user_id)
+    if pending is None:
+        return False
+    incoming_utc = _parse_iso_utc(pending.subscription_end_date_utc)
+    if incoming_utc is None:
+        await session.delete(pending)
+        await session.commit()
+        return False
+    await merge_subscription_for_existing_user(session, user_id, incoming_utc)
+    await session.delete(pending)
+    await session.commit()
+    return True
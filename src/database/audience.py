@@ -0,0 +1,151 @@
+"""
+Выборка аудитории для рассылок и обходов планировщика.
+
+Сегмент - условие SQLAlchemy над User, сегменты комбинируются через
+and_/or_/~ и передаются в функции выборки. id пользователей отдаются
+страницами по возрастанию user_id (keyset-пагинация), каждая страница -
+в своей короткой сессии, поэтому память и время удержания базы не
+зависят от числа пользователей.
+
+    for user_ids in iter_user_ids(active_subscription(now), seen_since(day)):
+        ...
+"""
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from sqlalchemy import String, and_, exists, func, or_
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.sql.elements import ColumnElement
+
+from src.enums import DeliveryStatus, PaymentStatus
+
+from .database import Session as MainSession
+from .models import Payment, User
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+Segment = ColumnElement[bool]
+
+
+def _sortable_datetime(column) -> ColumnElement[str]:
+    """
+    Дата "%d.%m.%Y %H:%M" из строкового столбца в виде "%Y-%m-%d %H:%M",
+    который сравнивается как строка.
+    """
+    def part(start: int, length: int):
+        return func.substr(column, start, length, type_=String)
+
+    return (
+        part(7, 4) + "-" + part(4, 2) + "-" + part(1, 2) + " " + part(12, 5)
+    )
+
+
+def active_subscription(now: datetime) -> Segment:
+    """Подписка (оплаченная или пробная) ещё действует."""
+    return and_(
+        User.subscription_end_date.isnot(None),
+        _sortable_datetime(User.subscription_end_date)
+        > now.strftime("%Y-%m-%d %H:%M")
+    )
+
+
+def paying_clients() -> Segment:
+    """Хотя бы одна успешная оплата."""
+    return exists().where(
+        Payment.user_id == User.user_id,
+        Payment.status == PaymentStatus.SUCCESS.value
+    )
+
+
+def trial_users(now: datetime) -> Segment:
+    """Действующая подписка без единой оплаты."""
+    return and_(active_subscription(now), ~paying_clients())
+
+
+def timezone_offset_between(min_offset: int, max_offset: int) -> Segment:
+    """Часовой пояс от min_offset до max_offset включительно."""
+    return User.timezone_offset.between(min_offset, max_offset)
+
+
+def deliverable() -> Segment:
+    """Бот не заблокирован, аккаунт и чат существуют."""
+    return User.delivery_status.is_(None)
+
+
+def undeliverable(status: Optional[DeliveryStatus] = None) -> Segment:
+    """Сообщения не доходят (по любой причине или по status)."""
+    if status is None:
+        return User.delivery_status.isnot(None)
+    return User.delivery_status == status.value
+
+
+def seen_since(moment: datetime) -> Segment:
+    return User.last_seen_at >= moment
+
+
+def not_seen_since(moment: datetime) -> Segment:
+    return or_(User.last_seen_at.is_(None), User.last_seen_at < moment)
+
+
+def get_user_ids_page(
+    after: Optional[int],
+    limit: int,
+    *segments: Segment
+) -> List[int]:
+    """Следующие limit id пользователей сегмента после after."""
+    with MainSession() as session:
+        query = session.query(User.user_id).filter(*segments)
+        if after is not None:
+            query = query.filter(User.user_id > after)
+
+        rows = query.order_by(User.user_id).limit(limit).all()
+        return [row[0] for row in rows]
+
+
+def iter_user_ids(
+    *segments: Segment,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[List[int]]:
+    """Все id пользователей сегмента страницами по batch_size."""
+    after = None
+    while True:
+        user_ids = get_user_ids_page(after, batch_size, *segments)
+        if not user_ids:
+            return
+
+        yield user_ids
+        after = user_ids[-1]
+
+
+def iter_users(
+    session: Session,
+    *segments: Segment,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[List[User]]:
+    """
+    Пользователи сегмента с местоположениями страницами по batch_size.
+    Объекты прошлых страниц сессия не держит, если их не держит вызывающий.
+    """
+    after = None
+    while True:
+        query = session.query(User).options(
+            selectinload(User.birth_location),
+            selectinload(User.current_location)
+        ).filter(*segments)
+        if after is not None:
+            query = query.filter(User.user_id > after)
+
+        users = query.order_by(User.user_id).limit(batch_size).all()
+        if not users:
+            return
+
+        yield users
+        after = users[-1].user_id
+
+
+def count_users(*segments: Segment) -> int:
+    with MainSession() as session:
+        return session.query(func.count(User.user_id)).filter(
+            *segments
+        ).scalar()
@@ -1,26 +1,41 @@
+import json
 import logging
 
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from sqlalchemy import select
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError, DatabaseError
+from sqlalchemy.orm import joinedload
 
 from src import config
-from src.enums import PaymentStatus
+from src.astro_engine.models import AstroEvent
+from src.astro_engine.models import Location as PredictionLocation
+from src.astro_engine.models import NatalChart as AstroNatalChart
+from src.astro_engine.models import TimePeriod
+from src.astro_engine.models import User as PredictionUser
+from src.astro_engine.predictions import get_natal_chart as calculate_natal_chart
+from src.enums import DeliveryStatus, PaymentStatus, SwissEphPlanet
 from src.utils import get_timezone_offset, generate_random_sha1_key
 
 from .database import Session
+from .unit_of_work import discard_changes, save_changes, session_scope
 from .models import (
     CardOfDay,
     GeneralPrediction,
     Interpretation,
     Location,
+    NatalChart,
     Payment,
     PendingSubscription,
     Promocode,
+    ReminderSchedule,
+    TransitEvent,
+    TransitTimeline,
     User,
-    ViewedPrediction
+    ViewedPrediction,
+    VoidOfCoursePeriod
 )
 
 
@@ -29,28 +44,186 @@ DATE_FORMAT: str = config.get("database.date_format")
 ADMIN_LIST: list[int] = config.get("admins.ids")
 
 GATEBOT_SYNC_ISO_FORMAT = "%Y-%m-%dT%H:%M:%S"
+# Сортируемый строкой формат для таблиц таймлайна транзитов
+TIMELINE_DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+VOID_OF_COURSE_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-global_session = Session()
+# Не больше стольких значений в одном IN (...) для SQLite
+SQL_IN_CHUNK_SIZE = 500
+
+# Поля пользователя, от которых зависит натальная карта
+BIRTH_DATA_FIELDS = ("birth_datetime", "birth_location", "birth_location_id")
+
+# Местоположения нужны почти везде, где нужен пользователь, а объект
+# короткой сессии вне единицы работы подгрузить их уже не сможет
+USER_LOCATIONS = (
+    joinedload(User.birth_location),
+    joinedload(User.current_location)
+)
 
 
 def add_user(session: Session, user: User):
-    try:
+    # Проверка до вставки: ошибка целостности внутри единицы работы
+    # откатила бы всё обновление
+    if session.get(User, user.user_id) is None:
         session.add(user)
-        session.commit()
-    except IntegrityError:
-        if user.user_id in ADMIN_LIST:
-            session.merge(user)
-        else:
-            session.rollback()
+    elif user.user_id in ADMIN_LIST:
+        # Повторная регистрация - данные рождения могли поменяться
+        _delete_natal_data(session, user.user_id)
+        session.merge(user)
+    else:
+        return
+    save_changes(session)
 
 
-def get_users():
-    with Session() as session:
-        return session.query(User).all()
+def get_user(user_id: int, session: Optional[Session] = None) -> User:
+    """
+    Внутри единицы работы повторный вызов отдаёт пользователя из карты
+    идентичности без запроса.
+    """
+    if session is not None:
+        return session.get(User, user_id, options=USER_LOCATIONS)
+
+    with session_scope() as session:
+        return session.get(User, user_id, options=USER_LOCATIONS)
+
+
+def update_user_last_seen(user_id: int, moment: datetime):
+    """Пользователь написал боту - заодно его чат снова доступен."""
+    with session_scope() as session:
+        session.query(User).filter_by(user_id=user_id).update(
+            {
+                User.last_seen_at: moment,
+                User.delivery_status: None,
+                User.delivery_failed_at: None,
+            },
+            synchronize_session=False
+        )
+        save_changes(session)
+
 
+def update_user_delivery_status(
+    user_id: int,
+    status: DeliveryStatus,
+    moment: datetime
+):
+    with session_scope() as session:
+        session.query(User).filter_by(user_id=user_id).update(
+            {
+                User.delivery_status: status.value,
+                User.delivery_failed_at: moment,
+            },
+            synchronize_session=False
+        )
+        save_changes(session)
 
-def get_user(user_id: int, session: Session = global_session) -> User:
-    return session.query(User).filter_by(user_id=user_id).first()
+
+def get_user_delivery_status(user_id: int) -> Optional[DeliveryStatus]:
+    with session_scope() as session:
+        status = session.query(User.delivery_status).filter_by(
+            user_id=user_id
+        ).scalar()
+    return DeliveryStatus(status) if status is not None else None
+
+
+def get_user_ids_by_prediction_minutes(
+    session: Session,
+    minutes: List[int]
+) -> List[int]:
+    """
+    Пользователи с доступным чатом, чей ежедневный прогноз приходится
+    на минуты UTC.
+    """
+    rows = session.query(User.user_id).filter(
+        User.prediction_utc_minute.in_(minutes),
+        User.delivery_status.is_(None)
+    ).all()
+    return [row[0] for row in rows]
+
+
+def get_reminder_schedule_changes(
+    session: Session,
+    user_id: Optional[int] = None,
+    limit: Optional[int] = None
+) -> tuple[
+    List[tuple[int, Optional[str], Optional[str]]],
+    List[tuple[int, Optional[str]]]
+]:
+    """
+    Расхождения напоминаний с данными пользователей (всех или одного):
+    - пользователи, чьи напоминания запланированы не по текущей дате
+      окончания подписки: id, текущая и запланированная даты;
+    - удалённые пользователи с запланированными напоминаниями: id и
+      запланированная дата.
+    С limit - не больше limit тех и других с наименьшими id.
+    """
+    changed = session.query(
+        User.user_id,
+        User.subscription_end_date,
+        ReminderSchedule.subscription_end_date
+    ).outerjoin(
+        ReminderSchedule,
+        ReminderSchedule.user_id == User.user_id
+    ).filter(
+        or_(
+            ReminderSchedule.user_id.is_(None),
+            ReminderSchedule.subscription_end_date.is_distinct_from(
+                User.subscription_end_date
+            )
+        )
+    )
+
+    deleted = session.query(
+        ReminderSchedule.user_id,
+        ReminderSchedule.subscription_end_date
+    ).outerjoin(
+        User,
+        User.user_id == ReminderSchedule.user_id
+    ).filter(
+        User.user_id.is_(None)
+    )
+
+    if user_id is not None:
+        changed = changed.filter(User.user_id == user_id)
+        deleted = deleted.filter(ReminderSchedule.user_id == user_id)
+
+    if limit is not None:
+        changed = changed.order_by(User.user_id).limit(limit)
+        deleted = deleted.order_by(ReminderSchedule.user_id).limit(limit)
+
+    return (
+        [tuple(row) for row in changed.all()],
+        [tuple(row) for row in deleted.all()]
+    )
+
+
+def update_reminder_schedules(
+    session: Session,
+    changed: List[tuple[int, Optional[str], Optional[str]]],
+    deleted: List[tuple[int, Optional[str]]]
+):
+    """Запоминает, по каким датам теперь запланированы напоминания."""
+    user_ids = [row[0] for row in changed] + [row[0] for row in deleted]
+    for start in range(0, len(user_ids), SQL_IN_CHUNK_SIZE):
+        session.query(ReminderSchedule).filter(
+            ReminderSchedule.user_id.in_(
+                user_ids[start:start + SQL_IN_CHUNK_SIZE]
+            )
+        ).delete(synchronize_session=False)
+
+    if changed:
+        session.execute(
+            insert(ReminderSchedule),
+            [
+                {
+                    "user_id": user_id,
+                    "subscription_end_date": subscription_end_date,
+                }
+                for user_id, subscription_end_date, _ in changed
+            ]
+        )
+
+    save_changes(session)
 
 
 def update_user(user_id: int, **kwargs):
@@ -60,7 +233,7 @@ def update_user(user_id: int, **kwargs):
     :param user_id: Идентификатор пользователя для обновления.
     :param kwargs: Словарь с атрибутами и их новыми значениями.
     """
-    with Session() as session:
+    with session_scope() as session:
         try:
             # Найти пользователя по ID
             user = session.query(User).filter_by(user_id=user_id).first()
@@ -77,31 +250,261 @@ def update_user(user_id: int, **kwargs):
                         f"Атрибут {key} не существует в модели User."
                     )
 
+            # Натальная карта и таймлайн устарели вместе с данными рождения
+            if any(key in kwargs for key in BIRTH_DATA_FIELDS):
+                _delete_natal_data(session, user_id)
+
             # Сохранить изменения
-            session.commit()
+            save_changes(session)
             return True
         except IntegrityError:
             logging.error(
                 "Ошибка целостности данных при обновлении пользователя."
             )
-            session.rollback()
+            discard_changes(session)
             return False
         except Exception as e:
             logging.error(f"Ошибка при обновлении пользователя: {e}")
-            session.rollback()
+            discard_changes(session)
             return False
 
 
+def get_natal_chart(user_id: int) -> Optional[AstroNatalChart]:
+    """
+    Натальная карта пользователя. Считается один раз и хранится в БД
+    до изменения данных рождения (см. update_user и add_user).
+    """
+    with session_scope() as session:
+        chart = session.query(NatalChart).filter_by(user_id=user_id).first()
+        if chart:
+            return AstroNatalChart(
+                birth_datetime_utc=datetime.strptime(
+                    chart.birth_datetime_utc,
+                    DATETIME_FORMAT
+                ),
+                birth_timezone_offset=chart.birth_timezone_offset,
+                positions={
+                    SwissEphPlanet(int(planet)): longitude
+                    for planet, longitude in json.loads(chart.positions).items()
+                }
+            )
+
+        user = session.query(User).filter_by(user_id=user_id).first()
+        if not user:
+            return None
+
+        natal_chart = calculate_natal_chart(
+            PredictionUser(
+                birth_datetime=datetime.strptime(
+                    user.birth_datetime,
+                    DATETIME_FORMAT
+                ),
+                birth_location=PredictionLocation(
+                    longitude=user.birth_location.longitude,
+                    latitude=user.birth_location.latitude
+                ),
+                current_location=PredictionLocation(
+                    longitude=user.current_location.longitude,
+                    latitude=user.current_location.latitude
+                ),
+            )
+        )
+
+        session.merge(
+            NatalChart(
+                user_id=user_id,
+                birth_datetime_utc=natal_chart.birth_datetime_utc.strftime(
+                    DATETIME_FORMAT
+                ),
+                birth_timezone_offset=natal_chart.birth_timezone_offset,
+                positions=json.dumps(
+                    {
+                        int(planet): longitude
+                        for planet, longitude in natal_chart.positions.items()
+                    }
+                )
+            )
+        )
+        save_changes(session)
+
+        return natal_chart
+
+
+def delete_natal_chart(user_id: int):
+    with session_scope() as session:
+        _delete_natal_data(session, user_id)
+        save_changes(session)
+
+
+def _delete_natal_data(session: Session, user_id: int):
+    """Удаляет всё, что посчитано от данных рождения пользователя."""
+    session.query(NatalChart).filter_by(user_id=user_id).delete()
+    session.query(TransitEvent).filter_by(user_id=user_id).delete()
+    session.query(TransitTimeline).filter_by(user_id=user_id).delete()
+
+
+def get_transit_timeline(user_id: int) -> Optional[TransitTimeline]:
+    with session_scope() as session:
+        return session.query(TransitTimeline).filter_by(user_id=user_id).first()
+
+
+def add_transit_events(
+    user_id: int,
+    events: List[AstroEvent],
+    computed_from: datetime,
+    computed_until: datetime
+):
+    """
+    Добавляет события в таймлайн пользователя и сдвигает его границы.
+    События старше computed_from удаляются.
+    """
+    computed_from_str = computed_from.strftime(TIMELINE_DATETIME_FORMAT)
+
+    with session_scope() as session:
+        session.query(TransitEvent).filter(
+            TransitEvent.user_id == user_id,
+            TransitEvent.peak_at < computed_from_str
+        ).delete()
+
+        for event in events:
+            session.merge(
+                TransitEvent(
+                    user_id=user_id,
+                    natal_planet=int(event.natal_planet),
+                    transit_planet=int(event.transit_planet),
+                    aspect=event.aspect,
+                    peak_at=event.peak_at.strftime(TIMELINE_DATETIME_FORMAT)
+                )
+            )
+
+        session.merge(
+            TransitTimeline(
+                user_id=user_id,
+                computed_from=computed_from_str,
+                computed_until=computed_until.strftime(
+                    TIMELINE_DATETIME_FORMAT
+                )
+            )
+        )
+        save_changes(session)
+
+
+def get_transit_events(
+    user_id: int,
+    aspects: List[tuple[int, int, List[int]]],
+    start: datetime,
+    finish: datetime
+) -> List[AstroEvent]:
+    """
+    События таймлайна пользователя за [start, finish) по списку
+    (натальная планета, транзитная планета, аспекты).
+    """
+    if not aspects:
+        return []
+
+    with session_scope() as session:
+        rows = session.query(TransitEvent).filter(
+            TransitEvent.user_id == user_id,
+            TransitEvent.peak_at >= start.strftime(TIMELINE_DATETIME_FORMAT),
+            TransitEvent.peak_at < finish.strftime(TIMELINE_DATETIME_FORMAT),
+            or_(*[
+                and_(
+                    TransitEvent.natal_planet == natal_planet,
+                    TransitEvent.transit_planet == transit_planet,
+                    TransitEvent.aspect.in_(degrees)
+                )
+                for natal_planet, transit_planet, degrees in aspects
+            ])
+        ).order_by(TransitEvent.peak_at).all()
+
+        return [
+            AstroEvent(
+                natal_planet=SwissEphPlanet(row.natal_planet),
+                transit_planet=SwissEphPlanet(row.transit_planet),
+                aspect=row.aspect,
+                peak_at=datetime.strptime(row.peak_at, TIMELINE_DATETIME_FORMAT)
+            )
+            for row in rows
+        ]
+
+
+# Void of course calendar
+
+
+def add_void_of_course_periods(periods: List[TimePeriod]):
+    with session_scope() as session:
+        for period in periods:
+            session.merge(
+                VoidOfCoursePeriod(
+                    start=period.start.strftime(VOID_OF_COURSE_DATETIME_FORMAT),
+                    end=period.end.strftime(VOID_OF_COURSE_DATETIME_FORMAT)
+                )
+            )
+        save_changes(session)
+
+
+def get_void_of_course_periods(
+    start: datetime,
+    finish: datetime
+) -> List[TimePeriod]:
+    """Периоды холостой луны (UTC), пересекающиеся с [start, finish)."""
+    with session_scope() as session:
+        rows = session.query(VoidOfCoursePeriod).filter(
+            VoidOfCoursePeriod.end > start.strftime(
+                VOID_OF_COURSE_DATETIME_FORMAT
+            ),
+            VoidOfCoursePeriod.start < finish.strftime(
+                VOID_OF_COURSE_DATETIME_FORMAT
+            )
+        ).order_by(VoidOfCoursePeriod.start).all()
+
+        return [
+            TimePeriod(
+                start=datetime.strptime(
+                    row.start,
+                    VOID_OF_COURSE_DATETIME_FORMAT
+                ),
+                end=datetime.strptime(row.end, VOID_OF_COURSE_DATETIME_FORMAT)
+            )
+            for row in rows
+        ]
+
+
+def get_void_of_course_calendar_span() -> Optional[TimePeriod]:
+    """Начало первого и конец последнего посчитанных периодов."""
+    with session_scope() as session:
+        start, end = session.query(
+            func.min(VoidOfCoursePeriod.start),
+            func.max(VoidOfCoursePeriod.end)
+        ).one()
+        if start is None:
+            return None
+        return TimePeriod(
+            start=datetime.strptime(start, VOID_OF_COURSE_DATETIME_FORMAT),
+            end=datetime.strptime(end, VOID_OF_COURSE_DATETIME_FORMAT)
+        )
+
+
+def delete_void_of_course_periods(before: datetime):
+    with session_scope() as session:
+        session.query(VoidOfCoursePeriod).filter(
+            VoidOfCoursePeriod.end < before.strftime(
+                VOID_OF_COURSE_DATETIME_FORMAT
+            )
+        ).delete()
+        save_changes(session)
+
+
 def update_user_every_day_prediction_time(
     user_id: int,
     hour: int,
     minute: int
 ):
-    with Session() as session:
+    with session_scope() as session:
         user = session.query(User).filter_by(user_id=user_id).first()
         if user:
             user.every_day_prediction_time = "{:02d}:{:02d}".format(hour, minute)
-            session.commit()
+            save_changes(session)
 
 
 def update_user_current_location(
@@ -126,7 +529,7 @@ def update_user_current_location(
         if old_location:
             session.delete(old_location)
 
-        session.commit()
+        save_changes(session)
 
     else:
         logging.info(f"User with ID {user_id} not found.")
@@ -135,24 +538,25 @@ def update_user_current_location(
 def update_user_card_of_day(
     user_id: int, card_message_id: int, card_update_time: str
 ):
-    with Session() as session:
+    with session_scope() as session:
         user = session.query(User).filter_by(user_id=user_id).first()
         if user:
             user.last_card_update = card_update_time
             user.card_message_id = card_message_id
-            session.commit()
+            save_changes(session)
 
 
 def delete_user(user_id: int):
-    with Session() as session:
+    with session_scope() as session:
         user = session.query(User).filter_by(user_id=user_id).first()
         if user:
+            _delete_natal_data(session, user_id)
             session.delete(user)
-            session.commit()
+            save_changes(session)
 
 
 def add_period_to_subscription_end_date(user_id: int, period: timedelta):
-    with Session() as session:
+    with session_scope() as session:
         user = session.query(User).filter_by(user_id=user_id).first()
         if user:
             current_location = (
@@ -170,11 +574,11 @@ def add_period_to_subscription_end_date(user_id: int, period: timedelta):
                 )
                 start = max([current_user_subscription_end_date, now])
                 user.subscription_end_date = (start + period).strftime(DATETIME_FORMAT)
-                session.commit()
+                save_changes(session)
 
 
 def update_subscription_end_date(user_id: int, date: datetime):
-    with Session() as session:
+    with session_scope() as session:
         user = session.query(User).filter_by(user_id=user_id).first()
         if user:
             current_location = (
@@ -190,15 +594,15 @@ def update_subscription_end_date(user_id: int, date: datetime):
             user.subscription_end_date = new_subscription_end_date.strftime(
                 DATETIME_FORMAT
             )
-            session.commit()
+            save_changes(session)
 
 
 def change_user_gender(user_id: int, gender: str | None):
-    with Session() as session:
+    with session_scope() as session:
         user = session.query(User).filter_by(user_id=user_id).first()
         if user:
             user.gender = gender
-            session.commit()
+            save_changes(session)
 
 
 # Location table methods
@@ -208,15 +612,15 @@ def add_location(location: Location) -> int:
     Метод используется для добавления локации в список.
     Тип может быть "birth" или "current".
     """
-    with Session() as session:
+    with session_scope() as session:
 
         session.add(location)
-        session.commit()
+        save_changes(session)
         return location.id
 
 
 def get_location(location_id: int) -> Location:
-    with Session() as session:
+    with session_scope() as session:
         location = session.query(Location).filter_by(id=location_id).first()
         if location:
             return location
@@ -227,29 +631,29 @@ def get_location(location_id: int) -> Location:
 
 
 def update_location(location: Location):
-    with Session() as session:
+    with session_scope() as session:
         existing_location = (
             session.query(Location).filter_by(id=location.id).first()
         )
         if existing_location:
             existing_location.longitude = location.longitude
             existing_location.latitude = location.latitude
-            session.commit()
+            save_changes(session)
 
 
 def delete_location(location_id: int):
-    with Session() as session:
+    with session_scope() as session:
         location = session.query(Location).filter_by(id=location_id).first()
         if location:
             session.delete(location)
-            session.commit()
+            save_changes(session)
 
 
 # Interpretations table methods
 def get_interpretation(
     natal_planet: str, transit_planet: str, aspect: str
 ) -> Optional[str]:
-    with Session() as session:
+    with session_scope() as session:
         interpretation = (
             session.query(Interpretation)
             .filter_by(
@@ -265,7 +669,7 @@ def get_interpretation(
 
 
 def add_or_update_interpretation(interpretation_obj: Interpretation):
-    with Session() as session:
+    with session_scope() as session:
         existing_interpretation = (
             session.query(Interpretation)
             .filter_by(
@@ -279,24 +683,24 @@ def add_or_update_interpretation(interpretation_obj: Interpretation):
             existing_interpretation.interpretation = interpretation_obj.interpretation
         else:
             session.add(interpretation_obj)
-        session.commit()
+        save_changes(session)
 
 
 # General Predictions
 
 
 def add_general_prediction(date: str, prediction: str):
-    with Session() as session:
+    with session_scope() as session:
         try:
             general_prediction = GeneralPrediction(date=date, prediction=prediction)
             session.merge(general_prediction)
-            session.commit()
+            save_changes(session)
         except DatabaseError:
-            session.rollback()
+            discard_changes(session)
 
 
 def get_general_prediction(date: str) -> Optional[str]:
-    with Session() as session:
+    with session_scope() as session:
         prediction = session.query(
             GeneralPrediction
         ).filter_by(date=date).first()
@@ -304,34 +708,33 @@ def get_general_prediction(date: str) -> Optional[str]:
 
 
 def delete_general_prediction(date: str) -> Optional[str]:
-    with Session() as session:
+    with session_scope() as session:
         prediction = session.query(
             GeneralPrediction
         ).filter_by(date=date).first()
         if prediction:
             session.delete(prediction)
-            session.commit()
+            save_changes(session)
         else:
             raise Exception(f"Нет прогноза для указанной даты: {date}")
 
 
 # Viewed Predictions
 def add_viewed_prediction(user_id: int, prediction_date: str):
-    with Session() as session:
-        try:
-            viewed_prediction = ViewedPrediction(
+    with session_scope() as session:
+        # Повторный просмотр не ошибка: единица работы не откатывается
+        session.execute(
+            sqlite_insert(ViewedPrediction).values(
                 user_id=user_id,
                 prediction_date=prediction_date,
                 view_timestamp=datetime.utcnow().strftime(DATETIME_FORMAT),
-            )
-            session.add(viewed_prediction)
-            session.commit()
-        except IntegrityError:
-            session.rollback()
+            ).on_conflict_do_nothing()
+        )
+        save_changes(session)
 
 
 def get_viewed_predictions_by_user(user_id: int) -> list:
-    with Session() as session:
+    with session_scope() as session:
         predictions = (
             session.query(ViewedPrediction).filter_by(user_id=user_id).all()
         )
@@ -386,7 +789,7 @@ def get_unviewed_predictions_count(session: Session, user_id: int) -> int:
 
 
 def delete_viewed_prediction(user_id: int, prediction_date: str):
-    with Session() as session:
+    with session_scope() as session:
         prediction = (
             session.query(ViewedPrediction)
             .filter_by(user_id=user_id, prediction_date=prediction_date)
@@ -394,44 +797,44 @@ def delete_viewed_prediction(user_id: int, prediction_date: str):
         )
         if prediction:
             session.delete(prediction)
-            session.commit()
+            save_changes(session)
 
 
 # Cards of Day table methods
 
 def add_card_of_day(message_id: int) -> None:
-    with Session() as session:
+    with session_scope() as session:
         card_of_day = CardOfDay(message_id=message_id)
         session.add(card_of_day)
-        session.commit()
+        save_changes(session)
 
 
 def get_all_card_of_day() -> List[int]:
-    with Session() as session:
+    with session_scope() as session:
         cards = session.query(CardOfDay).all()
         return [card.message_id for card in cards]
 
 
 def delete_card_of_day(message_id: int) -> None:
-    with Session() as session:
+    with session_scope() as session:
         card_of_day = session.query(
             CardOfDay
         ).filter_by(message_id=message_id).first()
         if card_of_day:
             session.delete(card_of_day)
-            session.commit()
+            save_changes(session)
 
 
 # Payments
 
 def add_payment(payment: Payment):
-    with Session() as session:
+    with session_scope() as session:
         session.add(payment)
-        session.commit()
+        save_changes(session)
 
 
 def update_payment(payment_id: int, **kwargs):
-    with Session() as session:
+    with session_scope() as session:
         payment = session.query(Payment).filter_by(
             payment_id=payment_id
         ).first()
@@ -442,7 +845,7 @@ def update_payment(payment_id: int, **kwargs):
             if hasattr(payment, key):
                 setattr(payment, key, value)
 
-        session.commit()
+        save_changes(session)
 
 
 def get_payments(session: Session, **filters) -> List[Payment]:
@@ -454,7 +857,7 @@ def get_all_payments(session: Session, **filters) -> List[Payment]:
 
 
 def get_payment(payment_id: str) -> Payment:
-    with Session() as session:
+    with session_scope() as session:
         return session.query(
             Payment
         ).filter_by(
@@ -463,7 +866,7 @@ def get_payment(payment_id: str) -> Payment:
 
 
 def get_promocode(promocode_str: str) -> Promocode:
-    with Session() as session:
+    with session_scope() as session:
         return session.query(Promocode).filter_by(
             promocode=promocode_str
         ).first()
@@ -474,20 +877,20 @@ def get_promocodes(session: Session, **filters) -> List[Promocode]:
 
 
 def add_promocode(promocode_obj: Promocode):
-    with Session() as session:
+    with session_scope() as session:
         try:
             # Добавить объект Promocode в сессию
             session.add(promocode_obj)
             # Сохранить изменения
-            session.commit()
+            save_changes(session)
         except IntegrityError:
             # Если произошла ошибка, откатить изменения
-            session.rollback()
+            discard_changes(session)
             raise
 
 
 def update_promocode(promocode_str: str, **kwargs):
-    with Session() as session:
+    with session_scope() as session:
         try:
             # Найти промокод в базе данных
             promocode = (
@@ -508,15 +911,15 @@ def update_promocode(promocode_str: str, **kwargs):
                     )
 
             # Сохранить изменения
-            session.commit()
+            save_changes(session)
         except Exception as e:
             # Если произошла ошибка, откатить изменения
-            session.rollback()
+            discard_changes(session)
             raise e
 
 
 def get_not_occupied_payment_id():
-    with Session() as session:
+    with session_scope() as session:
         all_payment_ids = session.query(Payment.payment_id).all()
         while True:
             hashcode = generate_random_sha1_key()
@@ -525,7 +928,7 @@ def get_not_occupied_payment_id():
 
 
 def get_not_occupied_promocode():
-    with Session() as session:
+    with session_scope() as session:
         all_payment_ids = session.query(Promocode.promocode).all()
         while True:
             hashcode = generate_random_sha1_key()
@@ -534,7 +937,7 @@ def get_not_occupied_promocode():
 
 
 def get_payment_status(payment_id: str) -> PaymentStatus:
-    with Session() as session:
+    with session_scope() as session:
         payment = session.query(
             Payment
         ).filter_by(
@@ -560,10 +963,6 @@ def get_payment_status(payment_id: str) -> PaymentStatus:
         return actual_payment_status
 
 
-def get_all_users(session: Session) -> List[User]:
-    return session.query(User).all()
-
-
 def get_clients(session: Session) -> int:
     users_with_payments = session.query(
         Payment.user_id
@@ -629,7 +1028,7 @@ def merge_subscription_for_existing_user(
     if current_local is not None and current_local >= incoming_local:
         return False
     user.subscription_end_date = incoming_local.strftime(DATETIME_FORMAT)
-    session.commit()
+    save_changes(session)
     logging.info(
         "Gatebot sync: extended subscription for user %s until %s (local)",
         user_id, user.subscription_end_date,
@@ -654,7 +1053,7 @@ def upsert_pending_subscription(
                 subscription_end_date_utc=incoming_str,
             )
         )
-        session.commit()
+        save_changes(session)
         logging.info(
             "Gatebot sync: pending subscription stored for unknown user %s",
             user_id,
@@ -664,7 +1063,7 @@ def upsert_pending_subscription(
     existing_dt = _parse_iso_utc(existing.subscription_end_date_utc)
     if existing_dt is None or incoming_utc > existing_dt:
         existing.subscription_end_date_utc = incoming_str
-        session.commit()
+        save_changes(session)
 
 
 def apply_pending_subscription_to_user(session: Session, user_id: int) -> bool:
@@ -684,9 +1083,9 @@ def apply_pending_subscription_to_user(session: Session, user_id: int) -> bool:
     incoming_utc = _parse_iso_utc(pending.subscription_end_date_utc)
     if incoming_utc is None:
         session.delete(pending)
-        session.commit()
+        save_changes(session)
         return False
     merge_subscription_for_existing_user(session, user_id, incoming_utc)
     session.delete(pending)
-    session.commit()
+    save_changes(session)
     return True
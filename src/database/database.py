@@ -2,9 +2,11 @@ import logging
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src import config
 from src.database.models import (
@@ -16,7 +18,8 @@ from src.database.models import (
     Payment,
     Promocode,
     User,
-    ViewedPrediction
+    ViewedPrediction,
+    get_utc_minute_of_day
 )
 from src.utils import get_timezone_offset, generate_random_sha1_key
 
@@ -24,15 +27,137 @@ from src.utils import get_timezone_offset, generate_random_sha1_key
 DATETIME_FORMAT: str = config.get("database.datetime_format")
 DATE_FORMAT: str = config.get("database.date_format")
 
-# Initialize the engine
-engine = create_engine("sqlite:///database.db")
+# Initialize the engine. Единица работы держит соединение всё
+# обновление, поэтому пул без верхней границы: ожидание свободного
+# соединения в синхронном коде остановило бы цикл событий, а вместе с
+# ним и обновления, которые это соединение вернут.
+engine = create_engine("sqlite:///database.db", max_overflow=-1)
 
 # Create tables in the database
 Base.metadata.create_all(engine)
 
+
+def _add_prediction_utc_minute_column():
+    """
+    Добавляет users.prediction_utc_minute в базы, созданные до его
+    появления (create_all не меняет существующие таблицы), и заполняет.
+    """
+    columns = [column["name"] for column in inspect(engine).get_columns("users")]
+    if "prediction_utc_minute" in columns:
+        return
+
+    with engine.begin() as connection:
+        connection.execute(
+            text("ALTER TABLE users ADD COLUMN prediction_utc_minute INTEGER")
+        )
+        connection.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_users_prediction_utc_minute "
+                "ON users (prediction_utc_minute)"
+            )
+        )
+        rows = connection.execute(
+            text(
+                "SELECT user_id, every_day_prediction_time, timezone_offset "
+                "FROM users"
+            )
+        ).all()
+        for user_id, local_time, timezone_offset in rows:
+            connection.execute(
+                text(
+                    "UPDATE users SET prediction_utc_minute = :minute "
+                    "WHERE user_id = :user_id"
+                ),
+                {
+                    "minute": get_utc_minute_of_day(local_time, timezone_offset),
+                    "user_id": user_id,
+                }
+            )
+
+    logging.info(f"Filled prediction_utc_minute for {len(rows)} users")
+
+
+def _add_users_column(name: str, sql_type: str, indexed: bool = False):
+    """
+    Добавляет в users столбец, появившийся после создания базы.
+    Значения у существующих пользователей - NULL.
+    """
+    columns = [column["name"] for column in inspect(engine).get_columns("users")]
+    if name in columns:
+        return
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(f"ALTER TABLE users ADD COLUMN {name} {sql_type}")
+        )
+        if indexed:
+            connection.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS ix_users_{name} "
+                    f"ON users ({name})"
+                )
+            )
+
+
+# Версия хранимых расчётов по натальной карте (PRAGMA user_version).
+# 1 - смещение пояса рождения берётся на момент рождения, а не на сегодня.
+ASTRO_DATA_VERSION = 1
+
+
+def _drop_outdated_astro_data():
+    """
+    Удаляет натальные карты и таймлайны транзитов, посчитанные прежней
+    версией: они пересчитаются при следующем обращении.
+    """
+    with engine.begin() as connection:
+        version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+        if version >= ASTRO_DATA_VERSION:
+            return
+
+        for table in ("natal_charts", "transit_events", "transit_timelines"):
+            connection.execute(text(f"DELETE FROM {table}"))
+        connection.exec_driver_sql(f"PRAGMA user_version = {ASTRO_DATA_VERSION}")
+
+    logging.info(f"Dropped natal charts older than version {ASTRO_DATA_VERSION}")
+
+
+# Сегмент paying_clients (audience.py) ищет оплаты пользователя на
+# каждого пользователя выборки
+with engine.begin() as connection:
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_payments_user_id "
+            "ON payments (user_id)"
+        )
+    )
+
+_add_prediction_utc_minute_column()
+_add_users_column("last_seen_at", "DATETIME", indexed=True)
+_add_users_column("delivery_status", "VARCHAR", indexed=True)
+_add_users_column("delivery_failed_at", "DATETIME")
+_drop_outdated_astro_data()
+
 # Create a session
 Session = sessionmaker(bind=engine)
 
+# Читатели не ждут пишущего, а пишущий - читателей. Режим хранится в
+# самом файле базы, включение повторно ничего не меняет.
+with engine.connect() as connection:
+    connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+# Асинхронный доступ к той же базе (см. async_crud). Объекты остаются
+# читаемыми после commit: ленивой подгрузки у асинхронной сессии нет.
+# Пул ограничен: SQLite пишет по одному, и сотня соединений, ждущих
+# блокировку, упирается в "database is locked" вместо очереди за пулом.
+async_engine = create_async_engine(
+    "sqlite+aiosqlite:///database.db",
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=5,
+    max_overflow=0,
+    connect_args={"timeout": 30}
+)
+AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
 
 class Database:
     def add_user(self, user: User):
@@ -1,10 +1,26 @@
-from sqlalchemy import Column, Float, ForeignKey, Integer, String
-from sqlalchemy.orm import relationship, declarative_base
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.orm import relationship, declarative_base, validates
 from sqlalchemy.types import Boolean
 
 
 Base = declarative_base()
 
+MINUTES_IN_DAY = 24 * 60
+
+
+def get_utc_minute_of_day(
+    local_time: Optional[str],
+    timezone_offset: Optional[int]
+) -> Optional[int]:
+    """Минута суток по UTC для местного времени "%H:%M"."""
+    if local_time is None or timezone_offset is None:
+        return None
+
+    hour, minute = map(int, local_time.split(":"))
+    return (hour * 60 + minute - timezone_offset * 60) % MINUTES_IN_DAY
+
 
 class User(Base):
     __tablename__ = "users"
@@ -21,6 +37,9 @@ class User(Base):
     current_location = relationship("Location", foreign_keys=[current_location_id])
 
     every_day_prediction_time = Column(String)  # "%H:%M" as default
+    # Минута суток по UTC, в которую отправляется ежедневный прогноз.
+    # Пересчитывается при изменении времени отправки или часового пояса.
+    prediction_utc_minute = Column(Integer, index=True)
 
     subscription_end_date = Column(String)
 
@@ -31,6 +50,77 @@ class User(Base):
     last_card_update = Column(String)
     card_message_id = Column(Integer)
 
+    # Последнее сообщение или нажатие кнопки (UTC), обновляется не чаще
+    # раза в несколько минут. None - пользователь не заходил с появления
+    # этого поля.
+    last_seen_at = Column(DateTime, index=True)
+
+    # Почему сообщения не доходят (DeliveryStatus), None - чат доступен.
+    # Ставится при ошибке отправки, сбрасывается, когда пользователь
+    # снова пишет боту.
+    delivery_status = Column(String, index=True)
+    delivery_failed_at = Column(DateTime)
+
+    @validates("every_day_prediction_time", "timezone_offset")
+    def _update_prediction_utc_minute(self, key, value):
+        values = {
+            "every_day_prediction_time": self.every_day_prediction_time,
+            "timezone_offset": self.timezone_offset,
+            key: value,
+        }
+        self.prediction_utc_minute = get_utc_minute_of_day(
+            values["every_day_prediction_time"],
+            values["timezone_offset"]
+        )
+        return value
+
+
+class ReminderSchedule(Base):
+    """
+    Дата окончания подписки, по которой запланированы напоминания
+    пользователя. Сравнение с users показывает, кому их нужно
+    перепланировать.
+    """
+    __tablename__ = "reminder_schedules"
+
+    user_id = Column(Integer, primary_key=True)
+    subscription_end_date = Column(String)  # "%d.%m.%Y %H:%M" as default
+
+
+class NatalChart(Base):
+    __tablename__ = "natal_charts"
+
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    birth_datetime_utc = Column(String)  # "%d.%m.%Y %H:%M" as default
+    birth_timezone_offset = Column(Integer)
+    positions = Column(String)  # JSON {planet_id: longitude}
+
+
+class TransitTimeline(Base):
+    __tablename__ = "transit_timelines"
+
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    computed_from = Column(String)  # "%Y-%m-%d %H:%M" UTC
+    computed_until = Column(String)  # "%Y-%m-%d %H:%M" UTC
+
+
+class TransitEvent(Base):
+    __tablename__ = "transit_events"
+
+    # Первичный ключ - он же индекс для выборок подбора дней
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    natal_planet = Column(Integer, primary_key=True)
+    transit_planet = Column(Integer, primary_key=True)
+    aspect = Column(Integer, primary_key=True)
+    peak_at = Column(String, primary_key=True)  # "%Y-%m-%d %H:%M" UTC
+
+
+class VoidOfCoursePeriod(Base):
+    __tablename__ = "void_of_course_periods"
+
+    start = Column(String, primary_key=True)  # "%Y-%m-%d %H:%M:%S" UTC
+    end = Column(String, index=True)  # "%Y-%m-%d %H:%M:%S" UTC
+
 
 class Location(Base):
     __tablename__ = "locations"
@@ -77,7 +167,7 @@ class Payment(Base):
     __tablename__ = "payments"
 
     payment_id = Column(String, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.user_id"))
+    user_id = Column(Integer, ForeignKey("users.user_id"), index=True)
     status = Column(String)
     created_at = Column(String)
     status_change_timestamp = Column(String)
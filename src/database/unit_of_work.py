@@ -0,0 +1,161 @@
+"""
+Единица работы: одна сессия на обновление бота или задачу планировщика.
+
+Внутри единицы функции crud берут её сессию вместо своей, поэтому за
+обновление соединение берётся из пула один раз, а повторное чтение того
+же пользователя приходит из карты идентичности без запроса. Карта живёт
+до конца единицы, устаревших между обновлениями объектов не бывает.
+
+Записи crud внутри единицы только отправляются в БД (save_changes делает
+flush), фиксирует их одним commit сама единица на выходе, а при
+исключении или неудачной записи (discard_changes) откатывает целиком.
+Вне единицы короткая сессия crud фиксируется сразу.
+
+Пишущая единица держит блокировку записи SQLite до своего конца, а
+другой пишущий в том же процессе ждёт её синхронно, вместе с циклом
+событий. Поэтому записи стоит делать после долгих await, а не перед
+ними, и не держать одну единицу на много независимых отправок. Запись
+чужим соединением (хранилище задач APScheduler) внутри единицы ждала бы
+её же блокировку, такие записи откладываются через after_commit.
+
+Единица считает SQL-запросы (включая короткие сессии в том же
+контексте) и пишет их число в лог на уровне DEBUG.
+
+    with unit_of_work(f"send_prediction {user_id}") as session:
+        user = crud.get_user(user_id)  # та же session
+        crud.add_viewed_prediction(user_id, date)  # flush, без commit
+"""
+import logging
+import threading
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+from .database import Session, engine
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class UnitOfWork:
+    name: str
+    session: OrmSession
+    thread_id: int = field(default_factory=threading.get_ident)
+    statements: int = 0
+    closed: bool = False
+    failed: bool = False
+    callbacks: List[Callable[[], None]] = field(default_factory=list)
+
+
+_current_unit: ContextVar[Optional[UnitOfWork]] = ContextVar(
+    "unit_of_work",
+    default=None
+)
+
+
+def current_unit() -> Optional[UnitOfWork]:
+    """
+    Открытая единица работы этого контекста. Задачи, созданные внутри
+    единицы, видят её, пока она не закрыта; потоки - никогда: сессия не
+    потокобезопасна.
+    """
+    unit = _current_unit.get()
+    if (
+        unit is None
+        or unit.closed
+        or unit.thread_id != threading.get_ident()
+    ):
+        return None
+    return unit
+
+
+def current_session() -> Optional[OrmSession]:
+    unit = current_unit()
+    return unit.session if unit is not None else None
+
+
+@contextmanager
+def unit_of_work(name: str) -> Iterator[OrmSession]:
+    """Новая единица работы; фиксируется на выходе, откатывается при ошибке."""
+    unit = UnitOfWork(name=name, session=Session())
+    token = _current_unit.set(unit)
+    try:
+        yield unit.session
+        if unit.failed:
+            unit.session.rollback()
+            LOGGER.warning(f"{unit.name}: rolled back after a failed write")
+        else:
+            unit.session.commit()
+    except BaseException:
+        unit.session.rollback()
+        raise
+    finally:
+        unit.closed = True
+        _current_unit.reset(token)
+        unit.session.close()
+        LOGGER.debug(f"{unit.name}: {unit.statements} SQL statements")
+
+    if not unit.failed:
+        for callback in unit.callbacks:
+            callback()
+
+
+@contextmanager
+def session_scope() -> Iterator[OrmSession]:
+    """Сессия текущей единицы работы или, вне её, своя короткая."""
+    session = current_session()
+    if session is not None:
+        yield session
+        return
+
+    with Session() as session:
+        yield session
+
+
+def save_changes(session: OrmSession):
+    """
+    Конец записи в crud: в сессии открытой единицы работы - flush, её
+    фиксирует сама единица; в своей короткой сессии - commit.
+    """
+    if session is current_session():
+        session.flush()
+    else:
+        session.commit()
+
+
+def discard_changes(session: OrmSession):
+    """
+    Откат после неудачной записи в crud. Откат сессии единицы вернул бы и
+    записи, сделанные до ошибки, а следующие зафиксировались бы,
+    поэтому единица только помечается и откатывается целиком на выходе.
+    """
+    unit = current_unit()
+    if unit is not None and session is unit.session:
+        unit.failed = True
+    else:
+        session.rollback()
+
+
+def after_commit(callback: Callable[[], None]):
+    """
+    Вызывает callback после фиксации текущей единицы работы, уже вне
+    её, а вне единицы - сразу. При откате единицы не вызывается.
+    """
+    unit = current_unit()
+    if unit is None:
+        callback()
+    else:
+        unit.callbacks.append(callback)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    unit = current_unit()
+    if unit is not None:
+        unit.statements += 1
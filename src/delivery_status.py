@@ -0,0 +1,83 @@
+"""
+Учёт чатов, в которые сообщения не доходят.
+
+Middleware сессии бота отмечает пользователя в базе, когда Telegram
+отвечает, что бот заблокирован, аккаунт удалён или чат не найден.
+Ежедневные прогнозы, их ночная подготовка, напоминания и рассылки
+таких пользователей пропускают. Отметка снимается, когда пользователь
+снова пишет боту (LastSeenMiddleware).
+"""
+import logging
+
+from datetime import datetime
+from typing import Optional, Set
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType
+)
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError
+)
+from aiogram.methods import Response, TelegramMethod
+
+from src.database import async_crud
+from src.enums import DeliveryStatus
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Фрагменты описаний ошибок Telegram
+ERROR_DELIVERY_STATUSES = {
+    "bot was blocked by the user": DeliveryStatus.BLOCKED,
+    "user is deactivated": DeliveryStatus.DEACTIVATED,
+    "chat not found": DeliveryStatus.CHAT_NOT_FOUND,
+}
+
+# Пользователи, отмеченные недоступными в этом процессе: их следующее
+# сообщение боту снимает отметку сразу, без ограничения частоты записи
+undeliverable_user_ids: Set[int] = set()
+
+
+def get_delivery_status(error: TelegramAPIError) -> Optional[DeliveryStatus]:
+    if not isinstance(error, (TelegramForbiddenError, TelegramBadRequest)):
+        return None
+
+    description = error.message.lower()
+    for fragment, status in ERROR_DELIVERY_STATUSES.items():
+        if fragment in description:
+            return status
+    return None
+
+
+class DeliveryStatusMiddleware(BaseRequestMiddleware):
+    """Отмечает пользователя недоступным по ответу Telegram на отправку."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod
+    ) -> Response:
+        try:
+            return await make_request(bot, method)
+
+        except TelegramAPIError as e:
+            chat_id = getattr(method, "chat_id", None)
+            status = get_delivery_status(e)
+            # Положительные id - личные чаты, то есть пользователи
+            if status is not None and isinstance(chat_id, int) and chat_id > 0:
+                await async_crud.update_user_delivery_status(
+                    chat_id,
+                    status,
+                    datetime.utcnow()
+                )
+                undeliverable_user_ids.add(chat_id)
+                LOGGER.info(f"User {chat_id} is unreachable: {status.value}")
+            raise
+
+
+delivery_status_middleware = DeliveryStatusMiddleware()
@@ -137,3 +137,23 @@ class GeneralPredictionType(Enum):
 class PaymentMethod(Enum):
     YOOKASSA = "yookassa"
     PRODAMUS = "PRODAMUS"
+
+
+class SendPriority(int, Enum):
+    """Очередность исходящих сообщений: меньше - раньше."""
+    INTERACTIVE = 0
+    SCHEDULED = 1
+    BROADCAST = 2
+
+
+class BroadcastStatus(Enum):
+    RUNNING = "running"
+    PAUSED = "paused"
+    CANCELLED = "cancelled"
+    FINISHED = "finished"
+
+
+class DeliveryStatus(Enum):
+    BLOCKED = "blocked"
+    DEACTIVATED = "deactivated"
+    CHAT_NOT_FOUND = "chat_not_found"
@@ -5,7 +5,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message, User
 
 from src import config
-from src.database import crud, Session
+from src.database import async_crud
 from src.filters.is_date import IsDate, IsDatetime, IsTime
 from src.filters.role import AdminFilter, UserFilter
 from src.filters.state_flag_filters import FSMFlagChecker
@@ -20,8 +20,7 @@ class HaveActiveSubscription(Filter):
         state: FSMContext,
         event_from_user: User
     ):
-        with Session() as session:
-            user = crud.get_user(event_from_user.id, session)
+        user = await async_crud.get_user(event_from_user.id)
 
         subscription_end = datetime.strptime(
             user.subscription_end_date,
@@ -34,8 +33,8 @@ class UserInDatabase(BaseFilter):
     async def __call__(
         self,
         obj: Message | CallbackQuery,
-        database,
+        async_database,
         event_from_user: User
     ):
-        user = database.get_user(event_from_user.id)
+        user = await async_database.get_user(event_from_user.id)
         return user is not None
@@ -4,7 +4,7 @@ from aiogram.types import TelegramObject, User
 from aiogram.filters import BaseFilter
 
 from src import config
-from src.database import Session, crud
+from src.database import async_crud
 
 
 DATETIME_FORMAT = config.get("database.datetime_format")
@@ -16,8 +16,7 @@ class HaveActiveSubscription(BaseFilter):
         event: TelegramObject,
         event_from_user: User,
     ):
-        with Session() as session:
-            user = crud.get_user(event_from_user.id, session)
+        user = await async_crud.get_user(event_from_user.id)
 
         subscription_end = datetime.strptime(
             user.subscription_end_date,
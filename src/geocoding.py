@@ -0,0 +1,391 @@
+"""
+Названия мест по координатам (обратное геокодирование).
+
+Сначала ответ ищется в постоянном кэше по ячейке H3 - таблице locations
+в cache/kerykeion_geonames_cache.sqlite, затем запрашивается удалённый
+бэкенд (Nominatim) в отдельном потоке, чтобы не блокировать цикл событий.
+Если бэкенд недоступен, название берётся у ближайшего известного места:
+уже найденных ячеек и городов из ответов GeoNames, которые kerykeion
+сохранил в тот же файл. Одновременные запросы по одной ячейке
+объединяются в один.
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import h3
+import numpy as np
+
+from babel import Locale
+from geopy.geocoders import Nominatim
+
+from src import config, messages
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Ячейка H3 разрешения 7 - около 5 км², меньше любого города
+H3_RESOLUTION = 7
+DEFAULT_CACHE_FILE = "cache/kerykeion_geonames_cache.sqlite"
+UNKNOWN_LOCATION = "Неизвестное местоположение"
+# Дальше этого место из справочника уже не считается ближайшим городом
+GAZETTEER_MAX_DISTANCE_KM = 50
+EARTH_RADIUS_KM = 6371
+COUNTRY_NAMES = Locale("ru").territories
+
+
+def _get_setting(key: str, default):
+    try:
+        return config.get(f"geocoding.{key}")
+    except KeyError:
+        return default
+
+
+def format_address(address_info: dict) -> str:
+    """Город, регион, страна - из того, что есть в адресе."""
+    primary = (
+        address_info.get("city")
+        or address_info.get("town")
+        or address_info.get("village")
+    )
+    secondary = address_info.get("region") or address_info.get("state")
+    country = address_info.get("country")
+
+    if primary and secondary and country:
+        return f"{primary}, {secondary}, {country}"
+
+    elif primary and country:
+        return f"{primary}, {country}"
+
+    return primary or secondary or country or UNKNOWN_LOCATION
+
+
+def format_place(name: str, country_code: Optional[str]) -> str:
+    """Название города из справочника в том же виде, что у Nominatim."""
+    return format_address(
+        {"city": name, "country": COUNTRY_NAMES.get(country_code or "")}
+    )
+
+
+def _is_cyrillic(name: str) -> bool:
+    return any("а" <= char.lower() <= "я" for char in name)
+
+
+class GeocoderBackend:
+    """
+    Удалённый источник названий. reverse вызывается в отдельном потоке,
+    возвращает None, если по координатам ничего не нашлось, и бросает
+    исключение, если источник недоступен.
+    """
+
+    def reverse(self, latitude: float, longitude: float) -> Optional[str]:
+        raise NotImplementedError
+
+
+class NominatimBackend(GeocoderBackend):
+    def __init__(self, user_agent: str = "AstroBot", timeout: float = 5):
+        self.geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def reverse(self, latitude: float, longitude: float) -> Optional[str]:
+        location = self.geolocator.reverse(
+            (latitude, longitude),
+            language="ru",
+            exactly_one=True
+        )
+
+        if location and "address" in location.raw:
+            return format_address(location.raw["address"])
+
+        return None
+
+
+class StaticBackend(GeocoderBackend):
+    """
+    Локальная замена удалённого бэкенда для тестов: отдаёт одно и то же
+    название (или бросает error) и считает вызовы.
+    """
+
+    def __init__(
+        self,
+        title: Optional[str] = None,
+        error: Optional[Exception] = None
+    ):
+        self.title = title
+        self.error = error
+        self.calls = 0
+
+    def reverse(self, latitude: float, longitude: float) -> Optional[str]:
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.title
+
+
+class LocationCache:
+    """Постоянный кэш названий по ячейке H3 в файле SQLite."""
+
+    def __init__(self, file_path: str = DEFAULT_CACHE_FILE):
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS locations (
+                    cell TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+                """
+            )
+
+    def get(self, cell: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT title FROM locations WHERE cell = ?",
+                (cell,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, cell: str, title: str):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO locations VALUES (?, ?, ?)",
+                (cell, title, datetime.utcnow().isoformat())
+            )
+
+    def items(self) -> List[Tuple[str, str]]:
+        """Все найденные ячейки: (ячейка, название)."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT cell, title FROM locations"
+            ).fetchall()
+
+    def iter_geonames_places(self) -> Iterator[Tuple[float, float, str]]:
+        """
+        Города из ответов GeoNames (searchJSON), которые kerykeion хранит
+        в том же файле через requests-cache: (широта, долгота, название).
+        """
+        with self._lock:
+            try:
+                rows = self._connection.execute(
+                    "SELECT value FROM responses"
+                ).fetchall()
+            except sqlite3.OperationalError:
+                # Файл создан не kerykeion
+                return
+
+        for value, in rows:
+            try:
+                response = _ResponseUnpickler(io.BytesIO(value)).load()
+                data = json.loads(response["_content"])
+            except (
+                pickle.UnpicklingError,
+                EOFError,
+                KeyError,
+                TypeError,
+                ValueError
+            ):
+                continue
+
+            if not isinstance(data, dict):
+                continue
+
+            for place in data.get("geonames", []):
+                name = next(
+                    (
+                        alternate_name["name"]
+                        for alternate_name in place.get("alternateNames", [])
+                        if alternate_name.get("lang") == "ru"
+                    ),
+                    place["name"]
+                )
+                yield (
+                    float(place["lat"]),
+                    float(place["lng"]),
+                    format_place(name, place.get("countryCode"))
+                )
+
+
+class _ResponseUnpickler(pickle.Unpickler):
+    """
+    Ответы requests-cache сериализованы из встроенных типов - классы
+    из файла не загружаются.
+    """
+
+    def find_class(self, module: str, name: str):
+        raise pickle.UnpicklingError(f"{module}.{name} is not allowed")
+
+
+class Gazetteer:
+    """
+    Места с известными названиями для работы без сети: название
+    ближайшего в пределах GAZETTEER_MAX_DISTANCE_KM. Пополняется
+    названиями, которые вернул удалённый бэкенд.
+    """
+
+    def __init__(self):
+        self.titles: List[str] = []
+        self._coordinates: List[Tuple[float, float]] = []
+        self._radians: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def add(self, latitude: float, longitude: float, title: str):
+        with self._lock:
+            self.titles.append(title)
+            self._coordinates.append((latitude, longitude))
+            self._radians = None
+
+    def add_cached_locations(self, cache: LocationCache):
+        for cell, title in cache.items():
+            self.add(*h3.h3_to_geo(cell), title)
+        for latitude, longitude, title in cache.iter_geonames_places():
+            self.add(latitude, longitude, title)
+
+    def add_geonames_file(self, file_path: str):
+        """Справочник GeoNames (cities*.txt)."""
+        with open(file_path, encoding="utf-8") as file:
+            for line in file:
+                columns = line.rstrip("\n").split("\t")
+                # Русское название ищем среди альтернативных
+                name = next(
+                    (
+                        alternate_name
+                        for alternate_name in columns[3].split(",")
+                        if _is_cyrillic(alternate_name)
+                    ),
+                    columns[1]
+                )
+                self.add(
+                    float(columns[4]),
+                    float(columns[5]),
+                    format_place(name, columns[8])
+                )
+
+    def nearest(self, latitude: float, longitude: float) -> Optional[str]:
+        with self._lock:
+            if not self.titles:
+                return None
+            if self._radians is None:
+                self._radians = np.radians(np.array(self._coordinates))
+            coordinates, titles = self._radians, self.titles[:]
+
+        latitude, longitude = np.radians(latitude), np.radians(longitude)
+        latitudes, longitudes = coordinates[:, 0], coordinates[:, 1]
+
+        # Гаверсинус
+        a = (
+            np.sin((latitudes - latitude) / 2) ** 2
+            + np.cos(latitude) * np.cos(latitudes)
+            * np.sin((longitudes - longitude) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+        index = int(np.argmin(distances))
+        if distances[index] > GAZETTEER_MAX_DISTANCE_KM:
+            return None
+        return titles[index]
+
+
+class Geocoder:
+    def __init__(
+        self,
+        backend: GeocoderBackend,
+        cache: LocationCache,
+        gazetteer: Optional[Gazetteer] = None,
+        h3_resolution: int = H3_RESOLUTION
+    ):
+        self.backend = backend
+        self.cache = cache
+        self.gazetteer = gazetteer
+        self.h3_resolution = h3_resolution
+
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _get_cell(self, latitude: float, longitude: float) -> str:
+        return h3.geo_to_h3(latitude, longitude, self.h3_resolution)
+
+    def _resolve(self, cell: str, latitude: float, longitude: float) -> str:
+        title = self.cache.get(cell)
+        if title is not None:
+            return title
+
+        try:
+            title = self.backend.reverse(latitude, longitude)
+
+        except Exception as e:
+            LOGGER.warning(
+                f"Reverse geocoding failed, using offline fallback: {e!r}"
+            )
+
+        else:
+            if title is not None:
+                self.cache.set(cell, title)
+                if self.gazetteer is not None:
+                    self.gazetteer.add(latitude, longitude, title)
+                return title
+
+        if self.gazetteer is not None:
+            title = self.gazetteer.nearest(latitude, longitude)
+            if title is not None:
+                return title
+
+        return messages.ERROR_MESSAGE
+
+    def get_location_title(self, latitude: float, longitude: float) -> str:
+        """Блокирующий вариант для скриптов и кода вне цикла событий."""
+        cell = self._get_cell(latitude, longitude)
+        return self._resolve(cell, latitude, longitude)
+
+    async def get_location_title_async(
+        self,
+        latitude: float,
+        longitude: float
+    ) -> str:
+        cell = self._get_cell(latitude, longitude)
+
+        title = self.cache.get(cell)
+        if title is not None:
+            return title
+
+        # Пока по ячейке идёт запрос, остальные ждут его результат
+        future = self._in_flight.get(cell)
+        if future is None:
+            future = asyncio.ensure_future(
+                asyncio.to_thread(self._resolve, cell, latitude, longitude)
+            )
+            self._in_flight[cell] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(cell, None))
+
+        return await asyncio.shield(future)
+
+
+def _get_gazetteer(cache: LocationCache) -> Gazetteer:
+    gazetteer = Gazetteer()
+    gazetteer.add_cached_locations(cache)
+
+    file_path = _get_setting("gazetteer_file", "")
+    if file_path and os.path.exists(file_path):
+        gazetteer.add_geonames_file(file_path)
+    elif file_path:
+        LOGGER.warning(f"Gazetteer {file_path} not found, skipping it")
+
+    return gazetteer
+
+
+location_cache = LocationCache(_get_setting("cache_file", DEFAULT_CACHE_FILE))
+geocoder = Geocoder(
+    backend=NominatimBackend(timeout=_get_setting("timeout", 5)),
+    cache=location_cache,
+    gazetteer=_get_gazetteer(location_cache),
+    h3_resolution=_get_setting("h3_resolution", H3_RESOLUTION)
+)
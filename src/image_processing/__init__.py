@@ -1 +1,8 @@
-from .utils import get_image_with_astrodata
+from .utils import (
+    get_astrodata_image_inputs,
+    get_astrodata_photo,
+    get_cached_astrodata_photo,
+    get_image_with_astrodata,
+    prerender_astrodata_photo,
+    remember_astrodata_photo
+)
@@ -0,0 +1,100 @@
+"""
+Готовые к вставке ресурсы для отрисовки картинок с астроданными.
+
+Фоны, знаки и фазы Луны из images/ декодируются один раз на процесс
+(preload при старте), размеры надписей и маски постоянных подписей
+знаков тоже кэшируются. Кэшированные изображения только читаются:
+отрисовка рисует на копии фона.
+"""
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from src.enums import (
+    Align,
+    ImageHighElementsPositions,
+    ImageWideElementsPositions,
+    MoonPhase,
+    ZodiacSign
+)
+from src.translations import ZODIAC_RU_TRANSLATION
+
+
+TEXT_SIZES_CACHE_SIZE = 4096
+
+# Холст только для измерения текста
+_MEASURE_DRAWER = ImageDraw.Draw(Image.new("L", (0, 0)))
+
+
+@lru_cache(maxsize=None)
+def get_background(path: str) -> Image.Image:
+    background = Image.open(path)
+    background.load()
+    return background.convert("RGB")
+
+
+@lru_cache(maxsize=None)
+def get_moon_sign_image(sign: ZodiacSign) -> Image.Image:
+    return _load_rgba(f"images/moon_signs/{sign.value}.png")
+
+
+@lru_cache(maxsize=None)
+def get_moon_phase_image(phase: MoonPhase) -> Image.Image:
+    return _load_rgba(f"images/moon_phases/{phase.value}.png")
+
+
+def _load_rgba(path: str) -> Image.Image:
+    image = Image.open(path)
+    image.load()
+    return image.convert("RGBA")
+
+
+@lru_cache(maxsize=TEXT_SIZES_CACHE_SIZE)
+def get_text_size(
+    text: str,
+    font: ImageFont.FreeTypeFont
+) -> Tuple[int, int]:
+    """Правая и нижняя граница текста, нарисованного из (0, 0)."""
+    _, _, width, height = _MEASURE_DRAWER.textbbox(
+        (0, 0),
+        text,
+        font=font,
+        align=Align.CENTER.value
+    )
+    return width, height
+
+
+@lru_cache(maxsize=TEXT_SIZES_CACHE_SIZE)
+def get_text_mask(text: str, font: ImageFont.FreeTypeFont) -> Image.Image:
+    """
+    Маска текста: вставка цвета через неё даёт тот же результат, что
+    ImageDraw.text в той же точке.
+    """
+    mask = Image.new("L", get_text_size(text, font))
+    ImageDraw.Draw(mask).text(
+        (0, 0),
+        text,
+        fill=255,
+        font=font,
+        align=Align.CENTER.value
+    )
+    return mask
+
+
+def get_moon_sign_caption(sign: ZodiacSign) -> str:
+    return f"Луна в {ZODIAC_RU_TRANSLATION.get(sign, 'Неизвестный знак')}"
+
+
+def preload(text_font: Optional[ImageFont.FreeTypeFont] = None):
+    """Декодирует все ресурсы и готовит маски подписей знаков."""
+    for positions in (ImageHighElementsPositions, ImageWideElementsPositions):
+        get_background(positions.BACKGROUND_IMAGE_PATH.value)
+
+    for sign in ZodiacSign:
+        get_moon_sign_image(sign)
+        if text_font is not None:
+            get_text_mask(get_moon_sign_caption(sign), text_font)
+
+    for phase in MoonPhase:
+        get_moon_phase_image(phase)
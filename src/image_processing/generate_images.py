@@ -14,6 +14,15 @@ from src.enums import (
     ImageWideElementsPositions,
     ZodiacSign
 )
+from src.image_processing.assets import (
+    get_background,
+    get_moon_phase_image,
+    get_moon_sign_caption,
+    get_moon_sign_image,
+    get_text_mask,
+    get_text_size,
+    preload
+)
 from src.translations import ZODIAC_RU_TRANSLATION
 
 
@@ -45,6 +54,11 @@ def zodiac_sign_translate_to_russian(sign_str: ZodiacSign):
     return ZODIAC_RU_TRANSLATION.get(sign_str, "Неизвестный знак")
 
 
+def preload_assets():
+    """Вызывается при старте процесса, который рисует картинки."""
+    preload(TEXT_FONT)
+
+
 def calculate_adjust_for_centering(
     coordinates: tuple[int, int],
     obj: str | Image.Image,
@@ -55,11 +69,7 @@ def calculate_adjust_for_centering(
     at the center of given coordinates.
     """
     if isinstance(obj, str):
-        dummy_image = Image.new("RGB", (0, 0))
-        drawer = ImageDraw.Draw(dummy_image)
-
-        # get text size
-        _, _, w, h = drawer.textbbox((0, 0), obj, font=font, align=Align.CENTER.value)
+        w, h = get_text_size(obj, font)
 
     elif isinstance(obj, Image.Image):
         w, h = obj.size
@@ -89,8 +99,10 @@ def generate_image_with_astrodata(
         ImageHighElementsPositions
     ] = ImageHighElementsPositions
 ) -> bytes:
-    # Open the background image
-    background_image = Image.open(image_element_position.BACKGROUND_IMAGE_PATH.value)
+    # Copy the decoded background template
+    background_image = get_background(
+        image_element_position.BACKGROUND_IMAGE_PATH.value
+    ).copy()
     drawer = ImageDraw.Draw(background_image)
 
     if date is not None:
@@ -107,9 +119,7 @@ def generate_image_with_astrodata(
         )
 
     if start_sign is not None:
-        first_sign_image = Image.open(
-            f"images/moon_signs/{start_sign.value}.png"
-        )
+        first_sign_image = get_moon_sign_image(start_sign)
         first_sign_position = calculate_adjust_for_centering(
             image_element_position.START_MOON_SIGN_IMAGE.value,
             first_sign_image
@@ -121,23 +131,22 @@ def generate_image_with_astrodata(
             first_sign_image
         )
 
-        first_sign_caption = f"Луна в {zodiac_sign_translate_to_russian(start_sign)}"
+        first_sign_caption = get_moon_sign_caption(start_sign)
 
-        drawer.text(
+        # Постоянная подпись - готовая маска вместо отрисовки текста
+        background_image.paste(
+            COLOR_WHITE,
             calculate_adjust_for_centering(
                 image_element_position.FIRST_MOON_SIGN_CAPTION.value,
                 first_sign_caption,
                 TEXT_FONT,
             ),  # centered coordinates
-            first_sign_caption,
-            fill=COLOR_WHITE,
-            font=TEXT_FONT,
-            align=Align.CENTER.value,
+            get_text_mask(first_sign_caption, TEXT_FONT)
         )
 
     # If an end sign is given, load and paste
     if change_time is not None and end_sign is not None:
-        end_sign_image = Image.open(f"images/moon_signs/{end_sign.value}.png")
+        end_sign_image = get_moon_sign_image(end_sign)
         end_sign_position = calculate_adjust_for_centering(
             image_element_position.END_MOON_SIGN_IMAGE.value, end_sign_image
         )
@@ -161,7 +170,7 @@ def generate_image_with_astrodata(
         )
 
     if moon_phase is not None:
-        moon_phase_image = Image.open(f"images/moon_phases/{moon_phase.value}.png")
+        moon_phase_image = get_moon_phase_image(moon_phase)
         moon_phase_position = calculate_adjust_for_centering(
             image_element_position.MOON_PHASE.value,
             moon_phase_image
@@ -0,0 +1,155 @@
+"""
+Кэш отрисованных картинок с астроданными.
+
+Картинка зависит только от входных данных (дата, знаки Луны, время смены
+знака, фаза и подписи), поэтому ключом служит хэш этих данных. JPEG
+хранится на диске с вытеснением давно не использованных файлов, а
+file_id, который Telegram вернул после первой отправки, хранится в
+Redis - повторные отправки той же картинки не загружают её заново.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from datetime import timedelta
+from typing import Any, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src import config
+from src.common import redis
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Увеличить при изменении отрисовки, чтобы не отдавать старые картинки
+RENDER_VERSION = 1
+
+DEFAULT_DIRECTORY = "cache/renders"
+DEFAULT_MAX_FILES = 5000
+DEFAULT_FILE_ID_TTL_DAYS = 7
+FILE_ID_KEY_PREFIX = "astrodata_photo"
+
+
+def _get_setting(key: str, default: Any) -> Any:
+    try:
+        return config.get(f"render_cache.{key}")
+    except KeyError:
+        return default
+
+
+def _to_json(value: Any) -> Any:
+    # Перечисления (знаки, фазы) - по значению
+    return getattr(value, "value", str(value))
+
+
+def get_render_key(**inputs) -> str:
+    payload = json.dumps(
+        {"version": RENDER_VERSION, **inputs},
+        sort_keys=True,
+        default=_to_json,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RenderCache:
+    """
+    Картинки на диске, по файлу на ключ. Время изменения файла
+    обновляется при каждом чтении, при переполнении удаляются самые
+    давно использованные. Каталог общий для всех процессов.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_DIRECTORY,
+        max_files: int = DEFAULT_MAX_FILES
+    ):
+        self.directory = directory
+        self.max_files = max_files
+        os.makedirs(directory, exist_ok=True)
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.jpg")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def set(self, key: str, data: bytes):
+        path = self._get_path(key)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+
+        self._evict()
+
+    def _evict(self):
+        entries = [
+            entry
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(".jpg")
+        ]
+        # Удаляем с запасом в 10%, чтобы у самой границы не вытеснять
+        # по файлу на каждой записи
+        if len(entries) <= self.max_files:
+            return
+
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - int(self.max_files * 0.9)]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+class FileIdRegistry:
+    """
+    file_id отправленных картинок по ключу отрисовки. Если Redis
+    недоступен, картинка просто загружается заново.
+    """
+
+    def __init__(self, redis: Redis, ttl: timedelta):
+        self.redis = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def _get_redis_key(key: str) -> str:
+        return f"{FILE_ID_KEY_PREFIX}:{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            file_id = await self.redis.get(self._get_redis_key(key))
+        except RedisError as e:
+            LOGGER.warning(f"Can't get photo file_id from redis: {e!r}")
+            return None
+
+        return file_id.decode() if file_id is not None else None
+
+    async def set(self, key: str, file_id: str):
+        try:
+            await self.redis.set(self._get_redis_key(key), file_id, ex=self.ttl)
+        except RedisError as e:
+            LOGGER.warning(f"Can't save photo file_id to redis: {e!r}")
+
+
+render_cache = RenderCache(
+    directory=_get_setting("directory", DEFAULT_DIRECTORY),
+    max_files=_get_setting("max_files", DEFAULT_MAX_FILES)
+)
+file_id_registry = FileIdRegistry(
+    redis,
+    ttl=timedelta(
+        days=_get_setting("file_id_ttl_days", DEFAULT_FILE_ID_TTL_DAYS)
+    )
+)
@@ -1,20 +1,32 @@
+import asyncio
 import logging
 
 from datetime import date, datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple, Union
+
+from aiogram.types import BufferedInputFile, Message
 
 from src import config, messages
 from src.astro_engine.moon import (
     get_main_lunar_day_at_date,
     get_moon_phase,
     get_moon_signs_at_date,
-    get_next_lunar_day,
-    get_blank_moon_period
+    get_next_lunar_day
+)
+from src.astro_engine.moon import (
+    get_void_of_course_periods as calculate_void_of_course_periods
 )
 from src.astro_engine.utils import get_moon_in_signs_interpretations
-from src.astro_engine.models import User as AstroUser
-from src.enums import MoonSignInterpretationType, ZodiacSign
+from src.astro_engine.models import Location, TimePeriod
+from src.compute_pool import compute_pool
+from src.database import crud
+from src.enums import MoonPhase, MoonSignInterpretationType, ZodiacSign
 from src.image_processing.generate_images import generate_image_with_astrodata
+from src.image_processing.render_cache import (
+    file_id_registry,
+    get_render_key,
+    render_cache
+)
 from src.translations import MOON_PHASE_RU_TRANSLATIONS
 
 
@@ -47,15 +59,13 @@ def get_interpretation(
         )
 
 
-def get_moon_phase_caption(
+def get_moon_phase_with_caption(
     utcdate: date,
     longitude: float,
     latitude: float,
     timezone_offset: int
-) -> str:
-    """
-    Генерирует описание фазы Луны для заданного времени и местоположения.
-    """
+) -> Tuple[MoonPhase, str]:
+    """Фаза Луны и её описание - одной задачей для пула процессов."""
     utcdate = datetime(utcdate.year, utcdate.month, utcdate.day)
 
     current_lunar_day = get_main_lunar_day_at_date(
@@ -92,50 +102,53 @@ def get_moon_phase_caption(
         next_lunar_day_number=next_lunar_day.number,
     )
 
-    return text
+    return moon_phase, text
 
 
-async def get_image_with_astrodata(
+async def get_astrodata_image_inputs(
     user,
     moon_signs: Optional[Dict] = None,
     date: Optional[datetime] = None
-) -> bytes:
-    utcdate = datetime.utcnow()
+) -> Dict:
+    """
+    Входные данные картинки - они же ключ кэша отрисовки. Знаки Луны,
+    фаза и холостая луна считаются в пуле процессов одновременно.
+    """
+    timezone_offset: int = user.timezone_offset
+    # В пул процессов уходят только простые данные, а не объект ORM
+    location = Location(
+        longitude=user.current_location.longitude,
+        latitude=user.current_location.latitude
+    )
 
     if date is None:
-        date = (utcdate + timedelta(hours=user.timezone_offset)).date()
-
-    if moon_signs is None:
-        # Getting image
-        timezone_offset: int = user.timezone_offset
-
-        moon_signs = get_moon_signs_at_date(
-            date,  # date is %Y-%m-%d, not datetime
-            timezone_offset,
-            user.current_location
+        date = (datetime.utcnow() + timedelta(hours=timezone_offset)).date()
+
+    moon_signs, (moon_phase, moon_phase_caption), void_of_course_periods = (
+        await asyncio.gather(
+            _get_moon_signs(moon_signs, date, timezone_offset, location),
+            compute_pool.run(
+                get_moon_phase_with_caption,
+                date,
+                location.longitude,
+                location.latitude,
+                timezone_offset
+            ),
+            get_day_void_of_course_periods(date, timezone_offset)
         )
-
-    timezone_offset = user.timezone_offset
-
-    longitude = user.current_location.longitude
-    latitude = user.current_location.latitude
-
-    moon_phase = get_moon_phase(date, longitude, latitude)
-
-    moon_phase_caption = get_moon_phase_caption(
-        date,
-        longitude,
-        latitude,
-        user.timezone_offset
     )
 
     start_sign: Optional[ZodiacSign] = moon_signs.get("start_sign", None)
     change_time: Optional[str] = moon_signs.get("change_time", None)
     end_sign: Optional[ZodiacSign] = moon_signs.get("end_sign", None)
 
-    blank_moon_caption = get_blank_moon_caption(date, user, timezone_offset)
+    blank_moon_caption = get_blank_moon_caption(
+        date,
+        void_of_course_periods,
+        timezone_offset
+    )
 
-    photo = generate_image_with_astrodata(
+    return dict(
         date=date.strftime(DATE_FORMAT),
         moon_phase=moon_phase,
         moon_phase_caption=moon_phase_caption,
@@ -144,55 +157,160 @@ async def get_image_with_astrodata(
         end_sign=end_sign,
         blank_moon_caption=blank_moon_caption
     )
-    return photo
 
 
-def get_blank_moon_caption(
+async def _get_moon_signs(
+    moon_signs: Optional[Dict],
     date: date,
-    user,
-    timezone_offset: int
-) -> str:
-    astrouser = AstroUser(
-        birth_datetime=datetime.strptime(user.birth_datetime, DATETIME_FORMAT),
-        birth_location=user.birth_location,
-        current_location=user.current_location
+    timezone_offset: int,
+    location: Location
+) -> Dict:
+    if moon_signs is not None:
+        return moon_signs
+
+    return await compute_pool.run(
+        get_moon_signs_at_date,
+        date,  # date is %Y-%m-%d, not datetime
+        timezone_offset,
+        location
     )
 
-    datetime_obj = datetime(date.year, date.month, date.day)
 
-    blank_moon_period = get_blank_moon_period(
-        datetime_obj,
-        astrouser,
-        timezone_offset
-    )
+def render_image_with_astrodata(inputs: Dict) -> bytes:
+    """Отрисовка с кэшем на диске. Выполняется в пуле процессов."""
+    key = get_render_key(**inputs)
 
-    LOGGER.info(
-        '\nBlank moon period:\n\nstart: {start}\nend: {end}'.format(
-            start=blank_moon_period.start.strftime(DATETIME_FORMAT),
-            end=blank_moon_period.end.strftime(DATETIME_FORMAT)
-        )
+    photo = render_cache.get(key)
+    if photo is None:
+        photo = generate_image_with_astrodata(**inputs)
+        render_cache.set(key, photo)
+
+    return photo
+
+
+async def get_image_with_astrodata(
+    user,
+    moon_signs: Optional[Dict] = None,
+    date: Optional[datetime] = None
+) -> bytes:
+    inputs = await get_astrodata_image_inputs(user, moon_signs, date)
+    return await compute_pool.run(render_image_with_astrodata, inputs)
+
+
+async def get_astrodata_photo(
+    user,
+    filename: str,
+    moon_signs: Optional[Dict] = None,
+    date: Optional[datetime] = None
+) -> Tuple[str, Union[str, BufferedInputFile]]:
+    """
+    Картинка для отправки: file_id, если такая картинка уже уходила в
+    Telegram, иначе файл. Первым возвращается ключ отрисовки - после
+    отправки его нужно передать в remember_astrodata_photo.
+    """
+    inputs = await get_astrodata_image_inputs(user, moon_signs, date)
+    key = get_render_key(**inputs)
+
+    file_id = await file_id_registry.get(key)
+    if file_id is not None:
+        return key, file_id
+
+    photo_bytes = await compute_pool.run(render_image_with_astrodata, inputs)
+    return key, BufferedInputFile(file=photo_bytes, filename=filename)
+
+
+async def get_cached_astrodata_photo(
+    key: str,
+    filename: str
+) -> Optional[Union[str, BufferedInputFile]]:
+    """
+    Уже отрисованная картинка по ключу: file_id или файл из кэша
+    отрисовки. None, если картинку нужно отрисовать заново.
+    """
+    file_id = await file_id_registry.get(key)
+    if file_id is not None:
+        return file_id
+
+    photo_bytes = render_cache.get(key)
+    if photo_bytes is None:
+        return None
+    return BufferedInputFile(file=photo_bytes, filename=filename)
+
+
+async def prerender_astrodata_photo(inputs: Dict) -> str:
+    """Отрисовывает картинку в кэш заранее и возвращает её ключ."""
+    key = get_render_key(**inputs)
+    if render_cache.get(key) is None:
+        await compute_pool.run(render_image_with_astrodata, inputs)
+    return key
+
+
+async def remember_astrodata_photo(key: str, message: Message):
+    """Сохраняет file_id отправленной картинки для следующих отправок."""
+    if message.photo:
+        await file_id_registry.set(key, message.photo[-1].file_id)
+
+
+async def get_day_void_of_course_periods(
+    date: date,
+    timezone_offset: int
+) -> List[TimePeriod]:
+    """Периоды холостой луны, задевающие местные сутки date."""
+    day_start = datetime(date.year, date.month, date.day) - timedelta(
+        hours=timezone_offset
+    )
+    day_end = day_start + timedelta(days=1)
+
+    calendar_span = crud.get_void_of_course_calendar_span()
+    if (
+        calendar_span is not None
+        and calendar_span.start <= day_start
+        and day_end <= calendar_span.end
+    ):
+        return crud.get_void_of_course_periods(day_start, day_end)
+
+    return await compute_pool.run(
+        calculate_void_of_course_periods,
+        day_start,
+        day_end
     )
 
-    today = datetime_obj.date()
 
-    start_date = blank_moon_period.start.date()
+def get_blank_moon_caption(
+    date: date,
+    periods: List[TimePeriod],
+    timezone_offset: int
+) -> str:
+    timezone_timedelta = timedelta(hours=timezone_offset)
+    day_start = datetime(date.year, date.month, date.day)
+    day_end = day_start + timedelta(days=1)
+
+    captions = []
+    for period in periods:
+        start = period.start + timezone_timedelta
+        end = period.end + timezone_timedelta
+
+        LOGGER.info(
+            '\nBlank moon period:\n\nstart: {start}\nend: {end}'.format(
+                start=start.strftime(DATETIME_FORMAT),
+                end=end.strftime(DATETIME_FORMAT)
+            )
+        )
 
-    start_today = start_date == today
-    start_yesterday_or_before = start_date < today
+        if start <= day_start:
+            start_time_str = '00:00'
+        else:
+            start_time_str = start.strftime(TIME_FORMAT)
 
-    end_today = today == blank_moon_period.end.date()
+        if end >= day_end:
+            end_time_str = '24:00'
+        else:
+            end_time_str = end.strftime(TIME_FORMAT)
 
-    if not (start_today or start_yesterday_or_before):
-        return 'Холостая луна сегодня отсутствует'
+        captions.append(f'{start_time_str} - {end_time_str}')
 
-    if start_yesterday_or_before:
-        start_time_str = '00:00'
-    else:
-        start_time_str = blank_moon_period.start.strftime(TIME_FORMAT)
+    if not captions:
+        return 'Холостая луна сегодня отсутствует'
 
-    if end_today:
-        end_time_str = blank_moon_period.end.strftime(TIME_FORMAT)
-    else:
-        end_time_str = '24:00'
+    return f'Холостая луна {", ".join(captions)}'
 
-    return f'Холостая луна {start_time_str} - {end_time_str}'
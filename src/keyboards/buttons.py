@@ -67,6 +67,10 @@ class Buttons:
     change_user_birth_datetime = "Изменить дату рождения"
     statistics = "Статистика"
     broadcast = "Рассылка"
+    broadcast_pause = "⏸ Пауза"
+    broadcast_resume = "▶️ Продолжить"
+    broadcast_cancel = "✖️ Отменить"
+    broadcast_refresh = "🔄 Обновить"
     # Misc
     dreams = "💫 Сны"
     about_bot = "🤔 О боте"
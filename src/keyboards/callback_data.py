@@ -15,3 +15,8 @@ class Payment(CallbackData, prefix='payment'):
 
 class Promocode(CallbackData, prefix='promocode'):
     promocode: str
+
+
+class BroadcastAction(CallbackData, prefix='broadcast'):
+    job_id: str
+    action: str  # pause, resume, cancel, refresh
@@ -4,7 +4,12 @@ from src import config
 from src.utils import split_list
 from src.models import DateModifier
 
-from .callback_data import SubscriptionPeriod, Payment, Promocode
+from .callback_data import (
+    BroadcastAction,
+    SubscriptionPeriod,
+    Payment,
+    Promocode
+)
 from .builder import KeyboardBuilder
 from .buttons import bt
 
@@ -305,6 +310,39 @@ def back_to_adminpanel():
     )
 
 
+def broadcast_control(job_id: str, paused: bool = False):
+    if paused:
+        pause_button = (
+            bt.broadcast_resume,
+            BroadcastAction(job_id=job_id, action="resume")
+        )
+    else:
+        pause_button = (
+            bt.broadcast_pause,
+            BroadcastAction(job_id=job_id, action="pause")
+        )
+
+    return KeyboardBuilder.build(
+        [
+            [
+                pause_button,
+                (
+                    bt.broadcast_cancel,
+                    BroadcastAction(job_id=job_id, action="cancel")
+                )
+            ],
+            [
+                (
+                    bt.broadcast_refresh,
+                    BroadcastAction(job_id=job_id, action="refresh")
+                )
+            ],
+            [bt.back_to_adminpanel]
+        ],
+        is_inline=True
+    )
+
+
 def user_info_menu():
     return KeyboardBuilder.build(
         [
@@ -466,6 +466,10 @@ ADMIN_STATISTICS = """
 Активные клиенты: {active_clients_count}
 Пользуются бесплатно: {free_users_count}
 
+Недоступны: {undeliverable_users_count}
+- Заблокировали бота: {blocked_users_count}
+- Удалили аккаунт: {deactivated_users_count}
+
 Средний возраст: {average_age} лет
 
 Женщин: {percentage_women}
@@ -506,6 +510,17 @@ BROADCAST_STARTED = """
 
 Результат будет вам отправлен после завершения.
 """
+BROADCAST_PROGRESS = """
+<b>Рассылка {status}</b>
+
+Обработано: {done} из {total}
+- Доставлено: {sent}
+- Не доставлено: {failed}
+
+Скорость: {throughput:.1f} сообщ./с
+Осталось: {eta}
+"""
+BROADCAST_NOT_FOUND = "Рассылка не найдена или уже удалена."
 BROADCAST_STATISTIC = """
 <code>---== </code> <b>Статистика рассылки</b> <code> ==---</code>
 <strong>
@@ -2,5 +2,7 @@ from src.middlewares.album import MediaGroupMiddleware
 from src.middlewares.clear_keyboards import ClearKeyboardFromMessageMiddleware
 from src.middlewares.data_in_redis import AddDataInRedis
 from src.middlewares.delete_messages import DeleteMessagesMiddleware
+from src.middlewares.last_seen import LastSeenMiddleware
 from src.middlewares.null import NullMiddleware
+from src.middlewares.session_middleware import SessionMiddleware
 from src.middlewares.skip_updates_from_groups import SkipGroupsUpdates
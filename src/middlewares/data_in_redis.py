@@ -3,8 +3,6 @@ from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 
-from src.database import Database
-
 
 class AddDataInRedis(BaseMiddleware):
     keys_list = ["timezone_offset", "name"]
@@ -18,26 +16,21 @@ class AddDataInRedis(BaseMiddleware):
         state = data["state"]
         state_data = await state.get_data()
 
-        database = data["database"]
-
-        missing_keys = []
-
-        for key in self.keys_list:
-            if state_data.get(key, None) is None:
-                missing_keys.append(key)
+        async_database = data["async_database"]
 
-        for key in missing_keys:
-            match key:
-                case "timezone_offset":
-                    user = database.get_user(user_id=event.from_user.id)
+        missing_keys = [
+            key
+            for key in self.keys_list
+            if state_data.get(key, None) is None
+        ]
 
-                    if user:
-                        await state.update_data(timezone_offset=user.timezone_offset)
-                case "name":
-                    user = database.get_user(user_id=event.from_user.id)
+        if missing_keys:
+            user = await async_database.get_user(user_id=event.from_user.id)
 
-                    if user:
-                        await state.update_data(name=user.name)
+            if user:
+                await state.update_data(
+                    **{key: getattr(user, key) for key in missing_keys}
+                )
 
         result = await handler(event, data)
         return result
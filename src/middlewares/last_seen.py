@@ -0,0 +1,57 @@
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from src.database import async_crud
+from src.delivery_status import undeliverable_user_ids
+
+# Чаще раза в столько секунд last_seen_at одного пользователя не пишется
+DEFAULT_UPDATE_INTERVAL = 300
+# Размер таблицы последних записей, после которого из неё убираются старые
+CLEANUP_THRESHOLD = 10000
+
+
+class LastSeenMiddleware(BaseMiddleware):
+    """
+    Отмечает в базе, когда пользователь последний раз писал боту, и
+    снимает отметку о недоступности его чата.
+    """
+
+    def __init__(self, update_interval: float = DEFAULT_UPDATE_INTERVAL):
+        self.update_interval = update_interval
+        self._updated_at: Dict[int, float] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None:
+            await self._touch(user.id)
+
+        return await handler(event, data)
+
+    async def _touch(self, user_id: int):
+        now = time.monotonic()
+        recently_seen = now - self._updated_at.get(
+            user_id,
+            -self.update_interval
+        ) < self.update_interval
+        if recently_seen and user_id not in undeliverable_user_ids:
+            return
+
+        undeliverable_user_ids.discard(user_id)
+        await async_crud.update_user_last_seen(user_id, datetime.utcnow())
+        self._updated_at[user_id] = now
+
+        if len(self._updated_at) > CLEANUP_THRESHOLD:
+            self._updated_at = {
+                user_id: updated_at
+                for user_id, updated_at in self._updated_at.items()
+                if now - updated_at < self.update_interval
+            }
@@ -1,8 +1,29 @@
-# from src.database import Session
-#
-#
-# @web.middleware
-# async def session_middleware(request, handler):
-#     request.session = your_session_creation_method()
-#     response = await handler(request)
-#     return response
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from src.database.unit_of_work import unit_of_work
+
+
+class SessionMiddleware(BaseMiddleware):
+    """
+    Одна единица работы на обновление: хендлеры получают её сессию
+    аргументом session, функции crud внутри обновления работают в ней же.
+    Регистрируется на dp.update как outer middleware.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = (
+            f"update {event.update_id}"
+            if isinstance(event, Update)
+            else type(event).__name__
+        )
+        with unit_of_work(name) as session:
+            data["session"] = session
+            return await handler(event, data)
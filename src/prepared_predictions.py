@@ -0,0 +1,121 @@
+"""
+Заранее подготовленные ежедневные прогнозы.
+
+Ночной этап планировщика считает картинку и текст на следующую
+отправку каждого пользователя и сохраняет их в Redis с временем жизни.
+Картинка хранится в кэше отрисовки, здесь - только её ключ. Отпечаток
+данных пользователя сохраняется вместе с прогнозом: если пользователь
+сменил местоположение или данные рождения, подготовленный прогноз
+не используется и всё считается в момент отправки.
+"""
+import hashlib
+import json
+import logging
+
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Any, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src import config
+from src.common import redis
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_HOUR = 0
+DEFAULT_WINDOW_HOURS = 24
+DEFAULT_TTL_HOURS = 36
+KEY_PREFIX = "prepared_prediction"
+
+
+def _get_setting(key: str, default: Any) -> Any:
+    try:
+        return config.get(f"prerender.{key}")
+    except KeyError:
+        return default
+
+
+def get_user_fingerprint(user) -> str:
+    """Хэш данных пользователя, от которых зависят картинка и текст."""
+    payload = json.dumps(
+        [
+            user.name,
+            user.timezone_offset,
+            user.birth_datetime,
+            user.current_location.longitude,
+            user.current_location.latitude,
+            user.birth_location.longitude,
+            user.birth_location.latitude,
+        ],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class PreparedPrediction:
+    fingerprint: str
+    photo_key: str
+    # Текст готовится только пользователям с подпиской
+    text: Optional[str] = None
+
+
+class PreparedPredictionStore:
+    """
+    Подготовленные прогнозы по пользователю и дате. Если Redis
+    недоступен, прогноз просто считается в момент отправки.
+    """
+
+    def __init__(self, redis: Redis, ttl: timedelta):
+        self.redis = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def _get_redis_key(user_id: int, target_date: date) -> str:
+        return f"{KEY_PREFIX}:{user_id}:{target_date.isoformat()}"
+
+    async def get(
+        self,
+        user_id: int,
+        target_date: date
+    ) -> Optional[PreparedPrediction]:
+        try:
+            data = await self.redis.get(
+                self._get_redis_key(user_id, target_date)
+            )
+        except RedisError as e:
+            LOGGER.warning(f"Can't get prepared prediction from redis: {e!r}")
+            return None
+
+        if data is None:
+            return None
+        return PreparedPrediction(**json.loads(data))
+
+    async def set(
+        self,
+        user_id: int,
+        target_date: date,
+        prediction: PreparedPrediction
+    ):
+        try:
+            await self.redis.set(
+                self._get_redis_key(user_id, target_date),
+                json.dumps(asdict(prediction), ensure_ascii=False),
+                ex=self.ttl
+            )
+        except RedisError as e:
+            LOGGER.warning(f"Can't save prepared prediction to redis: {e!r}")
+
+
+PRERENDER_HOUR: int = _get_setting("hour", DEFAULT_HOUR)
+PRERENDER_WINDOW = timedelta(
+    hours=_get_setting("window_hours", DEFAULT_WINDOW_HOURS)
+)
+
+prepared_predictions = PreparedPredictionStore(
+    redis,
+    ttl=timedelta(hours=_get_setting("ttl_hours", DEFAULT_TTL_HOURS))
+)
@@ -1,21 +1,20 @@
-import asyncio
-import logging
-from datetime import datetime, timedelta
-from typing import Optional
+from typing import List
 
-from aiogram import Bot, F, Router, exceptions
+from aiogram import F, Router, exceptions
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
 from src import config, messages
-from src.database import crud
+from src.broadcasts import broadcast_manager, format_broadcast_progress
+from src.enums import BroadcastStatus
 from src.keyboards import bt, keyboards
+from src.keyboards.callback_data import BroadcastAction
 from src.routers.states import AdminStates
-from src.exceptions import NoBroadcastDataError
 
 
 r = Router()
-DATETIME_FORMAT = config.get("database.datetime_format")
+
+ADMINS: List[int] = config.get("admins.ids")
 
 
 @r.callback_query(AdminStates.choose_action, F.data == bt.broadcast)
@@ -98,110 +97,64 @@ async def get_distribution_message_error(
 @r.callback_query(AdminStates.broadcast_get_confirm, F.data == bt.confirm)
 async def sending_distribution_confirmed(
     callback: CallbackQuery,
-    state: FSMContext,
-    bot: Bot,
+    state: FSMContext
 ):
-    del_message = await callback.message.answer(
-        messages.BROADCAST_STARTED,
-        reply_markup=keyboards.back_to_adminpanel()
-    )
-    await state.update_data(del_messages=[del_message.message_id])
-    await state.set_state(AdminStates.action_end)
-
     data = await state.get_data()
 
-    users_ids: list = [user.user_id for user in crud.get_users()]
-
-    now = datetime.utcnow()
-    now_in_Moskow = now + timedelta(hours=3)
-    broadcast_start_date_Moskow = str(now_in_Moskow.strftime(DATETIME_FORMAT))
-
-    count = await broadcast(
-        bot,
-        users_ids,
-        photo_file_id=data["broadcast_photo_file_id"],
-        text=data["broadcast_text"],
+    job = await broadcast_manager.create(
+        text=data.get("broadcast_text"),
+        photo_file_id=data.get("broadcast_photo_file_id"),
+        admin_chat_id=callback.message.chat.id
     )
+    progress = await broadcast_manager.get_progress(job.job_id)
 
-    dead_users = len(users_ids) - count
-    active_users = max(len(users_ids) - dead_users, 0)
-
-    now = datetime.utcnow()
-    now_in_Moskow = now + timedelta(hours=3)
-    broadcast_end_date_Moskow = str(now_in_Moskow.strftime(DATETIME_FORMAT))
-
-    await callback.message.answer(
-        text=messages.BROADCAST_STATISTIC.format(
-            dead_users=dead_users,
-            active_users=active_users,
-            broadcast_start_date_Moskow=broadcast_start_date_Moskow,
-            broadcast_end_date_Moskow=broadcast_end_date_Moskow,
-        )
+    # Сообщение с прогрессом обновляется по ходу рассылки, поэтому
+    # его не удаляем при следующем действии в админ-панели
+    status_message = await callback.message.answer(
+        format_broadcast_progress(progress),
+        reply_markup=keyboards.broadcast_control(job.job_id)
     )
+    await broadcast_manager.set_status_message(
+        job.job_id,
+        status_message.message_id
+    )
+    await state.update_data(del_messages=[])
+    await state.set_state(AdminStates.action_end)
 
 
-async def send_broadcast_message(
-    bot: Bot,
-    user_id: int,
-    photo_file_id: Optional[str],
-    text: Optional[str]
-) -> bool:
-    if photo_file_id is None and text is None:
-        raise NoBroadcastDataError()
-    try:
-        if photo_file_id is None:
-            await bot.send_message(chat_id=user_id, text=text)
-        else:
-            await bot.send_photo(
-                photo=photo_file_id,
-                chat_id=user_id,
-                caption=text
-            )
-
-    except exceptions.TelegramRetryAfter as e:
-        logging.info(
-            f"Target [ID:{user_id}]: Flood limit is exceeded. "
-            f"Sleep {e.retry_after} seconds."
+@r.callback_query(BroadcastAction.filter(), F.from_user.id.in_(ADMINS))
+async def broadcast_control(
+    callback: CallbackQuery,
+    callback_data: BroadcastAction
+):
+    job_id = callback_data.job_id
+
+    if callback_data.action == "pause":
+        await broadcast_manager.pause(job_id)
+    elif callback_data.action == "resume":
+        await broadcast_manager.resume(job_id)
+    elif callback_data.action == "cancel":
+        await broadcast_manager.cancel(job_id)
+
+    progress = await broadcast_manager.get_progress(job_id)
+    if progress is None:
+        await callback.answer(messages.BROADCAST_NOT_FOUND, show_alert=True)
+        return
+
+    if progress.job.status in (BroadcastStatus.RUNNING, BroadcastStatus.PAUSED):
+        reply_markup = keyboards.broadcast_control(
+            job_id,
+            paused=progress.job.status == BroadcastStatus.PAUSED
         )
-        await asyncio.sleep(e.retry_after)
-        await send_broadcast_message(
-            bot,
-            user_id,
-            photo_file_id,
-            text
-        )  # Recursive call
-    except (
-        exceptions.TelegramAPIError,
-        exceptions.TelegramForbiddenError,
-        exceptions.TelegramBadRequest,
-    ):
-        logging.info(f"Target [ID:{user_id}]: failed")
     else:
-        logging.info(f"Target [ID:{user_id}]: success")
-        return True
-    return False
-
-
-async def broadcast(
-    bot: Bot,
-    user_ids: list[int],
-    photo_file_id: Optional[str],
-    text: Optional[str]
-) -> int:
-    successes_count = 0
+        reply_markup = keyboards.back_to_adminpanel()
+
     try:
-        for user_id in user_ids:
-            if await send_broadcast_message(
-                bot,
-                user_id,
-                photo_file_id,
-                text
-            ):
-                successes_count += 1
-
-            # 10 messages per second (Limit: 30 messages per second)
-            await asyncio.sleep(0.1)
-
-    finally:
-        logging.info(f"{successes_count} messages successful sent.")
-    return successes_count
+        await callback.message.edit_text(
+            format_broadcast_progress(progress),
+            reply_markup=reply_markup
+        )
+    except exceptions.TelegramBadRequest:
+        # Прогресс не изменился с прошлого обновления
+        pass
+    await callback.answer()
@@ -6,9 +6,9 @@ from aiogram.types import CallbackQuery
 
 
 from src import config, messages
-from src.database import crud, Session
+from src.database import audience, crud, Session
 from src.database.models import Payment, Promocode, User
-from src.enums import Gender, PaymentStatus
+from src.enums import DeliveryStatus, Gender, PaymentStatus
 from src.keyboards import keyboards, bt
 from src.routers.states import AdminStates
 
@@ -16,73 +16,60 @@ from src.routers.states import AdminStates
 r = Router()
 
 DATETIME_FORMAT: str = config.get("database.datetime_format")
+STATISTICS_BATCH_SIZE = 1000
 
 
 @r.callback_query(F.data == bt.statistics)
-async def statistics(callback: CallbackQuery, state: FSMContext):
-    with Session() as session:
-        users = crud.get_all_users(session)
-
-        users_count = len(users)
-
-        mens = len([user for user in users if user.gender == Gender.male])
-        womens = len([user for user in users if user.gender == Gender.female])
-
-        trial_users_count = 0
-        active_clients_count = 0
-        free_users_count = 0
-        clients_count = 0
-
-        ages = []
-
-        now = datetime.utcnow()
-
-        for user in users:
-            end_date = datetime.strptime(
-                user.subscription_end_date,
-                DATETIME_FORMAT
-            )
-            payments = crud.get_payments(
-                session,
-                user_id=user.user_id,
-                status=PaymentStatus.SUCCESS.value
-            )
-
-            user_is_active_client = payments and now < end_date
-            user_is_on_trial = not payments and now < end_date
-            user_is_free = not payments and now > end_date
-            user_is_client = bool(payments)
-
-            if user_is_active_client:
-                active_clients_count += 1
-                if user_is_client:
-                    clients_count += 1
-
-            elif user_is_client:
-                clients_count += 1
-
-            elif user_is_on_trial:
-                trial_users_count += 1
+async def statistics(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: Session
+):
+    now = datetime.utcnow()
+
+    users_count = audience.count_users()
+    mens = audience.count_users(User.gender == Gender.male.value)
+    womens = audience.count_users(User.gender == Gender.female.value)
+
+    clients_count = audience.count_users(audience.paying_clients())
+    active_clients_count = audience.count_users(
+        audience.paying_clients(),
+        audience.active_subscription(now)
+    )
+    trial_users_count = audience.count_users(audience.trial_users(now))
+    free_users_count = audience.count_users(
+        ~audience.paying_clients(),
+        ~audience.active_subscription(now)
+    )
 
-            elif user_is_free:
-                free_users_count += 1
+    undeliverable_users_count = audience.count_users(audience.undeliverable())
+    blocked_users_count = audience.count_users(
+        audience.undeliverable(DeliveryStatus.BLOCKED)
+    )
+    deactivated_users_count = audience.count_users(
+        audience.undeliverable(DeliveryStatus.DEACTIVATED)
+    )
 
-            birth_datetime = datetime.strptime(
-                user.birth_datetime,
-                DATETIME_FORMAT
-            )
-            ages.append((now - birth_datetime).days / 365)
+    ages_sum, ages_count = 0.0, 0
+    birth_datetimes = session.query(User.birth_datetime).yield_per(
+        STATISTICS_BATCH_SIZE
+    )
+    for (birth_datetime,) in birth_datetimes:
+        birth_datetime = datetime.strptime(birth_datetime, DATETIME_FORMAT)
+        ages_sum += (now - birth_datetime).days / 365
+        ages_count += 1
 
-        average_age = sum(ages) / len(ages)
-        average_age_str = round(average_age, 1) if ages else "Нет данных"
+    average_age_str = (
+        round(ages_sum / ages_count, 1) if ages_count else "Нет данных"
+    )
 
-        subscriptions = count_subscriptions(session)
-        total_revenue = get_total_revenue(session)
+    subscriptions = count_subscriptions(session)
+    total_revenue = get_total_revenue(session)
 
-        total_transactions = count_total_transactions(session)
-        successful_transactions = count_successful_transactions(session)
+    total_transactions = count_total_transactions(session)
+    successful_transactions = count_successful_transactions(session)
 
-        declined_transactions = total_transactions - successful_transactions
+    declined_transactions = total_transactions - successful_transactions
 
     text = messages.ADMIN_STATISTICS.format(
         users_count=users_count,
@@ -90,6 +77,9 @@ async def statistics(callback: CallbackQuery, state: FSMContext):
         clients_count=clients_count,
         active_clients_count=active_clients_count,
         free_users_count=free_users_count,
+        undeliverable_users_count=undeliverable_users_count,
+        blocked_users_count=blocked_users_count,
+        deactivated_users_count=deactivated_users_count,
         average_age=average_age_str,
         percentage_men=mens,
         percentage_women=womens,
@@ -53,16 +53,24 @@ async def user_settings_menu(callback: CallbackQuery, state: FSMContext):
     F.forward_origin,
     F.forward_origin.type == MessageOriginType.USER
 )
-async def get_user_message(message: Message, state: FSMContext):
+async def get_user_message(
+    message: Message,
+    state: FSMContext,
+    session: Session
+):
     await state.update_data(user_id=message.forward_from.id)
-    await get_user_info_menu(message, state)
+    await get_user_info_menu(message, state, session)
 
 
 @r.message(AdminStates.get_user_message, F.text.regexp(USER_ID_REGEX))
 @r.message(AdminStates.user_info_menu, F.text.regexp(USER_ID_REGEX))
-async def get_user_id_from_message(message: Message, state: FSMContext):
+async def get_user_id_from_message(
+    message: Message,
+    state: FSMContext,
+    session: Session
+):
     await state.update_data(user_id=int(message.text))
-    await get_user_info_menu(message, state)
+    await get_user_info_menu(message, state, session)
 
 
 @r.message(
@@ -93,36 +101,40 @@ async def get_user_id_hidden_user_error(message: Message, state: FSMContext):
 )
 async def get_user_info_menu_callback_handler(
     callback: CallbackQuery,
-    state: FSMContext
+    state: FSMContext,
+    session: Session
 ):
-    await get_user_info_menu(callback.message, state)
+    await get_user_info_menu(callback.message, state, session)
 
 
-async def get_user_info_menu(message: Message, state: FSMContext):
+async def get_user_info_menu(
+    message: Message,
+    state: FSMContext,
+    session: Session
+):
     data = await state.get_data()
     user_id = data.get("user_id", 0)
-    with Session() as session:
-        user = crud.get_user(user_id=user_id)
-
-        if user:
-            unused_predictions = crud.get_unviewed_predictions_count(
-                session,
-                user_id=user_id
-            )
-            bot_message = await message.answer(
-                messages.USER_INFO.format(
-                    subscription_end=user.subscription_end_date,
-                    birth_datetime=user.birth_datetime,
-                    unused_predictions=unused_predictions,
-                ),
-                reply_markup=keyboards.user_info_menu(),
-            )
-
-        else:
-            bot_message = await message.answer(
-                messages.USER_NOT_FOUND,
-                reply_markup=keyboards.back_to_adminpanel()
-            )
+    user = crud.get_user(user_id=user_id, session=session)
+
+    if user:
+        unused_predictions = crud.get_unviewed_predictions_count(
+            session,
+            user_id=user_id
+        )
+        bot_message = await message.answer(
+            messages.USER_INFO.format(
+                subscription_end=user.subscription_end_date,
+                birth_datetime=user.birth_datetime,
+                unused_predictions=unused_predictions,
+            ),
+            reply_markup=keyboards.user_info_menu(),
+        )
+
+    else:
+        bot_message = await message.answer(
+            messages.USER_NOT_FOUND,
+            reply_markup=keyboards.back_to_adminpanel()
+        )
 
     await state.update_data(
         del_messages=[bot_message.message_id],
@@ -155,6 +167,7 @@ async def delete_user_subscription(
     callback: CallbackQuery,
     state: FSMContext,
     scheduler,
+    session: Session,
 ):
     await state.update_data(
         new_subscription_end_date=datetime.utcnow().strftime(DATETIME_FORMAT)
@@ -162,7 +175,8 @@ async def delete_user_subscription(
     await change_user_subscription_end_date(
         callback.message,
         state,
-        scheduler
+        scheduler,
+        session
     )
 
 
@@ -171,12 +185,14 @@ async def get_user_subscription_end_date(
     message: Message,
     state: FSMContext,
     scheduler,
+    session: Session,
 ):
     await state.update_data(new_subscription_end_date=message.text)
     await change_user_subscription_end_date(
         message,
         state,
-        scheduler
+        scheduler,
+        session
     )
 
 
@@ -184,6 +200,7 @@ async def change_user_subscription_end_date(
     message: Message,
     state: FSMContext,
     scheduler,
+    session: Session,
 ):
     data = await state.get_data()
     user_id = data["user_id"]
@@ -198,7 +215,7 @@ async def change_user_subscription_end_date(
 
     await scheduler.set_all_jobs(user_id=user_id)
 
-    await get_user_info_menu(message, state)
+    await get_user_info_menu(message, state, session)
 
 
 @r.callback_query(
@@ -221,17 +238,20 @@ async def change_user_birth_datetime_menu(
 async def get_user_birth_datetime_date(
     message: Message,
     state: FSMContext,
+    session: Session,
 ):
     await state.update_data(new_user_birth_datetime=message.text)
     await change_user_birth_datetime(
         message,
-        state
+        state,
+        session
     )
 
 
 async def change_user_birth_datetime(
     message: Message,
     state: FSMContext,
+    session: Session,
 ):
     data = await state.get_data()
     user_id = data["user_id"]
@@ -242,4 +262,4 @@ async def change_user_birth_datetime(
         birth_datetime=new_user_birth_datetime,
     )
 
-    await get_user_info_menu(message, state)
+    await get_user_info_menu(message, state, session)
@@ -8,7 +8,7 @@ from src import config, messages
 from src.filters import IsDate, IsTime
 from src.keyboard_manager import KeyboardManager, bt
 from src.routers.states import GetBirthData, MainMenu, ProfileSettings
-from src.utils import get_location_by_coords
+from src.geocoding import geocoder
 
 r = Router()
 r.message.filter(~F.text.startswith("/"))
@@ -240,7 +240,10 @@ async def enter_birth_data_confirm(
     longitude = data["longitude"]
     latitude = data["latitude"]
 
-    birth_location_title = get_location_by_coords(longitude, latitude)
+    birth_location_title = await geocoder.get_location_title_async(
+        latitude=latitude,
+        longitude=longitude
+    )
     birth_data_confirm_message = await message.answer(
         messages.BIRTH_DATA_CONFIRM.format(
             name=data["name"],
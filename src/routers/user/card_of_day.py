@@ -7,7 +7,6 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, User
 
 from src import config, messages
-from src.database import Database
 from src.keyboard_manager import KeyboardManager, bt
 from src.routers.states import MainMenu
 
@@ -22,11 +21,11 @@ async def card_of_day_menu(
     message: Message,
     state: FSMContext,
     keyboards: KeyboardManager,
-    database,
+    async_database,
     event_from_user: User,
     bot: Bot,
 ):
-    user = database.get_user(event_from_user.id)
+    user = await async_database.get_user(event_from_user.id)
 
     today = datetime.utcnow() + timedelta(hours=user.timezone_offset)
     formatted_today = today.strftime(DATE_FORMAT)
@@ -38,7 +37,7 @@ async def card_of_day_menu(
     ):
         card_message_id = user.card_message_id
     else:
-        cards = database.get_all_card_of_day()
+        cards = await async_database.get_all_card_of_day()
 
         if len(cards) == 0:
             bot_message = await message.answer(
@@ -61,7 +60,7 @@ async def card_of_day_menu(
             )
 
         except TelegramBadRequest:
-            cards = database.get_all_card_of_day()
+            cards = await async_database.get_all_card_of_day()
 
             if len(cards) == 0:
                 bot_message = await message.answer(
@@ -86,7 +85,7 @@ async def card_of_day_menu(
 
     # В самом конце чтобы задержку пользователь не видел
     if card_message_id != user.card_message_id:
-        database.update_user_card_of_day(
+        await async_database.update_user_card_of_day(
             user_id=event_from_user.id,
             card_message_id=card_message_id,
             card_update_time=today.strftime(DATE_FORMAT),
@@ -33,11 +33,11 @@ async def dreams_menu(
     user = database.get_user(event_from_user.id)
 
     latitude = user.current_location.latitude
-    longtitude = user.current_location.longitude
+    longitude = user.current_location.longitude
 
     now = datetime.utcnow()
 
-    lunar_day = get_main_lunar_day_at_date(now, latitude, longtitude)
+    lunar_day = get_main_lunar_day_at_date(now, longitude, latitude)
 
     bot_message = await message.answer_photo(
         photo=DREAMS_IMAGE,
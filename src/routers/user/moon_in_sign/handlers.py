@@ -3,13 +3,18 @@ from typing import Dict
 
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
-from aiogram.types import BufferedInputFile, CallbackQuery, Message, User
+from aiogram.types import CallbackQuery, Message, User
 
 from src import messages
+from src.astro_engine.models import Location
 from src.astro_engine.moon import get_moon_signs_at_date
+from src.compute_pool import compute_pool
 from src.database import Database
 from src.enums import FileName, MoonSignInterpretationType
-from src.image_processing import get_image_with_astrodata
+from src.image_processing import (
+    get_astrodata_photo,
+    remember_astrodata_photo
+)
 from src.keyboard_manager import KeyboardManager, bt
 from src.routers.states import MainMenu
 from src.routers.user.moon_in_sign.text_formatting import (
@@ -95,12 +100,20 @@ async def moon_in_sign_menu(
     timezone_offset: int = data["timezone_offset"]
     date = (datetime.utcnow() + timedelta(hours=timezone_offset)).date()
 
-    moon_signs = get_moon_signs_at_date(
-        date,
+    moon_signs = await compute_pool.run(
+        get_moon_signs_at_date,
+        date,  # %Y-%m-%d, not datetime
         timezone_offset,
-        user.current_location  # %Y-%m-%d, not datetime
+        Location(
+            longitude=user.current_location.longitude,
+            latitude=user.current_location.latitude
+        )
+    )
+    photo_key, photo = await get_astrodata_photo(
+        user,
+        FileName.MOON_SIGN.value,
+        moon_signs=moon_signs
     )
-    photo_bytes = await get_image_with_astrodata(user=user, moon_signs=moon_signs)
 
     interpretation_type_str = data.get("interpretation_type", bt.blank_moon)
     if interpretation_type_str == bt.blank_moon:
@@ -113,12 +126,8 @@ async def moon_in_sign_menu(
 
         text = get_formatted_moon_sign_text(moon_signs, interpretation_type)
 
-    photo = BufferedInputFile(
-        file=photo_bytes,
-        filename=FileName.MOON_SIGN.value
-    )
-
-    await message.answer_photo(photo=photo)
+    photo_message = await message.answer_photo(photo=photo)
+    await remember_astrodata_photo(photo_key, photo_message)
     bot_message = await message.answer(
         text,
         reply_markup=keyboards.moon_in_sign_menu
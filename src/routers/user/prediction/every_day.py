@@ -26,9 +26,9 @@ async def every_day_prediction(
     message: Message,
     state: FSMContext,
     event_from_user: User,
+    session: Session
 ):
-    with Session() as session:
-        user = crud.get_user(event_from_user.id, session)
+    user = crud.get_user(event_from_user.id, session)
 
     bot_message = await message.answer(
         messages.EVERY_DAY_PREDICTION_ACTIVATED.format(
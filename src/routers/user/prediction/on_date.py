@@ -2,18 +2,21 @@ from datetime import datetime, timedelta
 
 from aiogram import Bot, F, Router, exceptions
 from aiogram.fsm.context import FSMContext
-from aiogram.types import BufferedInputFile, CallbackQuery, Message, User
+from aiogram.types import CallbackQuery, Message, User
 
 from src import config, messages
 from src.database import crud
 from src.enums import FileName
 from src.filters import HaveActiveSubscription
-from src.image_processing import get_image_with_astrodata
+from src.image_processing import (
+    get_astrodata_photo,
+    remember_astrodata_photo
+)
 from src.keyboards import keyboards, bt
 from src.models import DateModifier
 from src.routers.states import MainMenu, Subscription
 from src.routers.user.prediction.text_formatting import get_prediction_text
-from src.utils import get_timezone_offset
+from src.timezones import timezone_service
 
 
 DATETIME_FORMAT: str = config.get("database.datetime_format")
@@ -106,7 +109,7 @@ async def prediction_for_today(
     user = database.get_user(event_from_user.id)
     current_location = database.get_location(user.current_location_id)
 
-    timezone_offset: int = get_timezone_offset(
+    timezone_offset: int = await timezone_service.get_offset_async(
         latitude=current_location.latitude,
         longitude=current_location.longitude
     )
@@ -185,11 +188,10 @@ async def prediction_on_date_get_prediction(
             user_id=event_from_user.id
         )
 
-        photo_bytes = await get_image_with_astrodata(user, date=target_date)
-
-        photo = BufferedInputFile(
-            file=photo_bytes,
-            filename=FileName.PREDICTION.value
+        photo_key, photo = await get_astrodata_photo(
+            user,
+            FileName.PREDICTION.value,
+            date=target_date
         )
 
         for msg in [wait_message, sticker_message]:
@@ -198,7 +200,8 @@ async def prediction_on_date_get_prediction(
             except exceptions.TelegramBadRequest:
                 continue
 
-        await message.answer_photo(photo=photo)
+        photo_message = await message.answer_photo(photo=photo)
+        await remember_astrodata_photo(photo_key, photo_message)
         prediction_message = await message.answer(
             text=text,
             reply_markup=keyboards.predict_completed()
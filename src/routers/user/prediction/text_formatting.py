@@ -1,4 +1,3 @@
-import asyncio
 import csv
 import logging
 import datetime
@@ -11,16 +10,19 @@ from babel.dates import format_date
 from src import config, messages
 from src.database import crud
 from src.database.models import User as DBUser
+from src.database.unit_of_work import unit_of_work
 from src.dicts import PLANET_ID_TO_NAME_RU, SWISSEPH_PLANET_TO_UNIVERSAL_PLANET
-from src.astro_engine.models import AstroEvent
+from src.astro_engine.models import AstroEvent, NatalChart
 from src.astro_engine.models import Location as PredictionLocation
 from src.astro_engine.models import User as PredictionUser
 from src.astro_engine.predictions import (
+    get_astro_events_for_users,
     get_astro_events_from_period,
-    get_astro_events_from_period_with_duplicates
+    get_transit_timeline
 )
 from src.routers.user.prediction.models import Interpretation
 from src.common import DAY_SELECTION_DATABASE
+from src.compute_pool import compute_pool
 from src.enums import SwissEphPlanet
 
 
@@ -88,6 +90,12 @@ MONTHS = [
 
 interpretations_dict = get_interpretations_dict()
 
+UNIVERSAL_PLANET_TO_SWISSEPH_PLANET = {
+    universal_planet.value: swisseph_planet
+    for swisseph_planet, universal_planet
+    in SWISSEPH_PLANET_TO_UNIVERSAL_PLANET.items()
+}
+
 
 def formatted_general_events(events: List[AstroEvent]) -> str:
     interpretations = []
@@ -182,9 +190,9 @@ def format_date_russian(date: datetime) -> str:
     return f"{day_name}, {day_num} {month_name}"
 
 
-def filtered_and_formatted_prediction(user, date: date) -> str:
-
-    prediction_user = PredictionUser(
+def get_prediction_user(user: DBUser) -> PredictionUser:
+    """Данные пользователя для астродвижка, без привязки к сессии БД."""
+    return PredictionUser(
         birth_datetime=datetime.strptime(user.birth_datetime, DATETIME_FORMAT),
         birth_location=PredictionLocation(
             longitude=user.birth_location.longitude,
@@ -195,12 +203,59 @@ def filtered_and_formatted_prediction(user, date: date) -> str:
             latitude=user.current_location.latitude
         ),
     )
+
+
+def get_prediction_period(date: date) -> tuple[datetime, datetime]:
+    """Период, аспекты которого входят в прогноз на дату."""
     date = datetime(date.year, date.month, date.day)
+    return date + timedelta(hours=3), date + timedelta(hours=27)
+
+
+def filtered_and_formatted_prediction(
+    prediction_user: PredictionUser,
+    name: str,
+    date: date,
+    natal_chart: Optional[NatalChart] = None
+) -> str:
+    start, finish = get_prediction_period(date)
     astro_events = get_astro_events_from_period(
-        start=date + timedelta(hours=3),
-        finish=date + timedelta(hours=27),
+        start=start,
+        finish=finish,
         user=prediction_user,
+        natal_chart=natal_chart,
+    )
+    return format_prediction(astro_events, name, date)
+
+
+def filtered_and_formatted_predictions(
+    prediction_users: List[PredictionUser],
+    names: List[str],
+    date: date,
+    natal_charts: List[NatalChart]
+) -> List[str]:
+    """
+    Прогнозы на одну дату для многих пользователей: аспекты всех
+    пользователей ищутся одним пакетным расчётом.
+    """
+    start, finish = get_prediction_period(date)
+    users_events = get_astro_events_for_users(
+        prediction_users,
+        start,
+        finish,
+        natal_charts
     )
+    return [
+        format_prediction(astro_events, name, date)
+        for astro_events, name in zip(users_events, names)
+    ]
+
+
+def format_prediction(
+    astro_events: List[AstroEvent],
+    name: str,
+    date: date
+) -> str:
+    date = datetime(date.year, date.month, date.day)
 
     start_of_day = date + timedelta(hours=6, minutes=30)
     middle_of_day = date + timedelta(hours=15, minutes=30)
@@ -265,7 +320,7 @@ def filtered_and_formatted_prediction(user, date: date) -> str:
     texts = []
 
     recommendations_heading = messages.PREDICTION_RECOMENDATION_HEADING.format(
-        name=user.name
+        name=name
     )
 
     if not day_events_formatted:
@@ -348,18 +403,46 @@ def filtered_and_formatted_prediction(user, date: date) -> str:
     return formatted_text
 
 
-async def get_prediction_text(date: datetime, user_id: int) -> str:
-    user = crud.get_user(user_id=user_id)
+async def calculate_prediction_text(date: datetime, user: DBUser) -> str:
+    """Текст прогноза без отметки о просмотре - для подготовки заранее."""
+    natal_chart = crud.get_natal_chart(user.user_id)
 
-    loop = asyncio.get_running_loop()
-    future = loop.run_in_executor(
-        None,
+    # В пул процессов уходят только простые данные, а не объект ORM
+    return await compute_pool.run(
         filtered_and_formatted_prediction,
-        user,
-        date
+        get_prediction_user(user),
+        user.name,
+        date,
+        natal_chart
+    )
+
+
+async def calculate_prediction_texts(
+    date: date,
+    users: List[DBUser]
+) -> List[str]:
+    """
+    Тексты прогнозов на дату для группы пользователей одной задачей пула.
+
+    Недостающие натальные карты фиксируются в своей единице работы до
+    ожидания пула: ночная подготовка ничего больше не пишет, а иначе
+    держала бы блокировку записи до конца своей единицы.
+    """
+    with unit_of_work("prediction_natal_charts"):
+        natal_charts = [crud.get_natal_chart(user.user_id) for user in users]
+
+    return await compute_pool.run(
+        filtered_and_formatted_predictions,
+        [get_prediction_user(user) for user in users],
+        [user.name for user in users],
+        date,
+        natal_charts
     )
 
-    text = await future
+
+async def get_prediction_text(date: datetime, user_id: int) -> str:
+    user = crud.get_user(user_id=user_id)
+    text = await calculate_prediction_text(date, user)
     crud.add_viewed_prediction(
         user_id=user_id,
         prediction_date=date.strftime(DATE_FORMAT)
@@ -396,26 +479,17 @@ async def get_formatted_selected_days(
         subscription_end.day
     )
 
-    prediction_user = PredictionUser(
-        birth_datetime=datetime.strptime(user.birth_datetime, DATETIME_FORMAT),
-        birth_location=PredictionLocation(
-            longitude=user.birth_location.longitude,
-            latitude=user.birth_location.latitude
-        ),
-        current_location=PredictionLocation(
-            longitude=user.current_location.longitude,
-            latitude=user.current_location.latitude
-        ),
-    )
-    astro_events = await get_astro_events_from_period_with_duplicates(
-        start=start_timepoint,
-        finish=end_timepoint,
-        user=prediction_user,
-    )
+    # Таймлайн хранится в UTC
+    start_utc = start_timepoint - timedelta(hours=user.timezone_offset)
+    finish_utc = end_timepoint - timedelta(hours=user.timezone_offset)
 
-    right_events = remove_duplicates_from_astro_events(
-        astro_events,
-        selected_aspects
+    await update_transit_timeline(user, start_utc, finish_utc)
+
+    right_events = crud.get_transit_events(
+        user.user_id,
+        get_day_selection_filter(selected_aspects),
+        start_utc,
+        finish_utc
     )
 
     return format_astro_events_for_day_selection(
@@ -425,6 +499,63 @@ async def get_formatted_selected_days(
     )
 
 
+async def update_transit_timeline(
+    user: DBUser,
+    start: datetime,
+    finish: datetime
+):
+    """
+    Достраивает таймлайн точных транзитов пользователя до finish (с
+    запасом до конца суток). Считаются только недостающие дни, таймлайн
+    заново строится лишь после смены данных рождения.
+    """
+    finish = datetime(finish.year, finish.month, finish.day) + timedelta(days=1)
+
+    scan_from = start
+    timeline = crud.get_transit_timeline(user.user_id)
+    if timeline is not None:
+        computed_from = datetime.strptime(
+            timeline.computed_from,
+            crud.TIMELINE_DATETIME_FORMAT
+        )
+        computed_until = datetime.strptime(
+            timeline.computed_until,
+            crud.TIMELINE_DATETIME_FORMAT
+        )
+
+        if computed_from <= start:
+            if computed_until >= finish:
+                return
+            scan_from = max(computed_until, start)
+
+    events = await compute_pool.run(
+        get_transit_timeline,
+        scan_from,
+        finish,
+        crud.get_natal_chart(user.user_id)
+    )
+    crud.add_transit_events(
+        user.user_id,
+        events,
+        computed_from=start,
+        computed_until=finish
+    )
+
+
+def get_day_selection_filter(
+    selected_aspects: list[dict]
+) -> list[tuple[int, int, list[int]]]:
+    """Аспекты из day_selection.json в виде фильтра для таймлайна."""
+    return [
+        (
+            UNIVERSAL_PLANET_TO_SWISSEPH_PLANET[aspect_group["natal_planet"]],
+            UNIVERSAL_PLANET_TO_SWISSEPH_PLANET[aspect_group["transit_planet"]],
+            aspect_group["degrees"]
+        )
+        for aspect_group in selected_aspects
+    ]
+
+
 def remove_duplicates_from_astro_events(
     astro_events,
     selected_aspects
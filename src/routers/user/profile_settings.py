@@ -9,12 +9,13 @@ from src.database import crud, Session
 from src.database.models import Location
 from src.database.models import User as DBUser
 from src.enums import Gender, LocationType
+from src.geocoding import geocoder
 from src.keyboards import keyboards, bt
 from src.keyboard_manager import buttons_text
 from src.routers.states import ProfileSettings
 from src.routers.user.main_menu import main_menu
 from src.scheduler import EveryDayPredictionScheduler
-from src.utils import get_location_by_coords, get_timezone_offset
+from src.timezones import timezone_service
 
 
 DATETIME_FORMAT: str = config.get("database.datetime_format")
@@ -184,9 +185,9 @@ async def get_current_location(message: Message, state: FSMContext):
     longitude = message.location.longitude
     latitude = message.location.latitude
 
-    current_location_title = get_location_by_coords(
-        longitude=longitude,
-        latitude=latitude
+    current_location_title = await geocoder.get_location_title_async(
+        latitude=latitude,
+        longitude=longitude
     )
 
     if data.get('first_time', False):
@@ -237,78 +238,81 @@ async def get_current_location_confirmed(
     event_from_user: User,
     bot: Bot,
     scheduler: EveryDayPredictionScheduler,
+    session: Session
 ):
     data = await state.get_data()
 
     name = data["name"]
     current_location = data["current_location"]
     current_location_title = data["current_location_title"]
-    with Session() as session:
-        if data.get("first_time", False):
-            birth_datetime = data["birth_datetime"]
-            birth_location = data["birth_location"]
-            birth_location_title = data["birth_location_title"]
-
-            now = datetime.utcnow()
-            test_period_end = now + timedelta(days=SUBSCRIPTION_TEST_PERIOD)
-
-            crud.add_user(
-                session,
-                DBUser(
-                    user_id=event_from_user.id,
-                    name=name,
-                    birth_datetime=birth_datetime,
-                    birth_location=Location(
-                        type=LocationType.birth.value,
-                        **birth_location,
-                        title=birth_location_title
-                    ),
-                    current_location=Location(
-                        type=LocationType.current.value,
-                        **current_location,
-                        title=current_location_title
-                    ),
-                    subscription_end_date=test_period_end.strftime(
-                        DATETIME_FORMAT
-                    ),
-                    timezone_offset=get_timezone_offset(**current_location),
-                    every_day_prediction_time="8:30",
-                )
-            )
-
-            crud.apply_pending_subscription_to_user(
-                session, event_from_user.id
-            )
-
-            await scheduler.set_all_jobs(user_id=event_from_user.id)
-
-            await state.update_data(
-                prediction_access=True,
+    timezone_offset = await timezone_service.get_offset_async(
+        **current_location
+    )
+    if data.get("first_time", False):
+        birth_datetime = data["birth_datetime"]
+        birth_location = data["birth_location"]
+        birth_location_title = data["birth_location_title"]
+
+        now = datetime.utcnow()
+        test_period_end = now + timedelta(days=SUBSCRIPTION_TEST_PERIOD)
+
+        crud.add_user(
+            session,
+            DBUser(
+                user_id=event_from_user.id,
+                name=name,
+                birth_datetime=birth_datetime,
+                birth_location=Location(
+                    type=LocationType.birth.value,
+                    **birth_location,
+                    title=birth_location_title
+                ),
+                current_location=Location(
+                    type=LocationType.current.value,
+                    **current_location,
+                    title=current_location_title
+                ),
                 subscription_end_date=test_period_end.strftime(
                     DATETIME_FORMAT
                 ),
-                timezone_offset=get_timezone_offset(**current_location),
+                timezone_offset=timezone_offset,
+                every_day_prediction_time="8:30",
             )
+        )
 
-            await main_menu(callback.message, state, bot)
+        crud.apply_pending_subscription_to_user(
+            session, event_from_user.id
+        )
 
-        else:
-            crud.update_user_current_location(
-                session,
-                event_from_user.id,
-                Location(
-                    type=LocationType.current.value,
-                    **current_location,
-                    title=get_location_by_coords(**current_location)
-                ),
-            )
-            crud.update_user(
-                event_from_user.id,
-                timezone_offset=get_timezone_offset(**current_location)
-            )
-            await scheduler.set_all_jobs(user_id=event_from_user.id)
-            await profile_settings_menu(
-                callback.message,
-                state,
-                event_from_user
-            )
+        await scheduler.set_all_jobs(user_id=event_from_user.id)
+
+        await state.update_data(
+            prediction_access=True,
+            subscription_end_date=test_period_end.strftime(
+                DATETIME_FORMAT
+            ),
+            timezone_offset=timezone_offset,
+        )
+
+        await main_menu(callback.message, state, bot)
+
+    else:
+        crud.update_user_current_location(
+            session,
+            event_from_user.id,
+            Location(
+                type=LocationType.current.value,
+                **current_location,
+                title=current_location_title
+            ),
+        )
+        crud.update_user(
+            event_from_user.id,
+            timezone_offset=timezone_offset
+        )
+        await scheduler.set_all_jobs(user_id=event_from_user.id)
+        await profile_settings_menu(
+            callback.message,
+            state,
+            event_from_user
+        )
@@ -1,33 +1,50 @@
-from tqdm import tqdm
-
 import logging
 import asyncio
 
-from typing import Optional, Union
-from datetime import datetime, timedelta
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
 
-from aiogram.exceptions import (
-    TelegramForbiddenError,
-    TelegramRetryAfter,
-    TelegramAPIError
-)
-from aiogram.types import BufferedInputFile, ReplyKeyboardMarkup, InlineKeyboardMarkup
+from aiogram.exceptions import TelegramForbiddenError
 
 from apscheduler.jobstores.base import JobLookupError
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from sqlalchemy.orm import scoped_session
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
 
 from src import config, messages
-from src.database import (
-    Session as MainSession,
-    crud
-)
+from src.astro_engine.moon import get_void_of_course_periods
+from src.compute_pool import compute_pool
+from src.database import audience, crud
+from src.database.database import engine
 from src.database.models import User
-from src.enums import FileName
-from src.image_processing import get_image_with_astrodata
-from src.routers.user.prediction.text_formatting import get_prediction_text
-from src.utils import get_timezone_str_from_offset
+from src.database.unit_of_work import (
+    after_commit,
+    session_scope,
+    unit_of_work
+)
+from src.enums import FileName, SendPriority
+from src.image_processing import (
+    get_astrodata_image_inputs,
+    get_astrodata_photo,
+    get_cached_astrodata_photo,
+    prerender_astrodata_photo,
+    remember_astrodata_photo
+)
+from src.prepared_predictions import (
+    PRERENDER_HOUR,
+    PRERENDER_WINDOW,
+    PreparedPrediction,
+    get_user_fingerprint,
+    prepared_predictions
+)
+from src.send_pipeline import MAX_CONCURRENT_SENDS, send_priority
+from src.routers.user.prediction.text_formatting import (
+    calculate_prediction_text,
+    calculate_prediction_texts
+)
 from src.keyboards import keyboards
 from src.common import bot
 
@@ -39,43 +56,84 @@ DATE_FORMAT: str = config.get("database.date_format")
 TIME_FORMAT: str = config.get("database.time_format")
 
 REMINDER_TIMES = [36, 12]
+REMINDERS_JOBSTORE = "reminders"
+RECONCILE_REMINDERS_INTERVAL_MINUTES = 60
+# Сколько пользователей сверка напоминаний и ночная подготовка
+# прогнозов держат в памяти за раз
+RECONCILE_REMINDERS_BATCH_SIZE = 1000
+PRERENDER_BATCH_SIZE = 500
+# Сколько текстов прогнозов считает одна задача пула процессов
+PRERENDER_TEXTS_BATCH_SIZE = 100
 
-Session = scoped_session(MainSession)
+# Календарь холостой луны считается на столько дней вперёд и хранится
+# столько дней назад (запас на часовые пояса пользователей)
+VOID_OF_COURSE_DAYS_AHEAD = 60
+VOID_OF_COURSE_DAYS_BEHIND = 2
 
-def retry(retries=3, delay=1):
-    def decorator(func):
-        async def wrapper(*args, **kwargs):
-            for attempt in range(retries + 1):
-                try:
-                    return await func(*args, **kwargs)
-                except Exception as e:
-                    if attempt < retries:
-                        await asyncio.sleep(delay)
-                    else:
-                        raise e
-        return wrapper
-    return decorator
-
-
-@retry(retries=3, delay=1)
-async def send_message_with_retry(
-    chat_id: int,
-    text: str,
-    reply_markup: Optional[Union[InlineKeyboardMarkup, ReplyKeyboardMarkup]] = None
-):
+# Сколько минут диспетчер прогнозов догоняет после опоздавшего тика
+DISPATCH_MAX_CATCH_UP_MINUTES = 60
+
+
+async def send_renewal_reminder(user_id: int):
+    """
+    Send a reminder to the user that their subscription is
+    about to end.
+
+    Функция модуля, а не метод: задачи напоминаний хранятся в БД и
+    ссылаются на неё по имени.
+    """
+    with unit_of_work(f"send_renewal_reminder {user_id}"):
+        if crud.get_user_delivery_status(user_id) is not None:
+            return
+
+        with send_priority(SendPriority.SCHEDULED):
+            await bot.send_message(
+                chat_id=user_id,
+                text=messages.RENEW_SUBSCRIPTION_REMIND,
+                reply_markup=keyboards.main_menu()
+            )
+
+
+def get_reminder_times(
+    subscription_end_date: Optional[str]
+) -> Dict[int, datetime]:
+    """Моменты напоминаний (UTC) по числу часов до конца подписки."""
     try:
-        await bot.send_message(
-            chat_id=chat_id,
-            text=text,
-            reply_markup=reply_markup
+        subscription_end_datetime = datetime.strptime(
+            subscription_end_date,
+            DATETIME_FORMAT
         )
+    except (TypeError, ValueError):
+        return {}
+
+    return {
+        hours_before_end: subscription_end_datetime - timedelta(
+            hours=hours_before_end
+        )
+        for hours_before_end in REMINDER_TIMES
+    }
+
+
+def get_minute_of_day(moment: datetime) -> int:
+    return moment.hour * 60 + moment.minute
 
-    except TelegramRetryAfter as e:
-        await asyncio.sleep(e.retry_after)
-        raise
 
-    except TelegramAPIError:
-        raise
+def get_next_prediction_datetime(user: User, now: datetime) -> datetime:
+    """Ближайший после now (UTC) момент отправки прогноза, в UTC."""
+    timezone_offset = timedelta(hours=user.timezone_offset)
+    time = datetime.strptime(user.every_day_prediction_time, TIME_FORMAT)
+
+    local_now = now + timezone_offset
+    delivery = local_now.replace(
+        hour=time.hour,
+        minute=time.minute,
+        second=0,
+        microsecond=0
+    )
+    if delivery <= local_now:
+        delivery += timedelta(days=1)
+
+    return delivery - timezone_offset
 
 
 class EveryDayPredictionScheduler(AsyncIOScheduler):
@@ -84,9 +142,21 @@ class EveryDayPredictionScheduler(AsyncIOScheduler):
     renewal reminders.
     """
 
-    def __init__(self, max_concurrent_tasks: int = 5):
+    def __init__(
+        self,
+        max_concurrent_tasks: int = MAX_CONCURRENT_SENDS,
+        jobstore_engine: Engine = engine
+    ):
         super().__init__()
         self.semaphore = asyncio.Semaphore(max_concurrent_tasks)
+        self._last_dispatched_minute: Optional[datetime] = None
+
+        # Напоминания переживают перезапуск, служебные задачи
+        # пересоздаются при старте в памяти
+        self.add_jobstore(
+            SQLAlchemyJobStore(engine=jobstore_engine),
+            REMINDERS_JOBSTORE
+        )
 
     def add_task(self, function, trigger, task_id: str, **kwargs):
         """
@@ -102,30 +172,369 @@ class EveryDayPredictionScheduler(AsyncIOScheduler):
         )
 
     async def set_all_jobs(self, user_id: int):
-        await self.delete_reminder_jobs(user_id)
-        await self.delete_send_prediction_job(user_id)
+        """
+        Перепланирует напоминания пользователя после изменения его
+        данных. Ежедневный прогноз задач не требует: его отправляет
+        диспетчер по users.prediction_utc_minute.
+
+        Хранилище задач пишет своим соединением, поэтому внутри единицы
+        работы сверка откладывается до её фиксации.
+        """
+        after_commit(lambda: self._reconcile_user_reminders(user_id))
 
-        with Session() as session:
-            await self.add_send_prediction_job(user_id, session)
-            await self.add_reminder_jobs(user_id, session)
+    def _reconcile_user_reminders(self, user_id: int):
+        with session_scope() as session:
+            self.reconcile_reminders(session, user_id)
 
     async def check_users_and_schedule(self):
-        with Session() as session:
-            rows = session.query(User.user_id).all()
-            user_ids = [row[0] for row in rows]
+        # После обновления первая сверка записывает задачи всех
+        # подписчиков - это долго, поэтому не в цикле событий
+        await asyncio.to_thread(self._reconcile_all_reminders)
+
+    def _reconcile_all_reminders(self):
+        # Короткая сессия, а не единица работы: каждая страница
+        # фиксируется сразу, иначе хранилище задач ждало бы блокировку
+        # записи страницы до конца сверки
+        with session_scope() as session:
+            self.reconcile_reminders(session)
+
+    async def add_reconcile_job(self):
+        """
+        Периодическая сверка напоминаний: подписку продлевают и вебхуки
+        оплаты, которые не вызывают set_all_jobs.
+        """
+        self.add_task(
+            self.check_users_and_schedule,
+            "interval",
+            "reminders_reconciliation",
+            minutes=RECONCILE_REMINDERS_INTERVAL_MINUTES,
+            replace_existing=True
+        )
+
+    def reconcile_reminders(
+        self,
+        session: Session,
+        user_id: Optional[int] = None
+    ):
+        """
+        Приводит напоминания в постоянном хранилище задач к данным
+        пользователей. Трогаются только пользователи, у которых дата
+        окончания подписки изменилась с прошлой сверки.
+        """
+        now = datetime.utcnow()
+        changed_count, deleted_count = 0, 0
+
+        # Сверенные пользователи из выборки пропадают, поэтому берётся
+        # первая страница расхождений, пока они не кончатся
+        while True:
+            changed, deleted = crud.get_reminder_schedule_changes(
+                session,
+                user_id,
+                limit=RECONCILE_REMINDERS_BATCH_SIZE
+            )
+
+            for row_user_id, end_date, scheduled_end_date in changed:
+                self._reschedule_reminders(
+                    row_user_id,
+                    end_date,
+                    scheduled_end_date,
+                    now
+                )
+            for row_user_id, scheduled_end_date in deleted:
+                self._reschedule_reminders(
+                    row_user_id,
+                    None,
+                    scheduled_end_date,
+                    now
+                )
+
+            crud.update_reminder_schedules(session, changed, deleted)
+            changed_count += len(changed)
+            deleted_count += len(deleted)
+
+            if (
+                len(changed) < RECONCILE_REMINDERS_BATCH_SIZE
+                and len(deleted) < RECONCILE_REMINDERS_BATCH_SIZE
+            ):
+                break
+
+        if changed_count or deleted_count:
+            LOGGER.info(
+                f"Reminders rescheduled for {changed_count} users, "
+                f"removed for {deleted_count} deleted users"
+            )
+
+    async def add_dispatch_job(self):
+        """
+        Одна задача на все ежедневные прогнозы: каждую минуту отправляет
+        их пользователям, чьё время отправки пришлось на эту минуту UTC.
+        """
+        self.add_task(
+            self.dispatch_predictions,
+            "cron",
+            "prediction_dispatcher",
+            second=0,
+            timezone="UTC",
+            replace_existing=True
+        )
+
+    async def dispatch_predictions(self):
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+
+        # Минуты, пропущенные из-за опоздавшего тика, отправляются вместе
+        # с текущей, но не больше DISPATCH_MAX_CATCH_UP_MINUTES
+        if self._last_dispatched_minute is None:
+            minutes_count = 1
+        else:
+            minutes_count = min(
+                (now - self._last_dispatched_minute) // timedelta(minutes=1),
+                DISPATCH_MAX_CATCH_UP_MINUTES
+            )
+        if minutes_count <= 0:
+            return
+        self._last_dispatched_minute = now
+
+        minutes = [
+            get_minute_of_day(now - timedelta(minutes=minutes_ago))
+            for minutes_ago in range(minutes_count)
+        ]
+
+        with session_scope() as session:
+            user_ids = crud.get_user_ids_by_prediction_minutes(
+                session,
+                minutes
+            )
+
+        # Скорость отправки ограничивает конвейер, а не семафор
+        with send_priority(SendPriority.SCHEDULED):
+            await asyncio.gather(*[
+                self.send_prediction(user_id) for user_id in user_ids
+            ])
+
+        if user_ids:
+            LOGGER.info(
+                f"Dispatched {len(user_ids)} predictions "
+                f"for {now.strftime(DATETIME_FORMAT)} UTC"
+            )
+
+    async def add_void_of_course_job(self):
+        """
+        Ежедневное обновление календаря холостой луны, первый запуск -
+        сразу.
+        """
+        self.add_task(
+            self.update_void_of_course_calendar,
+            "interval",
+            "void_of_course_calendar",
+            hours=24,
+            next_run_time=datetime.now(),
+            replace_existing=True
+        )
+
+    async def update_void_of_course_calendar(self):
+        """
+        Досчитывает календарь холостой луны до VOID_OF_COURSE_DAYS_AHEAD
+        дней вперёд и удаляет прошедшие периоды.
+        """
+        now = datetime.utcnow()
+        start = now - timedelta(days=VOID_OF_COURSE_DAYS_BEHIND)
+        finish = now + timedelta(days=VOID_OF_COURSE_DAYS_AHEAD)
+
+        with unit_of_work("update_void_of_course_calendar"):
+            calendar_span = crud.get_void_of_course_calendar_span()
+            if calendar_span is not None and calendar_span.end > start:
+                start = calendar_span.end
+
+            periods = await compute_pool.run(
+                get_void_of_course_periods,
+                start,
+                finish
+            )
+            crud.add_void_of_course_periods(periods)
+            crud.delete_void_of_course_periods(before=now - timedelta(
+                days=VOID_OF_COURSE_DAYS_BEHIND
+            ))
+
+        LOGGER.info(
+            f"Void of course calendar updated with {len(periods)} periods "
+            f"until {finish.strftime(DATETIME_FORMAT)}"
+        )
+
+    async def add_prerender_job(self):
+        """
+        Ночная подготовка прогнозов на ближайшие PRERENDER_WINDOW часов,
+        чтобы в популярные минуты отправки не считать их все разом.
+        """
+        self.add_task(
+            self.prerender_predictions,
+            "cron",
+            "prerender_predictions",
+            hour=PRERENDER_HOUR,
+            timezone="UTC",
+            replace_existing=True
+        )
+
+    async def prerender_predictions(self):
+        """
+        Считает картинки и тексты для отправок в ближайшие
+        PRERENDER_WINDOW часов. Картинка одна на группу пользователей с
+        одинаковыми датой, часовым поясом и местоположением, тексты на
+        одну дату считаются пакетами (get_astro_events_for_users).
+        """
+        now = datetime.utcnow()
+        prepared_count = 0
+
+        # Пользователи обходятся страницами: в памяти одна страница, а
+        # картинка группы, встреченной на прошлой странице, уже в кэше
+        with unit_of_work("prerender_predictions") as session:
+            for users in audience.iter_users(
+                session,
+                audience.deliverable(),
+                batch_size=PRERENDER_BATCH_SIZE
+            ):
+                groups = defaultdict(list)
+                for user in users:
+                    try:
+                        delivery = get_next_prediction_datetime(user, now)
+                    except (AttributeError, TypeError, ValueError):
+                        # Время отправки или местоположение не заполнены
+                        continue
+
+                    if delivery - now > PRERENDER_WINDOW:
+                        continue
+
+                    target_date = (
+                        delivery + timedelta(hours=user.timezone_offset)
+                    ).date()
+                    groups[(
+                        target_date,
+                        user.timezone_offset,
+                        user.current_location.longitude,
+                        user.current_location.latitude
+                    )].append((user, delivery))
+                    prepared_count += 1
+
+                await self._prerender_page(groups)
+
+        LOGGER.info(f"Prepared {prepared_count} predictions")
+
+    async def _prerender_page(
+        self,
+        groups: Dict[tuple, List[Tuple[User, datetime]]]
+    ):
+        photo_keys = await asyncio.gather(*[
+            self._prerender_photo(group_key[0], group[0][0])
+            for group_key, group in groups.items()
+        ])
+
+        # Текст нужен только тем, у кого к отправке не кончится подписка
+        users_by_date: Dict[date, List[User]] = defaultdict(list)
+        for (target_date, *_), group in groups.items():
+            for user, delivery in group:
+                try:
+                    subscription_end_datetime = datetime.strptime(
+                        user.subscription_end_date,
+                        DATETIME_FORMAT
+                    )
+                except (TypeError, ValueError):
+                    continue
+
+                if delivery < subscription_end_datetime:
+                    users_by_date[target_date].append(user)
+
+        batches = [
+            (target_date, users[index:index + PRERENDER_TEXTS_BATCH_SIZE])
+            for target_date, users in users_by_date.items()
+            for index in range(0, len(users), PRERENDER_TEXTS_BATCH_SIZE)
+        ]
+        batches_texts = await asyncio.gather(*[
+            self._prepare_texts(target_date, users)
+            for target_date, users in batches
+        ])
+        texts: Dict[int, str] = {}
+        for batch_texts in batches_texts:
+            texts.update(batch_texts)
+
+        awaitables = []
+        for ((target_date, *_), group), photo_key in zip(
+            groups.items(),
+            photo_keys
+        ):
+            if photo_key is None:
+                continue
+
+            for user, _ in group:
+                awaitables.append(
+                    prepared_predictions.set(
+                        user.user_id,
+                        target_date,
+                        PreparedPrediction(
+                            fingerprint=get_user_fingerprint(user),
+                            photo_key=photo_key,
+                            text=texts.get(user.user_id)
+                        )
+                    )
+                )
+        await asyncio.gather(*awaitables)
+
+    async def _prerender_photo(
+        self,
+        target_date: date,
+        user: User
+    ) -> Optional[str]:
+        try:
+            inputs = await get_astrodata_image_inputs(user, date=target_date)
+            return await prerender_astrodata_photo(inputs)
+        except Exception as e:
+            LOGGER.error(f"Can't prerender image for {target_date}: {e!r}")
+            return None
+
+    async def _prepare_texts(
+        self,
+        target_date: date,
+        users: List[User]
+    ) -> Dict[int, str]:
+        try:
+            texts = await calculate_prediction_texts(target_date, users)
+        except Exception as e:
+            # Эти прогнозы посчитаются при отправке
+            LOGGER.error(
+                f"Can't prepare {len(users)} predictions "
+                f"for {target_date}: {e!r}"
+            )
+            return {}
+
+        return {user.user_id: text for user, text in zip(users, texts)}
+
+    async def _get_prediction_photo(
+        self,
+        user: User,
+        prepared: Optional[PreparedPrediction]
+    ):
+        if prepared is not None:
+            photo = await get_cached_astrodata_photo(
+                prepared.photo_key,
+                FileName.PREDICTION.value
+            )
+            if photo is not None:
+                return prepared.photo_key, photo
 
-            if user_ids:
-                for user_id in tqdm(user_ids, desc="Scheduling Jobs"):
-                    await self.set_all_jobs(user_id)
+        return await get_astrodata_photo(user, FileName.PREDICTION.value)
 
-        LOGGER.info("Scheduling completed for all users.")
+    async def send_prediction(self, user_id: int):
+        """
+        Своя единица работы на каждую отправку: сессия не делится между
+        параллельными отправками, а их записи фиксируются независимо.
+        """
+        with unit_of_work(f"send_prediction {user_id}"):
+            await self.send_message(user_id)
 
-    async def send_message(self, user_id: int, session: Session):
+    async def send_message(self, user_id: int):
         """Send the daily prediction message to a user."""
 
         async with self.semaphore:  # Limit concurrent executions
             try:
-                user = crud.get_user(user_id=user_id, session=session)
+                user = crud.get_user(user_id=user_id)
 
                 utc_target_date = datetime.utcnow()
                 target_datetime = utc_target_date + timedelta(
@@ -133,11 +542,17 @@ class EveryDayPredictionScheduler(AsyncIOScheduler):
                 )
                 target_date = target_datetime.date()
 
-                photo_bytes = await get_image_with_astrodata(user)
-
-                photo = BufferedInputFile(
-                    file=photo_bytes,
-                    filename=FileName.PREDICTION.value
+                # Подготовленный ночью прогноз, если данные не менялись
+                prepared = await prepared_predictions.get(user_id, target_date)
+                if (
+                    prepared is not None
+                    and prepared.fingerprint != get_user_fingerprint(user)
+                ):
+                    prepared = None
+
+                photo_key, photo = await self._get_prediction_photo(
+                    user,
+                    prepared
                 )
 
                 subscription_end_datetime = datetime.strptime(
@@ -146,24 +561,36 @@ class EveryDayPredictionScheduler(AsyncIOScheduler):
                 )
 
                 try:
-                    await bot.send_photo(
+                    photo_message = await bot.send_photo(
                         chat_id=user_id,
                         photo=photo,
                         reply_markup=keyboards.main_menu()
                     )
+                    await remember_astrodata_photo(photo_key, photo_message)
 
                     if datetime.utcnow() < subscription_end_datetime:
-                        text = await get_prediction_text(
-                            date=target_date,
-                            user_id=user_id
-                        )
-                        await send_message_with_retry(
+                        if prepared is not None and prepared.text is not None:
+                            text = prepared.text
+                        else:
+                            text = await calculate_prediction_text(
+                                target_date,
+                                user
+                            )
+                        await bot.send_message(
                             chat_id=user_id,
                             text=text,
                             reply_markup=keyboards.main_menu()
                         )
+                        # После отправки: запись держала бы блокировку
+                        # до конца единицы, пока ждём Telegram
+                        crud.add_viewed_prediction(
+                            user_id=user_id,
+                            prediction_date=target_date.strftime(DATE_FORMAT)
+                        )
 
                 except TelegramForbiddenError:
+                    # Пользователя отметил недоступным конвейер отправки,
+                    # следующие прогнозы ему не готовятся и не отправляются
                     LOGGER.info(f'User {user_id} blocked bot')
                     return
 
@@ -182,74 +609,38 @@ class EveryDayPredictionScheduler(AsyncIOScheduler):
                         print(f"{target_datetime = }")
                 LOGGER.error(f"Error sending message to user {user_id}: {e}")
 
-    async def send_renewal_reminder(self, user_id: int):
-        """
-        Send a reminder to the user that their subscription is
-        about to end.
-        """
-        await bot.send_message(
-            chat_id=user_id,
-            text=messages.RENEW_SUBSCRIPTION_REMIND,
-            reply_markup=keyboards.main_menu()
-        )
-
-    async def add_send_prediction_job(self, user_id: int, session: Session):
-        """
-        Add daily prediction and renewal reminder tasks for a user.
-        """
-        user = crud.get_user(user_id, session)
-
-        timezone_str = get_timezone_str_from_offset(user.timezone_offset)
-        time = datetime.strptime(user.every_day_prediction_time, TIME_FORMAT)
-
-        self.add_task(
-            self.send_message,
-            "cron",
-            f"prediction_{user_id}",
-            hour=time.hour,
-            minute=time.minute,
-            args=[user_id, session],
-            timezone=timezone_str,
-        )
-
-        # job = self.get_job(str(user.user_id))
-        # now = datetime.now(pytz.timezone(timezone_str))
-        # delta = job.next_run_time - now
-        #
-        # LOGGER.info(f'До отправки {format_time_delta(delta)}')
-
-    async def add_reminder_jobs(self, user_id: int, session: Session):
-        user = crud.get_user(user_id, session)
-
-        subscription_end_datetime = datetime.strptime(
-            user.subscription_end_date,
-            DATETIME_FORMAT
-        )
-
-        timezone_str = get_timezone_str_from_offset(user.timezone_offset)
-        now = datetime.utcnow()
+    def _reschedule_reminders(
+        self,
+        user_id: int,
+        subscription_end_date: Optional[str],
+        scheduled_end_date: Optional[str],
+        now: datetime
+    ):
+        new_times = get_reminder_times(subscription_end_date)
+        old_times = get_reminder_times(scheduled_end_date)
 
         for hours_before_end in REMINDER_TIMES:
-            reminder_time = subscription_end_datetime - timedelta(
-                hours=hours_before_end
-            )
+            job_id = f"reminder{hours_before_end}_{user_id}"
+            reminder_time = new_times.get(hours_before_end)
 
-            if reminder_time > now:
+            if reminder_time is not None and reminder_time > now:
                 self.add_task(
-                    self.send_renewal_reminder,
+                    send_renewal_reminder,
                     "date",
-                    f"reminder{hours_before_end}_{user_id}",
+                    job_id,
                     run_date=reminder_time,
-                    args=[user.user_id],
-                    timezone=timezone_str,
+                    args=[user_id],
+                    timezone="UTC",
+                    jobstore=REMINDERS_JOBSTORE,
+                    replace_existing=True
                 )
 
-    async def delete_reminder_jobs(self, user_id: int):
-        for hours_before_end in REMINDER_TIMES:
-            await self.remove_task(f"reminder{hours_before_end}_{user_id}")
-
-    async def delete_send_prediction_job(self, user_id: int):
-        await self.remove_task(f"prediction_{user_id}")
+            # Отработавшие напоминания хранилище удаляет само
+            elif old_times.get(hours_before_end, now) > now:
+                try:
+                    self.remove_job(job_id, REMINDERS_JOBSTORE)
+                except JobLookupError:
+                    pass
 
     async def remove_task(self, task_id: str):
         try:
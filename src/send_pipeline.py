@@ -0,0 +1,292 @@
+"""
+Общий конвейер исходящих сообщений Telegram.
+
+Все запросы бота на отправку и изменение сообщений проходят через
+middleware сессии бота, поэтому лимиты общие для обработчиков,
+ежедневных прогнозов, рассылки и уведомлений об оплате:
+- глобальное ведро токенов (~30 сообщений в секунду);
+- интервал между сообщениями в один чат для прогнозов и рассылки
+  (ответы пользователю его не ждут, но сдвигают);
+- очередь по приоритетам: ответы пользователям раньше прогнозов,
+  прогнозы раньше рассылки;
+- при TelegramRetryAfter отправка приостанавливается для всех на
+  retry_after, скорость снижается и потом плавно восстанавливается.
+
+Приоритет задаётся контекстом: with send_priority(SendPriority.BROADCAST).
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType
+)
+from aiogram.exceptions import (
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError
+)
+from aiogram.methods import Response, TelegramMethod
+
+from src import config
+from src.enums import SendPriority
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_RATE = 30
+DEFAULT_PRIVATE_CHAT_INTERVAL = 1
+# В группы - не больше 20 сообщений в минуту
+DEFAULT_GROUP_CHAT_INTERVAL = 3
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_MAX_CONCURRENT_SENDS = 100
+
+# После TelegramRetryAfter скорость падает вдвое и возвращается к
+# обычной за столько секунд
+RECOVERY_SECONDS = 60
+MIN_RATE = 1
+# Размер таблицы чатов, после которого из неё убираются неактивные
+CHATS_CLEANUP_THRESHOLD = 10000
+
+# Запросы, которые отправляют или меняют сообщения
+RATE_LIMITED_METHOD_PREFIXES = ("Send", "Copy", "Forward", "Edit")
+
+_priority: ContextVar[SendPriority] = ContextVar(
+    "send_priority",
+    default=SendPriority.INTERACTIVE
+)
+
+
+def _get_setting(key: str, default: Any) -> Any:
+    try:
+        return config.get(f"send_pipeline.{key}")
+    except KeyError:
+        return default
+
+
+@contextmanager
+def send_priority(priority: SendPriority):
+    """Приоритет отправок внутри блока (и созданных в нём задач)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class SendLimiter:
+    """
+    Ведро токенов с очередью ожидающих по приоритету и интервалами
+    между сообщениями в один чат.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        private_chat_interval: float = DEFAULT_PRIVATE_CHAT_INTERVAL,
+        group_chat_interval: float = DEFAULT_GROUP_CHAT_INTERVAL
+    ):
+        self.max_rate = rate
+        self.private_chat_interval = private_chat_interval
+        self.group_chat_interval = group_chat_interval
+
+        self._rate = rate
+        self._tokens = float(rate)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._releaser: Optional[asyncio.Task] = None
+
+        # Ближайший момент, когда в чат можно отправить следующее сообщение
+        self._chat_slots: Dict[Any, float] = {}
+        self._chat_locks: Dict[Any, asyncio.Lock] = {}
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def _refill(self, now: float):
+        # Скорость после замедления линейно возвращается к обычной
+        self._rate = min(
+            self.max_rate,
+            self._rate
+            + (now - self._updated_at) * self.max_rate / RECOVERY_SECONDS
+        )
+        self._tokens = min(
+            self._rate,
+            self._tokens + (now - self._updated_at) * self._rate
+        )
+        self._updated_at = now
+
+    async def acquire(
+        self,
+        chat_id: Any = None,
+        priority: SendPriority = SendPriority.INTERACTIVE
+    ):
+        if chat_id is None:
+            await self._acquire_token(priority)
+            return
+
+        if priority == SendPriority.INTERACTIVE:
+            # Ответ из обработчика (два сообщения подряд, удалить и
+            # изменить) - короткий всплеск, который Telegram допускает.
+            # Интервала он не ждёт, но прогноз или рассылка в этот чат
+            # пойдут не раньше интервала после него.
+            await self._acquire_token(priority)
+            self._chat_slots[chat_id] = (
+                time.monotonic() + self._get_chat_interval(chat_id)
+            )
+        else:
+            # Сообщения в один чат встают в общую очередь по одному
+            lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+            async with lock:
+                delay = self._chat_slots.get(chat_id, 0) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                await self._acquire_token(priority)
+                self._chat_slots[chat_id] = (
+                    time.monotonic() + self._get_chat_interval(chat_id)
+                )
+
+        if len(self._chat_slots) > CHATS_CLEANUP_THRESHOLD:
+            self._forget_idle_chats()
+
+    def _get_chat_interval(self, chat_id: Any) -> float:
+        # Отрицательные id и @username - группы и каналы
+        if isinstance(chat_id, str) or chat_id < 0:
+            return self.group_chat_interval
+        return self.private_chat_interval
+
+    def _forget_idle_chats(self):
+        now = time.monotonic()
+        for chat_id in list(self._chat_slots.keys() | self._chat_locks.keys()):
+            lock = self._chat_locks.get(chat_id)
+            if lock is not None and lock.locked():
+                continue
+            if self._chat_slots.get(chat_id, 0) <= now:
+                self._chat_locks.pop(chat_id, None)
+                self._chat_slots.pop(chat_id, None)
+
+    async def _acquire_token(self, priority: SendPriority):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters,
+            (int(priority), next(self._counter), future)
+        )
+        if self._releaser is None or self._releaser.done():
+            self._releaser = asyncio.create_task(self._release_waiters())
+
+        await future
+
+    async def _release_waiters(self):
+        while self._waiters:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            self._refill(now)
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                continue
+
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Ожидающий отменён
+                continue
+
+            self._tokens -= 1
+            future.set_result(None)
+
+    def backoff(self, retry_after: float):
+        """Пауза для всех отправок и снижение скорости после флуд-лимита."""
+        now = time.monotonic()
+        self._refill(now)
+
+        self._paused_until = max(self._paused_until, now + retry_after)
+        self._rate = max(MIN_RATE, self._rate / 2)
+        self._tokens = 0
+        LOGGER.warning(
+            f"Flood limit exceeded, sending paused for {retry_after} s, "
+            f"rate lowered to {self._rate:.1f} msg/s"
+        )
+
+
+class SendPipelineMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: ограничивает скорость отправок и повторяет
+    запрос после флуд-лимита и сетевых ошибок. Остальные ошибки
+    сразу уходят вызывающему.
+    """
+
+    def __init__(
+        self,
+        limiter: SendLimiter,
+        max_retries: int = DEFAULT_MAX_RETRIES
+    ):
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod
+    ) -> Response:
+        if not type(method).__name__.startswith(RATE_LIMITED_METHOD_PREFIXES):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        priority = _priority.get()
+
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(chat_id, priority)
+            try:
+                return await make_request(bot, method)
+
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.limiter.backoff(e.retry_after)
+
+            except (TelegramNetworkError, TelegramServerError) as e:
+                if attempt == self.max_retries:
+                    raise
+                LOGGER.warning(
+                    f"{type(method).__name__} to {chat_id} failed, "
+                    f"retrying: {e!r}"
+                )
+                await asyncio.sleep(2 ** attempt)
+
+
+MAX_CONCURRENT_SENDS: int = _get_setting(
+    "max_concurrent_sends",
+    DEFAULT_MAX_CONCURRENT_SENDS
+)
+
+send_limiter = SendLimiter(
+    rate=_get_setting("rate", DEFAULT_RATE),
+    private_chat_interval=_get_setting(
+        "private_chat_interval",
+        DEFAULT_PRIVATE_CHAT_INTERVAL
+    ),
+    group_chat_interval=_get_setting(
+        "group_chat_interval",
+        DEFAULT_GROUP_CHAT_INTERVAL
+    )
+)
+send_pipeline_middleware = SendPipelineMiddleware(
+    send_limiter,
+    max_retries=_get_setting("max_retries", DEFAULT_MAX_RETRIES)
+)
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+import h3
+import pytz
+
+from timezonefinder import TimezoneFinder
+
+
+# Ячейка H3 разрешения 9 - около 0.1 км², на границе часовых поясов
+# ошибка не больше пары сотен метров
+H3_RESOLUTION = 9
+ZONES_CACHE_SIZE = 100_000
+
+
+class TimezoneService:
+    """
+    Часовые пояса по координатам.
+
+    Держит один TimezoneFinder на процесс (создание загружает полигоны
+    поясов и стоит сотни миллисекунд) и кэширует имя пояса по ячейке H3,
+    поэтому повторные запросы для тех же мест стоят микросекунды.
+    Смещение считается на любой момент с учётом перехода на летнее время.
+    """
+
+    def __init__(self, h3_resolution: int = H3_RESOLUTION):
+        self.h3_resolution = h3_resolution
+        self._finder: Optional[TimezoneFinder] = None
+        self._lock = threading.Lock()
+
+        self._get_cell_timezone_name = lru_cache(maxsize=ZONES_CACHE_SIZE)(
+            self._find_cell_timezone_name
+        )
+
+    @property
+    def finder(self) -> TimezoneFinder:
+        if self._finder is None:
+            with self._lock:
+                if self._finder is None:
+                    self._finder = TimezoneFinder()
+        return self._finder
+
+    def _find_cell_timezone_name(self, cell: str) -> Optional[str]:
+        latitude, longitude = h3.h3_to_geo(cell)
+        return self.finder.timezone_at(lat=latitude, lng=longitude)
+
+    def get_timezone_name(self, latitude: float, longitude: float) -> str:
+        cell = h3.geo_to_h3(latitude, longitude, self.h3_resolution)
+        timezone_name = self._get_cell_timezone_name(cell)
+
+        if timezone_name is None:
+            raise ValueError(
+                f"Can't get timezone name. {latitude = }, {longitude = }"
+            )
+        return timezone_name
+
+    def get_utcoffset(
+        self,
+        latitude: float,
+        longitude: float,
+        at: Optional[datetime] = None
+    ) -> timedelta:
+        """
+        Смещение пояса от UTC в момент at (наивное время UTC),
+        по умолчанию - сейчас.
+        """
+        timezone = pytz.timezone(self.get_timezone_name(latitude, longitude))
+        moment = pytz.utc.localize(at or datetime.utcnow())
+        return moment.astimezone(timezone).utcoffset()
+
+    def get_offset(
+        self,
+        latitude: float,
+        longitude: float,
+        at: Optional[datetime] = None
+    ) -> int:
+        """Смещение от UTC в целых часах, как хранится у пользователя."""
+        offset = self.get_utcoffset(latitude, longitude, at)
+        return int(offset.total_seconds() / 3600)
+
+    async def get_timezone_name_async(
+        self,
+        latitude: float,
+        longitude: float
+    ) -> str:
+        return await asyncio.to_thread(
+            self.get_timezone_name,
+            latitude,
+            longitude
+        )
+
+    async def get_offset_async(
+        self,
+        latitude: float,
+        longitude: float,
+        at: Optional[datetime] = None
+    ) -> int:
+        # Промах кэша ищет пояс по полигонам - уводим из цикла событий
+        return await asyncio.to_thread(self.get_offset, latitude, longitude, at)
+
+
+timezone_service = TimezoneService()
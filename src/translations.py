@@ -1,4 +1,4 @@
-from src.enums import MoonPhase, ZodiacSign, PaymentMethod
+from src.enums import BroadcastStatus, MoonPhase, ZodiacSign, PaymentMethod
 from src.keyboards import bt
 from src.payments import ProdamusPaymentService
 
@@ -17,6 +17,12 @@ ZODIAC_RU_TRANSLATION = {
     ZodiacSign.AQUARIUS: "Водолее",
     ZodiacSign.PISCES: "Рыбах",
 }
+BROADCAST_STATUS_RU_TRANSLATIONS = {
+    BroadcastStatus.RUNNING: "идёт",
+    BroadcastStatus.PAUSED: "на паузе",
+    BroadcastStatus.CANCELLED: "отменена",
+    BroadcastStatus.FINISHED: "завершена",
+}
 MOON_PHASE_RU_TRANSLATIONS = {
     MoonPhase.NEW_MOON: "НОВОЛУНИЕ",
     MoonPhase.WAXING_CRESCENT: "Растущий\nполумесяц",
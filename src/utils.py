@@ -4,26 +4,21 @@ import logging
 import hashlib
 import hmac
 import json
-import pytz
 import yaml
 import pandas as pd
 
 from datetime import datetime, timedelta
-from typing import Any, List
+from typing import Any, List, Optional
 from dataclasses import is_dataclass, asdict
 
-from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
 from aiogram.types import Message
 from aiogram.exceptions import TelegramBadRequest
 
-from src import messages
+from src.geocoding import geocoder
+from src.timezones import timezone_service
 from src.exceptions import PathDoesNotExistError
 
 
-geolocator = Nominatim(user_agent="AstroBot")
-
-
 class Hmac:
     @staticmethod
     def create(data, key: str, algo='sha256'):
@@ -83,17 +78,13 @@ def load_yaml(file_path: str) -> dict:
         return yaml.safe_load(file)
 
 
-def get_timezone_offset(latitude: float, longitude: float) -> int:
-    obj = TimezoneFinder()
-    tz_name = obj.timezone_at(
-        lat=latitude, lng=longitude
-    )  # Получаем имя временной зоны
-    if tz_name:
-        timezone = pytz.timezone(tz_name)
-        offset = timezone.utcoffset(datetime.utcnow())
-        return int(offset.total_seconds() / 3600)  # Преобразуем в часы
-    else:
-        raise Exception(f"Can't get timezone name. {latitude = }, {longitude = }")
+def get_timezone_offset(
+    latitude: float,
+    longitude: float,
+    at: Optional[datetime] = None
+) -> int:
+    """Смещение от UTC в часах в момент at (UTC), по умолчанию - сейчас."""
+    return timezone_service.get_offset(latitude, longitude, at)
 
 
 def get_timezone_str_from_coords(longitude: float, latitude: float) -> str:
@@ -107,27 +98,7 @@ def get_timezone_str_from_coords(longitude: float, latitude: float) -> str:
     Returns:
     str: Timezone for the given coordinates.
     """
-    tf = TimezoneFinder()
-    timezone_str = tf.timezone_at(lat=latitude, lng=longitude)
-
-    if timezone_str:
-        return timezone_str
-    else:
-        raise ValueError(
-            (
-                "Timezone could not be determined for the coordinates: "
-                f"Latitude {latitude}, Longitude {longitude}"
-            )
-        )
-
-
-def get_timezone_str_from_offset(timezone_offset: int) -> str:
-    for tz in pytz.all_timezones:
-        timezone = pytz.timezone(tz)
-        now = datetime.now(timezone)
-        offset = now.utcoffset().total_seconds() / 3600
-        if round(offset) == timezone_offset:
-            return tz
+    return timezone_service.get_timezone_name(latitude, longitude)
 
 
 def convert_to_utc(dt: datetime, offset: int) -> datetime:
@@ -162,38 +133,7 @@ def split_list(input_list: list, sublist_len: int = 2):
 
 
 def get_location_by_coords(longitude: float, latitude: float) -> str:
-    location = geolocator.reverse(
-        (latitude, longitude),
-        language="ru",
-        exactly_one=True
-    )
-
-    if location and "address" in location.raw:
-        address_info = location.raw["address"]
-
-        primary = address_info.get("city") or address_info.get("town") or address_info.get("village")
-        secondary = address_info.get("region") or address_info.get("state")
-        country = address_info.get("country")
-
-        if primary and secondary and country:
-            return f"{primary}, {secondary}, {country}"
-
-        elif primary and country:
-            return f"{primary}, {country}"
-
-        elif primary:
-            return primary
-
-        elif secondary:
-            return secondary
-
-        elif country:
-            return country
-
-        else:
-            return "Неизвестное местоположение"
-
-    return messages.ERROR_MESSAGE
+    return geocoder.get_location_title(latitude, longitude)
 
 
 def path_validation(path: str) -> None:
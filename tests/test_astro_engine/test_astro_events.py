@@ -1,7 +1,8 @@
 from datetime import datetime, timedelta
 
 from src.astro_engine.predictions import (
-    get_astro_events_from_period_with_duplicates
+    get_natal_chart,
+    get_transit_timeline
 )
 from src.utils import print_items_dict_as_table
 from src.dicts import PLANET_ID_TO_NAME_RU
@@ -10,10 +11,10 @@ from src.dicts import PLANET_ID_TO_NAME_RU
 def test_astro_events(astro_user):
     utcnow = datetime.utcnow()
 
-    events = get_astro_events_from_period_with_duplicates(
+    events = get_transit_timeline(
         utcnow - timedelta(days=15),
         utcnow + timedelta(days=15),
-        astro_user
+        get_natal_chart(astro_user)
     )
 
     items = [
@@ -80,7 +80,11 @@ def test_moon_signs():
 
 from datetime import datetime, timedelta
 
-from src.astro_engine.moon.blank_moon import get_blank_moon_period
+from src.astro_engine.models import TimePeriod
+from src.astro_engine.moon.blank_moon import (
+    get_blank_moon_period,
+    get_void_of_course_periods
+)
 from src.astro_engine.moon.sign import get_moon_sign_period
 
 
@@ -132,3 +136,25 @@ def test_blank_moon_fixed(user, astro_user):
     # Допуск 5 минут
     assert start_diff < 10, f"Start differs by {start_diff:.1f} minutes"
     assert end_diff < 10, f"End differs by {end_diff:.1f} minutes"
+
+
+def test_void_of_course_calendar():
+    periods = get_void_of_course_periods(
+        datetime(2026, 1, 1),
+        datetime(2026, 2, 1)
+    )
+
+    for period in periods:
+        print(f"{period.start} - {period.end}")
+        assert period.start < period.end
+
+    for previous, period in zip(periods, periods[1:]):
+        assert previous.end <= period.start
+
+    # 25 января 2026, UTC: референс 21:36 (24.01) - 18:05
+    expected = TimePeriod(datetime(2026, 1, 24, 21, 36), datetime(2026, 1, 25, 18, 5))
+    assert any(
+        abs(period.start - expected.start) < timedelta(minutes=5)
+        and abs(period.end - expected.end) < timedelta(minutes=5)
+        for period in periods
+    )
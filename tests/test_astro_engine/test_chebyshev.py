@@ -0,0 +1,71 @@
+import timeit
+
+import numpy as np
+import swisseph as swe
+
+from src.astro_engine import chebyshev, ephemeris
+from src.enums import SwissEphPlanet
+
+
+TOLERANCE = chebyshev.DEFAULT_TOLERANCE
+
+
+def test_chebyshev_ephemeris(tmp_path, monkeypatch):
+    file_path = str(tmp_path / "chebyshev_ephemeris.npy")
+    chebyshev.build(file_path, 2026, 2027)
+
+    start = swe.julday(2026, 1, 1, 0)
+    julidays = start + np.random.default_rng(0).random(500) * 365
+
+    for planet in SwissEphPlanet:
+        data = chebyshev.evaluate(planet, julidays, file_path)
+        expected = np.array([
+            swe.calc(juliday, planet, swe.FLG_SWIEPH + swe.FLG_SPEED)[0]
+            for juliday in julidays
+        ])
+
+        longitude_error = np.abs((data[:, 0] - expected[:, 0] + 180) % 360 - 180)
+        latitude_error = np.abs(data[:, 1] - expected[:, 1])
+        assert longitude_error.max() < TOLERANCE
+        assert latitude_error.max() < TOLERANCE
+
+    # Бэкенд сетки транзитов
+    day_number = ephemeris.get_day_number(swe.julday(2026, 3, 1, 0))
+    day_julidays = ephemeris.get_day_start(day_number) + np.arange(
+        ephemeris.SAMPLES_PER_DAY + 1
+    ) * ephemeris.GRID_STEP
+
+    chebyshev_grid = ephemeris._calculate_grid_chebyshev(
+        day_julidays,
+        file_path
+    )
+    swisseph_grid = ephemeris._calculate_grid_swisseph(day_julidays)
+    longitude_error = np.abs(
+        (chebyshev_grid[..., 0] - swisseph_grid[..., 0] + 180) % 360 - 180
+    )
+    assert longitude_error.max() < TOLERANCE
+    assert np.abs(chebyshev_grid[..., 1] - swisseph_grid[..., 1]).max() < 1e-2
+
+    monkeypatch.setattr(ephemeris, "CHEBYSHEV_FILE_PATH", file_path)
+    ephemeris.get_day_grid.cache_clear()
+    try:
+        assert np.array_equal(
+            ephemeris.get_day_grid(day_number),
+            chebyshev_grid
+        )
+    finally:
+        ephemeris.get_day_grid.cache_clear()
+
+    # Сетка суток через файл быстрее поузлового swe.calc_ut
+    # (лучшее из повторов, чтобы не зависеть от загрузки машины)
+    chebyshev_time = min(timeit.repeat(
+        lambda: ephemeris._calculate_grid_chebyshev(day_julidays, file_path),
+        number=20,
+        repeat=5
+    ))
+    swisseph_time = min(timeit.repeat(
+        lambda: ephemeris._calculate_grid_swisseph(day_julidays),
+        number=20,
+        repeat=5
+    ))
+    assert chebyshev_time < swisseph_time
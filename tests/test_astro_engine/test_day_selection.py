@@ -1,12 +1,13 @@
-import pytest
-
 import datetime as dt
 
 from src.utils import print_items_dict_as_table
 from src.dicts import PLANET_ID_TO_NAME_RU
 from src.database.models import User
 from src.common import DAY_SELECTION_DATABASE
-from src.astro_engine.predictions import get_astro_events_from_period_with_duplicates
+from src.astro_engine.predictions import (
+    get_natal_chart,
+    get_transit_timeline
+)
 from src.routers.user.prediction.text_formatting import (
     remove_duplicates_from_astro_events,
     format_astro_events_for_day_selection
@@ -15,8 +16,7 @@ from src.routers.user.prediction.text_formatting import (
 from tests.utils import current_month_period
 
 
-@pytest.mark.asyncio
-async def test_astro_events(user: User, astro_user):
+def test_astro_events(user: User, astro_user):
     start, end = current_month_period()
 
     # start = start - dt.timedelta(days=30)
@@ -27,10 +27,10 @@ async def test_astro_events(user: User, astro_user):
     selected_aspects: list[dict] = DAY_SELECTION_DATABASE[category][action]['aspects']
     favorably = DAY_SELECTION_DATABASE[category][action]['favorably']
 
-    astro_events = await get_astro_events_from_period_with_duplicates(
-        start=start,
-        finish=end,
-        user=astro_user,
+    astro_events = get_transit_timeline(
+        start,
+        end,
+        get_natal_chart(astro_user)
     )
     print(len(astro_events))
     print_events(astro_events, "tests/data/day_selection_with_duplicates.txt")
@@ -51,6 +51,28 @@ async def test_astro_events(user: User, astro_user):
     print(text, file=open("tests/data/day_selection_formatted.txt", "w"))
 
 
+def test_transit_timeline_extends_incrementally(astro_user):
+    start = dt.datetime(2026, 1, 24, 21, 0)
+    middle = start + dt.timedelta(days=17)
+    finish = start + dt.timedelta(days=40)
+    natal_chart = get_natal_chart(astro_user)
+
+    whole = get_transit_timeline(start, finish, natal_chart)
+    parts = (
+        get_transit_timeline(start, middle, natal_chart)
+        + get_transit_timeline(middle, finish, natal_chart)
+    )
+
+    def keys(events):
+        return [
+            (event.peak_at, event.natal_planet, event.transit_planet, event.aspect)
+            for event in events
+        ]
+
+    assert sorted(keys(parts)) == sorted(keys(whole))
+    assert all(start <= event.peak_at < finish for event in whole)
+
+
 def print_events(events, file_path="tests/data/astrodata.txt"):
     items = [
         {
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+import swisseph as swe
+
+from src.astro_engine.ephemeris import (
+    TRANSIT_PLANETS,
+    get_transit_position,
+    get_transit_samples
+)
+from src.astro_engine.utils import get_juliday, wrap_degrees
+
+
+def test_interpolation_matches_swisseph():
+    start = datetime(2026, 1, 24, 21, 0)
+
+    for minutes in range(0, 3 * 24 * 60, 7):
+        juliday = get_juliday(start + timedelta(minutes=minutes))
+
+        for planet in TRANSIT_PLANETS:
+            position, speed = get_transit_position(planet, juliday)
+            expected = swe.calc_ut(
+                juliday,
+                planet,
+                swe.FLG_SWIEPH | swe.FLG_SPEED
+            )[0]
+
+            assert abs(wrap_degrees(position - expected[0])) < 1e-5
+            assert abs(speed - expected[3]) < 1e-3
+
+
+def test_samples_cover_period():
+    start_juliday = get_juliday(datetime(2026, 1, 24, 21, 10))
+    finish_juliday = start_juliday + 1
+
+    samples = get_transit_samples(
+        TRANSIT_PLANETS[1],
+        start_juliday,
+        finish_juliday
+    )
+    julidays = [juliday for juliday, _, _ in samples]
+
+    assert julidays == sorted(julidays)
+    assert julidays[0] < start_juliday == julidays[1]
+    assert julidays[-2] == finish_juliday < julidays[-1]
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from src.astro_engine.ingress import IngressCalendar, get_sign_index
+from src.astro_engine.utils import (
+    calculate_planet_degrees_ut,
+    get_datetime,
+    get_juliday
+)
+from src.enums import SwissEphPlanet
+
+
+def test_ingresses_match_ephemeris(tmp_path):
+    calendar = IngressCalendar(str(tmp_path / "ingress_calendar.npz"))
+    start = get_juliday(datetime(2026, 1, 1))
+    finish = get_juliday(datetime(2026, 4, 1))
+
+    for planet in [SwissEphPlanet.MOON, SwissEphPlanet.MERCURY]:
+        for juliday, sign in calendar.get_ingresses(planet, start, finish):
+            before = calculate_planet_degrees_ut(juliday - 1e-5, planet)
+            after = calculate_planet_degrees_ut(juliday + 1e-5, planet)
+            assert get_sign_index(after) == sign
+            assert get_sign_index(before) != sign
+
+    for hours in range(0, 24 * 90, 7):
+        juliday = start + hours / 24
+        degrees = calculate_planet_degrees_ut(juliday, SwissEphPlanet.MOON)
+        assert calendar.get_sign(SwissEphPlanet.MOON, juliday) == (
+            get_sign_index(degrees)
+        )
+
+    # Календарь сохраняется и читается другим процессом без пересчёта
+    loaded = IngressCalendar(str(tmp_path / "ingress_calendar.npz"))
+    period = loaded.get_sign_period(SwissEphPlanet.MOON, start)
+    assert period == calendar.get_sign_period(SwissEphPlanet.MOON, start)
+
+    period_start, period_end = get_datetime(period[0]), get_datetime(period[1])
+    print(f"Moon sign period: {period_start} - {period_end}")
+    assert timedelta(days=1.5) < period_end - period_start < timedelta(days=3)
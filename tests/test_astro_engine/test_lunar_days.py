@@ -1,6 +1,11 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from src.astro_engine.moon.lunar_day import get_lunar_day
+from src.astro_engine.moon.lunar_day import (
+    get_lunar_day,
+    get_lunar_days,
+    get_next_lunar_day,
+    get_previous_lunar_day
+)
 from src.utils import print_items_dict_as_table
 
 from tests.utils import current_month_period
@@ -44,3 +49,23 @@ def test_getting_lunar_day_transitions(user):
             current_date = lunar_day.end + timedelta(minutes=1)
 
         print_items_dict_as_table(items, file)
+
+
+def test_lunar_days_timeline_is_continuous(user):
+    longitude = user.current_location.longitude
+    latitude = user.current_location.latitude
+
+    start = datetime(2026, 1, 1)
+    lunar_days = get_lunar_days(start, start + timedelta(days=60), longitude, latitude)
+
+    for previous, lunar_day in zip(lunar_days, lunar_days[1:]):
+        assert previous.end == lunar_day.start
+        assert lunar_day.number == (
+            1 if lunar_day.number == 1 else previous.number + 1
+        )
+        assert get_next_lunar_day(previous, longitude, latitude) == lunar_day
+        assert get_previous_lunar_day(lunar_day, longitude, latitude) == previous
+
+    # Соседние точки одного города делят таймлайн
+    nearby = get_lunar_day(start, longitude + 0.001, latitude + 0.001)
+    assert nearby == get_lunar_day(start, longitude, latitude)
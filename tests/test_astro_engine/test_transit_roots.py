@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+from src.astro_engine.models import Location, User
+from src.astro_engine.predictions import (
+    get_astro_event_at_time,
+    get_astro_events_for_users,
+    get_astro_events_from_period,
+    get_natal_chart,
+    get_natal_positions
+)
+from src.astro_engine.utils import get_juliday, wrap_degrees
+
+import swisseph as swe
+
+
+def brute_force_scan(start, finish, user):
+    """Старый перебор с шагом 10 минут - эталон для сравнения."""
+    birth_datetime_utc = get_natal_chart(user).birth_datetime_utc
+
+    events = {}
+    current_time = start
+    while current_time <= finish:
+        for event in get_astro_event_at_time(
+            current_time,
+            user,
+            birth_datetime_utc
+        ):
+            key = (event.natal_planet, event.transit_planet, event.aspect)
+            events[key] = event
+        current_time += timedelta(minutes=10)
+    return events
+
+
+def test_same_events_as_brute_force_scan(astro_user):
+    start = datetime(2026, 1, 24, 21, 0)
+    finish = start + timedelta(hours=24)
+
+    expected = brute_force_scan(start, finish, astro_user)
+    events = get_astro_events_from_period(start, finish, astro_user)
+
+    keys = {
+        (event.natal_planet, event.transit_planet, event.aspect)
+        for event in events
+    }
+    assert keys == set(expected)
+
+
+def test_peak_is_exact_aspect(astro_user):
+    start = datetime(2026, 1, 24, 21, 0)
+    finish = start + timedelta(hours=24)
+
+    natal_positions = get_natal_positions(
+        get_natal_chart(astro_user).birth_datetime_utc
+    )
+
+    for event in get_astro_events_from_period(start, finish, astro_user):
+        if not start < event.peak_at < finish:
+            continue
+
+        transit_position = swe.calc_ut(
+            get_juliday(event.peak_at),
+            event.transit_planet,
+            swe.FLG_SWIEPH
+        )[0][0]
+        separation = abs(
+            wrap_degrees(transit_position - natal_positions[event.natal_planet])
+        )
+        # За минуту Луна проходит ~0.01°
+        assert abs(separation - event.aspect) < 0.02
+
+
+def test_precomputed_natal_chart(astro_user):
+    start = datetime(2026, 1, 24, 21, 0)
+    finish = start + timedelta(hours=24)
+
+    natal_chart = get_natal_chart(astro_user)
+
+    assert get_astro_events_from_period(
+        start,
+        finish,
+        astro_user,
+        natal_chart=natal_chart
+    ) == get_astro_events_from_period(start, finish, astro_user)
+
+
+def test_natal_chart_uses_offset_at_birth():
+    moscow = Location(longitude=37.62, latitude=55.75)
+
+    # Летнее время 1990 года: UTC+4, сейчас в Москве UTC+3 круглый год
+    natal_chart = get_natal_chart(
+        User(
+            birth_datetime=datetime(1990, 7, 15, 12, 0),
+            birth_location=moscow,
+            current_location=moscow
+        )
+    )
+    assert natal_chart.birth_timezone_offset == 4
+    assert natal_chart.birth_datetime_utc == datetime(1990, 7, 15, 8, 0)
+
+    # Зимнее время того же года
+    assert get_natal_chart(
+        User(
+            birth_datetime=datetime(1990, 1, 15, 12, 0),
+            birth_location=moscow,
+            current_location=moscow
+        )
+    ).birth_timezone_offset == 3
+
+
+def test_batch_same_as_scalar(astro_user):
+    start = datetime(2026, 1, 24, 21, 0)
+    finish = start + timedelta(hours=24)
+
+    users = [
+        User(
+            birth_datetime=astro_user.birth_datetime + timedelta(days=37 * i),
+            birth_location=astro_user.birth_location,
+            current_location=astro_user.current_location
+        )
+        for i in range(20)
+    ]
+
+    assert get_astro_events_for_users(users, start, finish) == [
+        get_astro_events_from_period(start, finish, user)
+        for user in users
+    ]
@@ -0,0 +1,208 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import async_crud, crud
+from src.database import unit_of_work as units
+from src.database.models import Base, CardOfDay, Location, NatalChart, User
+
+
+# Нагрузочный тест запускается только с числом одновременных
+# пользователей: ASTROBOT_BENCHMARK_CONCURRENCY=200 pytest tests/test_async_crud.py
+BENCHMARK_CONCURRENCY = os.getenv("ASTROBOT_BENCHMARK_CONCURRENCY")
+CONCURRENCY = int(BENCHMARK_CONCURRENCY or 50)
+# Ответ Telegram, который обработчик ждёт между запросами к базе
+TELEGRAM_LATENCY = 0.02
+
+
+def create_database(tmp_path, monkeypatch, users_count: int):
+    path = tmp_path / "database.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(units, "Session", session_factory)
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    monkeypatch.setattr(
+        async_crud,
+        "AsyncSession",
+        async_sessionmaker(async_engine, expire_on_commit=False)
+    )
+
+    with session_factory() as session:
+        session.execute(
+            insert(Location),
+            [
+                {"id": 1, "longitude": 37.6, "latitude": 55.7},
+                {"id": 2, "longitude": 30.3, "latitude": 59.9},
+            ]
+        )
+        session.execute(
+            insert(User),
+            [
+                {
+                    "user_id": user_id,
+                    "name": f"user{user_id}",
+                    "timezone_offset": 3,
+                    "birth_location_id": 1,
+                    "current_location_id": 2,
+                }
+                for user_id in range(1, users_count + 1)
+            ]
+        )
+        session.execute(insert(CardOfDay), [{"message_id": 10}])
+        session.commit()
+
+    return session_factory, async_engine
+
+
+def test_async_crud_matches_crud(tmp_path, monkeypatch):
+    session_factory, async_engine = create_database(tmp_path, monkeypatch, 1)
+
+    async def run():
+        user = await async_crud.get_user(1)
+        # Местоположения загружены вместе с пользователем
+        assert user.current_location.latitude == 59.9
+        assert user.birth_location.longitude == 37.6
+
+        await async_crud.update_user_card_of_day(1, 10, "01.01.2024")
+        assert await async_crud.get_all_card_of_day() == [10]
+
+        with session_factory() as session:
+            session.add(NatalChart(user_id=1, positions="{}"))
+            session.commit()
+
+        # Смена данных рождения удаляет натальную карту
+        assert await async_crud.update_user(1, birth_datetime="01.01.1990 12:00")
+        assert await async_crud.get_user(404) is None
+
+        await async_engine.dispose()
+
+    asyncio.run(run())
+
+    user = crud.get_user(1, session_factory())
+    assert user.card_message_id == 10
+    assert user.last_card_update == "01.01.2024"
+    assert user.birth_datetime == "01.01.1990 12:00"
+    with session_factory() as session:
+        assert session.get(NatalChart, 1) is None
+
+
+def run_load(get_user, update_card) -> tuple[float, float]:
+    """
+    CONCURRENCY пользователей одновременно открывают карту дня: чтение
+    пользователя, ответ Telegram, запись. Возвращает обновления в секунду
+    и наибольшую задержку цикла событий.
+    """
+    async def handle(user_id: int):
+        await get_user(user_id)
+        await asyncio.sleep(TELEGRAM_LATENCY)
+        await update_card(user_id, 10, "01.01.2024")
+
+    async def run():
+        lags = []
+
+        async def measure_lag():
+            while True:
+                started_at = time.perf_counter()
+                await asyncio.sleep(0.001)
+                lags.append(time.perf_counter() - started_at - 0.001)
+
+        lag_task = asyncio.create_task(measure_lag())
+        started_at = time.perf_counter()
+        await asyncio.gather(
+            *[handle(user_id) for user_id in range(1, CONCURRENCY + 1)]
+        )
+        elapsed = time.perf_counter() - started_at
+        lag_task.cancel()
+        return CONCURRENCY / elapsed, max(lags)
+
+    return asyncio.run(run())
+
+
+def test_concurrent_updates_do_not_block_loop(tmp_path, monkeypatch):
+    session_factory, async_engine = create_database(
+        tmp_path,
+        monkeypatch,
+        CONCURRENCY
+    )
+    ticks = 0
+
+    async def handle(user_id: int):
+        user = await async_crud.get_user(user_id)
+        await async_crud.update_user_card_of_day(
+            user.user_id,
+            10,
+            "01.01.2024"
+        )
+
+    async def tick(done: asyncio.Event):
+        nonlocal ticks
+        while not done.is_set():
+            ticks += 1
+            await asyncio.sleep(0)
+
+    async def run():
+        done = asyncio.Event()
+        ticker = asyncio.create_task(tick(done))
+        await asyncio.gather(
+            *[handle(user_id) for user_id in range(1, CONCURRENCY + 1)]
+        )
+        done.set()
+        await ticker
+        await async_engine.dispose()
+
+    asyncio.run(run())
+
+    # Пока запросы идут в потоке aiosqlite, цикл событий свободен
+    assert ticks > CONCURRENCY
+    with session_factory() as session:
+        assert session.query(User).filter(
+            User.card_message_id == 10
+        ).count() == CONCURRENCY
+
+
+@pytest.mark.skipif(
+    BENCHMARK_CONCURRENCY is None,
+    reason="ASTROBOT_BENCHMARK_CONCURRENCY is not set"
+)
+def test_update_throughput_benchmark(tmp_path, monkeypatch):
+    session_factory, async_engine = create_database(
+        tmp_path,
+        monkeypatch,
+        CONCURRENCY
+    )
+
+    async def sync_get_user(user_id):
+        with session_factory() as session:
+            return crud.get_user(user_id, session)
+
+    async def sync_update_card(*args):
+        crud.update_user_card_of_day(*args)
+
+    sync_rate, sync_lag = run_load(sync_get_user, sync_update_card)
+
+    async def async_update_card(*args):
+        await async_crud.update_user_card_of_day(*args)
+
+    async_rate, async_lag = run_load(async_crud.get_user, async_update_card)
+    asyncio.run(async_engine.dispose())
+
+    with session_factory() as session:
+        assert session.query(User).filter(
+            User.card_message_id == 10
+        ).count() == CONCURRENCY
+
+    # Ради этого обработчики и переходят на async_crud: пропускная
+    # способность SQLite та же, а цикл событий не стоит на запросах
+    assert async_lag < sync_lag, (
+        f"crud {sync_rate:.0f} updates/s, lag {sync_lag * 1000:.0f} ms; "
+        f"async_crud {async_rate:.0f} updates/s, "
+        f"lag {async_lag * 1000:.0f} ms"
+    )
@@ -0,0 +1,123 @@
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from src import config
+from src.database import audience
+from src.database.models import Base, Payment, User
+from src.enums import PaymentStatus
+
+
+DATETIME_FORMAT = config.get("database.datetime_format")
+USERS_COUNT = 10000
+BATCH_SIZE = 200
+
+
+def test_audience_segments_and_paging(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(audience, "MainSession", session_factory)
+
+    now = datetime(2024, 3, 10, 12, 0)
+    # Даты в разных месяцах и годах - строки "%d.%m.%Y" так не сравнить
+    active_end = datetime(2025, 1, 5, 9, 30).strftime(DATETIME_FORMAT)
+    expired_end = datetime(2023, 12, 28, 9, 30).strftime(DATETIME_FORMAT)
+
+    with session_factory() as session:
+        session.execute(
+            insert(User),
+            [
+                {
+                    "user_id": user_id,
+                    "timezone_offset": user_id % 24 - 11,
+                    "subscription_end_date": (
+                        active_end if user_id % 2 else expired_end
+                    ),
+                    "last_seen_at": (
+                        now - timedelta(days=1) if user_id % 5 == 0 else None
+                    ),
+                }
+                for user_id in range(1, USERS_COUNT + 1)
+            ]
+        )
+        # Оплатили пользователи с id, кратным 3
+        session.execute(
+            insert(Payment),
+            [
+                {
+                    "payment_id": str(user_id),
+                    "user_id": user_id,
+                    "status": PaymentStatus.SUCCESS.value,
+                }
+                for user_id in range(3, USERS_COUNT + 1, 3)
+            ]
+        )
+        session.commit()
+
+    def expected(predicate):
+        return sum(
+            1 for user_id in range(1, USERS_COUNT + 1) if predicate(user_id)
+        )
+
+    assert audience.count_users() == USERS_COUNT
+    assert audience.count_users(audience.active_subscription(now)) == (
+        expected(lambda user_id: user_id % 2)
+    )
+    assert audience.count_users(audience.trial_users(now)) == (
+        expected(lambda user_id: user_id % 2 and user_id % 3)
+    )
+    assert audience.count_users(
+        audience.timezone_offset_between(-2, 2),
+        audience.seen_since(now - timedelta(days=7))
+    ) == expected(
+        lambda user_id: -2 <= user_id % 24 - 11 <= 2 and user_id % 5 == 0
+    )
+    assert audience.count_users(
+        audience.not_seen_since(now - timedelta(days=7))
+    ) == expected(lambda user_id: user_id % 5)
+
+    # Компиляция запроса в кэш SQLAlchemy к размеру выборки не относится
+    audience.get_user_ids_page(None, 1, audience.active_subscription(now))
+
+    tracemalloc.start()
+    audience.get_user_ids_page(
+        None,
+        USERS_COUNT,
+        audience.active_subscription(now)
+    )
+    _, materialized_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    next_user_id, batches = 1, 0
+    for user_ids in audience.iter_user_ids(
+        audience.active_subscription(now),
+        batch_size=BATCH_SIZE
+    ):
+        assert user_ids == list(
+            range(next_user_id, next_user_id + 2 * len(user_ids), 2)
+        )
+        next_user_id += 2 * len(user_ids)
+        batches += 1
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert next_user_id == USERS_COUNT + 1
+    assert batches == USERS_COUNT // 2 // BATCH_SIZE
+    # В памяти одна страница, а не вся выборка
+    assert peak < materialized_peak / 4
+
+    with session_factory() as session:
+        users = [
+            user.user_id
+            for batch in audience.iter_users(
+                session,
+                audience.paying_clients(),
+                batch_size=BATCH_SIZE
+            )
+            for user in batch
+        ]
+    assert users == list(range(3, USERS_COUNT + 1, 3))
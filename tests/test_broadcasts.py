@@ -0,0 +1,219 @@
+import asyncio
+from datetime import timedelta
+from typing import Dict, List, Optional, Set
+
+from src import broadcasts
+from src.broadcasts import (
+    BroadcastJob,
+    BroadcastManager,
+    BroadcastProgress,
+    format_broadcast_progress
+)
+from src.enums import BroadcastStatus
+
+
+class MemoryBroadcastStore:
+    """BroadcastStore без Redis: те же методы над словарями."""
+
+    def __init__(self):
+        self.jobs: Dict[str, BroadcastJob] = {}
+        self.active: Set[str] = set()
+
+    async def save(self, job: BroadcastJob):
+        self.jobs[job.job_id] = BroadcastJob(**vars(job))
+
+    async def get(self, job_id: str) -> Optional[BroadcastJob]:
+        job = self.jobs.get(job_id)
+        return BroadcastJob(**vars(job)) if job is not None else None
+
+    async def set_status(self, job_id: str, status: BroadcastStatus):
+        self.jobs[job_id].status = status
+
+    async def replace_status(
+        self,
+        job_id: str,
+        expected: BroadcastStatus,
+        status: BroadcastStatus
+    ) -> bool:
+        if self.jobs[job_id].status != expected:
+            return False
+        self.jobs[job_id].status = status
+        return True
+
+    async def set_status_message(self, job_id: str, message_id: int):
+        self.jobs[job_id].status_message_id = message_id
+
+    async def checkpoint(self, job_id: str, cursor: int, sent: int, failed: int):
+        job = self.jobs[job_id]
+        job.cursor, job.sent, job.failed = cursor, sent, failed
+
+    async def add_active(self, job_id: str):
+        self.active.add(job_id)
+
+    async def remove_active(self, job_id: str):
+        self.active.discard(job_id)
+
+    async def get_active_ids(self) -> List[str]:
+        return list(self.active)
+
+
+class RecordingBot:
+    def __init__(self, on_send=None):
+        self.received: List[int] = []
+        self.on_send = on_send
+
+    async def send_message(self, chat_id: int, text: str):
+        self.received.append(chat_id)
+        if self.on_send is not None:
+            await self.on_send(chat_id)
+
+
+def test_broadcast_resumes_from_checkpoint(monkeypatch):
+    user_ids = list(range(1, 251))
+
+    def get_user_ids_page(after, limit, *segments):
+        start = 0 if after is None else user_ids.index(after) + 1
+        return user_ids[start:start + limit]
+
+    monkeypatch.setattr(broadcasts.audience, "get_user_ids_page", get_user_ids_page)
+    monkeypatch.setattr(broadcasts.audience, "count_users", lambda *segments: len(user_ids))
+
+    store = MemoryBroadcastStore()
+
+    async def run():
+        # Первый процесс "падает" посреди второй страницы
+        first_bot = RecordingBot()
+        first = BroadcastManager(store, first_bot, page_size=100)
+
+        async def crash(chat_id):
+            if chat_id == 150:
+                first.shutdown()
+
+        first_bot.on_send = crash
+        job = await first.create(text="Новость", photo_file_id=None)
+        await asyncio.gather(*first._tasks.values(), return_exceptions=True)
+
+        interrupted = await store.get(job.job_id)
+        assert interrupted.status == BroadcastStatus.RUNNING
+        assert interrupted.cursor == 100
+
+        # После перезапуска рассылка продолжается с курсора
+        second_bot = RecordingBot()
+        second = BroadcastManager(store, second_bot, page_size=100)
+        await second.resume_all()
+        await asyncio.gather(*second._tasks.values())
+
+        return first_bot.received, second_bot.received, await store.get(job.job_id)
+
+    first_received, second_received, job = asyncio.run(run())
+
+    assert set(first_received) | set(second_received) == set(user_ids)
+    # Повторно уходит не больше одной страницы
+    assert set(first_received) & set(second_received) <= set(range(101, 201))
+    assert sorted(second_received) == list(range(101, 251))
+    assert job.status == BroadcastStatus.FINISHED
+    assert job.sent == 250 and job.failed == 0
+    assert not store.active
+
+
+def test_broadcast_pause_and_cancel(monkeypatch):
+    user_ids = list(range(1, 31))
+
+    def get_user_ids_page(after, limit, *segments):
+        start = 0 if after is None else user_ids.index(after) + 1
+        return user_ids[start:start + limit]
+
+    monkeypatch.setattr(broadcasts.audience, "get_user_ids_page", get_user_ids_page)
+    monkeypatch.setattr(broadcasts.audience, "count_users", lambda *segments: len(user_ids))
+
+    store = MemoryBroadcastStore()
+    bot = RecordingBot()
+    manager = BroadcastManager(store, bot, page_size=10)
+
+    async def run():
+        async def pause_after_first_page(chat_id):
+            if chat_id == 10:
+                await manager.pause(job.job_id)
+
+        bot.on_send = pause_after_first_page
+        job = await manager.create(text="Новость", photo_file_id=None)
+        await asyncio.gather(*manager._tasks.values())
+        paused = await store.get(job.job_id)
+
+        bot.on_send = None
+        await manager.cancel(job.job_id)
+        await manager.resume(job.job_id)
+        await asyncio.gather(*manager._tasks.values())
+        return paused, await store.get(job.job_id)
+
+    paused, cancelled = asyncio.run(run())
+
+    assert paused.status == BroadcastStatus.PAUSED
+    assert paused.cursor == 10 and paused.sent == 10
+    # Отменённую рассылку продолжить нельзя
+    assert cancelled.status == BroadcastStatus.CANCELLED
+    assert bot.received == list(range(1, 11))
+    assert not store.active
+
+
+def test_cancel_before_finish_is_kept(monkeypatch):
+    user_ids = list(range(1, 21))
+    store = MemoryBroadcastStore()
+    bot = RecordingBot()
+    manager = BroadcastManager(store, bot, page_size=10)
+    admin_chat_id = 1000
+    running = {}
+
+    def get_user_ids_page(after, limit, *segments):
+        start = 0 if after is None else user_ids.index(after) + 1
+        page = user_ids[start:start + limit]
+        if not page:
+            # Администратор отменяет рассылку, пока ищется следующая страница
+            asyncio.run_coroutine_threadsafe(
+                manager.cancel(running["job_id"]),
+                running["loop"]
+            ).result()
+        return page
+
+    monkeypatch.setattr(broadcasts.audience, "get_user_ids_page", get_user_ids_page)
+    monkeypatch.setattr(broadcasts.audience, "count_users", lambda *segments: len(user_ids))
+
+    async def run():
+        running["loop"] = asyncio.get_running_loop()
+        job = await manager.create(
+            text="Новость",
+            photo_file_id=None,
+            admin_chat_id=admin_chat_id
+        )
+        running["job_id"] = job.job_id
+        await asyncio.gather(*manager._tasks.values())
+        return await store.get(job.job_id)
+
+    job = asyncio.run(run())
+
+    assert job.status == BroadcastStatus.CANCELLED
+    assert job.sent == 20
+    # Статистика завершённой рассылки не отправляется
+    assert admin_chat_id not in bot.received
+    assert not store.active
+
+
+def test_format_broadcast_progress():
+    job = BroadcastJob(
+        job_id="test",
+        text="Новость",
+        photo_file_id=None,
+        status=BroadcastStatus.RUNNING,
+        total=50000,
+        created_at="01.01.2024 00:00",
+        cursor=1200,
+        sent=1150,
+        failed=50
+    )
+    text = format_broadcast_progress(
+        BroadcastProgress(job=job, throughput=29.5, eta=timedelta(seconds=1654))
+    )
+
+    assert "1200 из 50000" in text
+    assert "29.5" in text
+    assert "0:27:34" in text
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from src import compute_pool as compute_pool_module
+from src.compute_pool import ComputePool
+
+
+def test_timed_out_task_holds_its_slot_until_it_finishes():
+    pool = ComputePool(max_workers=1, max_queue_size=0, task_timeout=0.05)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(time.sleep, 0.5)
+
+        # Поток ещё считает - новая задача ждёт, а не уходит в пул сверх
+        # числа воркеров
+        assert pool._semaphore.locked()
+        assert await pool.run(sum, [1, 2]) == 3
+        assert not pool._semaphore.locked()
+
+    asyncio.run(main())
+
+
+class BrokenExecutor:
+    """Принимает задачи, а падение пула тест вызывает сам."""
+
+    def __init__(self, **kwargs):
+        self.futures = []
+        self.shut_down = False
+
+    def submit(self, func, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait: bool, cancel_futures: bool):
+        self.shut_down = True
+
+    def break_pool(self):
+        for future in self.futures:
+            future.set_exception(BrokenProcessPool("worker died"))
+
+
+def test_broken_pool_is_restarted_once(monkeypatch):
+    executors = []
+
+    def create_executor(**kwargs):
+        executors.append(BrokenExecutor(**kwargs))
+        return executors[-1]
+
+    monkeypatch.setattr(compute_pool_module, "ProcessPoolExecutor", create_executor)
+    pool = ComputePool(max_workers=2, max_queue_size=2, task_timeout=5)
+    pool.start()
+
+    async def main():
+        tasks = [
+            asyncio.create_task(pool.run(sum, [1, 2]))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        executors[0].break_pool()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, BrokenProcessPool) for result in results)
+
+    asyncio.run(main())
+
+    # Опоздавшие задачи не перезапускают уже новый пул
+    assert len(executors) == 2
+    assert executors[0].shut_down and not executors[1].shut_down
+    assert pool._executor is executors[1]
@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.methods import SendMessage
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import async_crud, audience, crud
+from src.database import unit_of_work as units
+from src.database.models import Base, User
+from src.delivery_status import DeliveryStatusMiddleware
+from src.enums import DeliveryStatus
+from src.middlewares.last_seen import LastSeenMiddleware
+
+
+def test_unreachable_chats_are_skipped_until_user_writes(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(units, "Session", session_factory)
+    monkeypatch.setattr(audience, "MainSession", session_factory)
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'database.db'}"
+    )
+    monkeypatch.setattr(
+        async_crud,
+        "AsyncSession",
+        async_sessionmaker(async_engine, expire_on_commit=False)
+    )
+
+    with session_factory() as session:
+        session.execute(
+            insert(User),
+            [
+                {"user_id": user_id, "prediction_utc_minute": 420}
+                for user_id in (1, 2, 3)
+            ]
+        )
+        session.commit()
+
+    errors = {
+        1: TelegramForbiddenError(
+            method=SendMessage(chat_id=1, text=""),
+            message="Forbidden: bot was blocked by the user"
+        ),
+        2: TelegramBadRequest(
+            method=SendMessage(chat_id=2, text=""),
+            message="Bad Request: chat not found"
+        ),
+        3: TelegramBadRequest(
+            method=SendMessage(chat_id=3, text=""),
+            message="Bad Request: message is too long"
+        ),
+    }
+
+    async def make_request(bot, method):
+        raise errors[method.chat_id]
+
+    async def send_all():
+        middleware = DeliveryStatusMiddleware()
+        for user_id in errors:
+            with pytest.raises(type(errors[user_id])):
+                await middleware(
+                    make_request,
+                    None,
+                    SendMessage(chat_id=user_id, text="Прогноз")
+                )
+
+    asyncio.run(send_all())
+
+    assert crud.get_user_delivery_status(1) == DeliveryStatus.BLOCKED
+    assert crud.get_user_delivery_status(2) == DeliveryStatus.CHAT_NOT_FOUND
+    # Прочие ошибки на доступность чата не влияют
+    assert crud.get_user_delivery_status(3) is None
+
+    assert audience.count_users(audience.deliverable()) == 1
+    with session_factory() as session:
+        assert crud.get_user_ids_by_prediction_minutes(session, [420]) == [3]
+
+    # Пользователь разблокировал бота и написал - сразу, даже если
+    # last_seen_at недавно обновлялся
+    last_seen = LastSeenMiddleware()
+    last_seen._updated_at[1] = float("inf")
+
+    async def handler(event, data):
+        return "handled"
+
+    result = asyncio.run(
+        last_seen(
+            handler,
+            None,
+            {"event_from_user": SimpleNamespace(id=1)}
+        )
+    )
+
+    assert result == "handled"
+    assert crud.get_user_delivery_status(1) is None
+    assert audience.count_users(audience.deliverable()) == 2
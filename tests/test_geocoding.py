@@ -0,0 +1,89 @@
+import asyncio
+import json
+import pickle
+import sqlite3
+
+from src import messages
+from src.geocoding import Gazetteer, Geocoder, LocationCache, StaticBackend
+
+
+def test_cache_and_coalescing(tmp_path):
+    backend = StaticBackend(title="Москва, Россия")
+    geocoder = Geocoder(backend, LocationCache(str(tmp_path / "cache.sqlite")))
+
+    async def resolve_many():
+        return await asyncio.gather(
+            *[geocoder.get_location_title_async(55.75, 37.62) for _ in range(10)]
+        )
+
+    assert asyncio.run(resolve_many()) == ["Москва, Россия"] * 10
+    assert backend.calls == 1
+
+    # Кэш переживает перезапуск
+    restarted = Geocoder(backend, LocationCache(str(tmp_path / "cache.sqlite")))
+    assert restarted.get_location_title(55.7501, 37.6201) == "Москва, Россия"
+    assert backend.calls == 1
+
+
+def test_offline_fallback(tmp_path):
+    gazetteer_path = tmp_path / "cities.txt"
+    gazetteer_path.write_text(
+        "524901\tMoscow\tMoscow\tMoskva,Москва\t55.75222\t37.61556"
+        "\tP\tPPLC\tRU\t\t48\t\t\t\t10381222\t\t144\tEurope/Moscow\t2022-12-10\n",
+        encoding="utf-8"
+    )
+    gazetteer = Gazetteer()
+    gazetteer.add_geonames_file(str(gazetteer_path))
+    geocoder = Geocoder(
+        StaticBackend(error=ConnectionError("offline")),
+        LocationCache(str(tmp_path / "cache.sqlite")),
+        gazetteer
+    )
+
+    # Тот же вид, что у Nominatim: город, страна по-русски
+    assert asyncio.run(
+        geocoder.get_location_title_async(55.80, 37.70)
+    ) == "Москва, Россия"
+    assert geocoder.get_location_title(-33.9, 18.4) == messages.ERROR_MESSAGE
+
+
+def test_fallback_from_geonames_cache(tmp_path):
+    # Файл кэша kerykeion: ответы requests-cache в таблице responses
+    cache_path = str(tmp_path / "kerykeion_geonames_cache.sqlite")
+    response = {
+        "_content": json.dumps({
+            "geonames": [{
+                "name": "London",
+                "lat": "51.50853",
+                "lng": "-0.12574",
+                "countryCode": "GB",
+                "alternateNames": [
+                    {"name": "Londres", "lang": "fr"},
+                    {"name": "Лондон", "lang": "ru"},
+                ],
+            }]
+        }).encode(),
+        "url": "http://api.geonames.org/searchJSON?q=London",
+    }
+    with sqlite3.connect(cache_path) as connection:
+        connection.execute("CREATE TABLE responses (key PRIMARY KEY, value)")
+        connection.execute(
+            "INSERT INTO responses VALUES (?, ?)",
+            ("london", pickle.dumps(response))
+        )
+
+    backend = StaticBackend(title="Москва, Москва, Россия")
+    cache = LocationCache(cache_path)
+    online = Geocoder(backend, cache, Gazetteer())
+    online.get_location_title(55.75, 37.62)
+
+    gazetteer = Gazetteer()
+    gazetteer.add_cached_locations(cache)
+    backend.error = ConnectionError("offline")
+    offline = Geocoder(backend, cache, gazetteer)
+
+    assert offline.get_location_title(51.52, -0.1) == "Лондон, Великобритания"
+    # Соседняя ячейка - по уже найденному названию
+    assert offline.get_location_title(55.9, 37.8) == "Москва, Москва, Россия"
+    # Новые названия пополняют справочник без перезапуска
+    assert online.gazetteer.nearest(55.9, 37.8) == "Москва, Москва, Россия"
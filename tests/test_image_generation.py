@@ -1,10 +1,23 @@
+import asyncio
 import os
+import pickle
+import time
+
 import pytest
 
 from unittest.mock import Mock
 
 from src import config
-from src.image_processing.utils import get_image_with_astrodata
+from src.enums import MoonPhase, ZodiacSign
+from src.image_processing import assets
+from src.image_processing.generate_images import (
+    generate_image_with_astrodata,
+    preload_assets
+)
+from src.image_processing.utils import (
+    get_astrodata_image_inputs,
+    get_image_with_astrodata
+)
 from src.astro_engine.models import Location
 
 
@@ -14,6 +27,27 @@ DATETIME_FORMAT = config.get("database.datetime_format")
 DATE_FORMAT = config.get("database.date_format")
 TIME_FORMAT = config.get("database.time_format")
 
+# Замер отрисовки запускается только по запросу:
+# ASTROBOT_BENCHMARK_RENDERS=10 pytest tests/test_image_generation.py
+BENCHMARK_RENDERS = os.getenv("ASTROBOT_BENCHMARK_RENDERS")
+
+RENDER_INPUTS = dict(
+    date="25.01.2026",
+    start_sign=ZodiacSign.ARIES,
+    change_time="21:06",
+    end_sign=ZodiacSign.TAURUS,
+    moon_phase=MoonPhase.FULL_MOON,
+    moon_phase_caption="7 Лунный день",
+    blank_moon_caption="Холостая луна 00:37 - 21:06"
+)
+ASSET_CACHES = [
+    assets.get_background,
+    assets.get_moon_sign_image,
+    assets.get_moon_phase_image,
+    assets.get_text_size,
+    assets.get_text_mask
+]
+
 MOSKOW_LOCATION = Location(longitude=30.5238, latitude=50.45466)
 HOURS_TIMEZONE_OFFSET = 3
 
@@ -40,3 +74,61 @@ async def test_get_image_with_astrodata(user_mock):
         image_file.write(image_bytes)
 
     assert os.path.exists(image_path)
+
+
+def test_astrodata_image_inputs(user_mock):
+    inputs = asyncio.run(get_astrodata_image_inputs(user_mock))
+
+    # Отрисовка уходит в пул процессов - входные данные должны сериализоваться
+    assert pickle.loads(pickle.dumps(inputs)) == inputs
+    assert isinstance(inputs["moon_phase"], MoonPhase)
+    assert inputs["blank_moon_caption"].startswith("Холостая луна")
+
+
+def test_render_reuses_cached_assets():
+    for cache in ASSET_CACHES:
+        cache.cache_clear()
+
+    first_image = generate_image_with_astrodata(**RENDER_INPUTS)
+    misses = [cache.cache_info().misses for cache in ASSET_CACHES]
+    assert all(misses)
+
+    # Повторная отрисовка не загружает и не рисует заново ничего
+    second_image = generate_image_with_astrodata(**RENDER_INPUTS)
+    assert [cache.cache_info().misses for cache in ASSET_CACHES] == misses
+    assert all(cache.cache_info().hits for cache in ASSET_CACHES)
+    assert second_image == first_image
+
+    # Картинки берутся из кэша как есть, отрисовка рисует на копии фона
+    assert assets.get_moon_sign_image(ZodiacSign.ARIES) is (
+        assets.get_moon_sign_image(ZodiacSign.ARIES)
+    )
+    assert generate_image_with_astrodata(**RENDER_INPUTS) == first_image
+
+
+@pytest.mark.skipif(
+    BENCHMARK_RENDERS is None,
+    reason="ASTROBOT_BENCHMARK_RENDERS is not set"
+)
+def test_render_benchmark():
+    renders = int(BENCHMARK_RENDERS)
+
+    cold_time = 0.0
+    for _ in range(renders):
+        for cache in ASSET_CACHES:
+            cache.cache_clear()
+        started_at = time.perf_counter()
+        cold_image = generate_image_with_astrodata(**RENDER_INPUTS)
+        cold_time += time.perf_counter() - started_at
+
+    preload_assets()
+    started_at = time.perf_counter()
+    for _ in range(renders):
+        warm_image = generate_image_with_astrodata(**RENDER_INPUTS)
+    warm_time = time.perf_counter() - started_at
+
+    assert warm_image == cold_image
+    assert warm_time < cold_time, (
+        f"per render: cold {cold_time / renders * 1000:.1f} ms, "
+        f"preloaded {warm_time / renders * 1000:.1f} ms"
+    )
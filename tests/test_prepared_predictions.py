@@ -0,0 +1,174 @@
+import asyncio
+
+from datetime import date, datetime, timedelta
+from unittest.mock import Mock
+
+from redis.asyncio import Redis
+
+import src.routers  # noqa: F401  (порядок импорта как в main.py)
+
+from sqlalchemy import create_engine
+
+from src import scheduler as scheduler_module
+from src.astro_engine.models import Location
+from src.astro_engine.predictions import get_natal_chart
+from src.database.models import User
+from src.prepared_predictions import (
+    PreparedPrediction,
+    PreparedPredictionStore,
+    get_user_fingerprint
+)
+from src.routers.user.prediction.text_formatting import (
+    filtered_and_formatted_prediction,
+    filtered_and_formatted_predictions,
+    get_prediction_user
+)
+from src.scheduler import (
+    EveryDayPredictionScheduler,
+    get_next_prediction_datetime
+)
+
+
+def get_user_mock(prediction_time: str, timezone_offset: int):
+    user = Mock()
+    user.name = "Тест"
+    user.subscription_end_date = "31.12.2099 00:00"
+    user.timezone_offset = timezone_offset
+    user.every_day_prediction_time = prediction_time
+    user.birth_datetime = "19.10.2005 09:35"
+    user.current_location = Location(longitude=37.62, latitude=55.75)
+    user.birth_location = Location(longitude=30.52, latitude=50.45)
+    return user
+
+
+def test_next_prediction_datetime():
+    now = datetime(2026, 1, 10, 5, 30)
+
+    # 07:00 по Москве - 04:00 UTC уже прошло, следующая отправка завтра
+    user = get_user_mock("07:00", 3)
+    assert get_next_prediction_datetime(user, now) == datetime(2026, 1, 11, 4)
+
+    # 13:00 по Новосибирску - 06:00 UTC сегодня
+    user = get_user_mock("13:00", 7)
+    assert get_next_prediction_datetime(user, now) == datetime(2026, 1, 10, 6)
+
+
+def test_fingerprint_changes_with_location():
+    user = get_user_mock("07:00", 3)
+    fingerprint = get_user_fingerprint(user)
+
+    user.current_location = Location(longitude=82.93, latitude=55.03)
+    assert get_user_fingerprint(user) != fingerprint
+
+
+def test_store_without_redis():
+    # Недоступный Redis - прогноз считается при отправке, а не падает
+    store = PreparedPredictionStore(
+        Redis.from_url("redis://127.0.0.1:1", socket_connect_timeout=1),
+        ttl=timedelta(hours=36)
+    )
+
+    async def round_trip():
+        await store.set(
+            1,
+            date(2026, 1, 10),
+            PreparedPrediction(fingerprint="", photo_key="key", text="text")
+        )
+        return await store.get(1, date(2026, 1, 10))
+
+    assert asyncio.run(round_trip()) is None
+
+
+def test_prediction_utc_minute():
+    user = User(every_day_prediction_time="07:00", timezone_offset=3)
+    assert user.prediction_utc_minute == 4 * 60
+
+    # Смена пояса пересчитывает минуту, в том числе через полночь
+    user.timezone_offset = 10
+    assert user.prediction_utc_minute == 21 * 60
+
+    user.every_day_prediction_time = "8:30"
+    assert user.prediction_utc_minute == 22 * 60 + 30
+
+
+def test_batch_prediction_texts_match_single():
+    target_date = date(2026, 1, 10)
+    users = []
+    for index in range(5):
+        user = get_user_mock("07:00", 3)
+        user.birth_datetime = f"{10 + index}.0{1 + index}.199{index} 12:00"
+        users.append(get_prediction_user(user))
+    names = [f"Имя {index}" for index in range(len(users))]
+    natal_charts = [get_natal_chart(user) for user in users]
+
+    assert filtered_and_formatted_predictions(
+        users,
+        names,
+        target_date,
+        natal_charts
+    ) == [
+        filtered_and_formatted_prediction(user, name, target_date, natal_chart)
+        for user, name, natal_chart in zip(users, names, natal_charts)
+    ]
+
+
+def test_prerender_computes_texts_in_batches(tmp_path, monkeypatch):
+    today, tomorrow = date(2026, 1, 10), date(2026, 1, 11)
+    users = []
+    for user_id in range(1, 8):
+        user = get_user_mock("07:00", 5 if user_id in (5, 6) else 3)
+        user.user_id = user_id
+        users.append(user)
+    # Подписка кончится до отправки - текст не нужен
+    users[-1].subscription_end_date = "01.01.2026 00:00"
+
+    delivery = datetime(2026, 1, 10, 4)
+    groups = {
+        (today, 3, 37.62, 55.75): [(user, delivery) for user in users[:4]],
+        (today, 5, 60.6, 56.8): [(user, delivery) for user in users[4:6]],
+        (tomorrow, 3, 37.62, 55.75): [(users[6], delivery)],
+    }
+
+    batches = []
+    prepared = {}
+
+    async def calculate_prediction_texts(target_date, batch_users):
+        batches.append((target_date, [user.user_id for user in batch_users]))
+        return [f"{target_date} {user.user_id}" for user in batch_users]
+
+    async def prerender_photo(self, target_date, user):
+        return f"photo {target_date} {user.timezone_offset}"
+
+    async def set_prepared(user_id, target_date, prediction):
+        prepared[user_id] = prediction
+
+    monkeypatch.setattr(
+        scheduler_module,
+        "calculate_prediction_texts",
+        calculate_prediction_texts
+    )
+    monkeypatch.setattr(
+        EveryDayPredictionScheduler,
+        "_prerender_photo",
+        prerender_photo
+    )
+    monkeypatch.setattr(scheduler_module.prepared_predictions, "set", set_prepared)
+    monkeypatch.setattr(scheduler_module, "PRERENDER_TEXTS_BATCH_SIZE", 4)
+
+    async def run():
+        scheduler = EveryDayPredictionScheduler(
+            jobstore_engine=create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+        )
+        await scheduler._prerender_page(groups)
+
+    asyncio.run(run())
+
+    # Тексты на дату считаются пакетами поверх групп картинок
+    assert sorted(batches) == [(today, [1, 2, 3, 4]), (today, [5, 6])]
+    assert prepared[5] == PreparedPrediction(
+        fingerprint=get_user_fingerprint(users[4]),
+        photo_key="photo 2026-01-10 5",
+        text="2026-01-10 5"
+    )
+    assert prepared[7].photo_key == "photo 2026-01-11 3"
+    assert prepared[7].text is None
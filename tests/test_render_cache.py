@@ -0,0 +1,38 @@
+import os
+
+from src.enums import MoonPhase, ZodiacSign
+from src.image_processing.render_cache import RenderCache, get_render_key
+
+
+def test_render_key_depends_only_on_inputs():
+    inputs = dict(
+        date="25.01.2026",
+        start_sign=ZodiacSign.ARIES,
+        change_time=None,
+        end_sign=None,
+        moon_phase=MoonPhase.FULL_MOON,
+        moon_phase_caption="caption",
+        blank_moon_caption="Холостая луна 00:37 - 21:06"
+    )
+
+    assert get_render_key(**inputs) == get_render_key(**dict(reversed(inputs.items())))
+    assert get_render_key(**inputs) != get_render_key(**{**inputs, "change_time": "12:00"})
+
+
+def test_render_cache_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path), max_files=10)
+
+    for index in range(10):
+        cache.set(f"key{index}", b"jpeg")
+        # Старые файлы - раньше по времени доступа
+        os.utime(tmp_path / f"key{index}.jpg", (index, index))
+
+    assert cache.get("key0") == b"jpeg"  # обновляет время доступа
+    cache.set("key10", b"jpeg")
+
+    # Переполнение вытесняет с запасом до 90% - два самых старых файла
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        f"key{index}.jpg" for index in [0, *range(3, 11)]
+    )
+    assert cache.get("key1") is None
+    assert cache.get("key10") == b"jpeg"
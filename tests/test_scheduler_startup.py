@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import sessionmaker
+
+import src.routers  # noqa: F401  (порядок импорта как в main.py)
+
+from src import config
+from src.database.models import Base, User
+from src.scheduler import REMINDERS_JOBSTORE, EveryDayPredictionScheduler
+
+
+DATETIME_FORMAT = config.get("database.datetime_format")
+
+# Замер времени старта запускается только по запросу:
+# ASTROBOT_BENCHMARK_USERS=10000,100000 pytest tests/test_scheduler_startup.py
+BENCHMARK_USERS = os.getenv("ASTROBOT_BENCHMARK_USERS")
+USERS_COUNT = 1000
+# Доля пользователей с действующей подпиской
+ACTIVE_SHARE = 0.3
+
+
+def fill_users(session, users_count: int):
+    now = datetime.utcnow()
+    active_end = (now + timedelta(days=10)).strftime(DATETIME_FORMAT)
+    expired_end = (now - timedelta(days=10)).strftime(DATETIME_FORMAT)
+
+    session.execute(
+        insert(User),
+        [
+            {
+                "user_id": user_id,
+                "timezone_offset": 3,
+                "every_day_prediction_time": "07:00",
+                "subscription_end_date": (
+                    active_end
+                    if user_id < users_count * ACTIVE_SHARE
+                    else expired_end
+                ),
+            }
+            for user_id in range(users_count)
+        ]
+    )
+    session.commit()
+
+
+def boot(engine, session_factory) -> tuple[float, int]:
+    """Старт планировщика со сверкой напоминаний, как в main.on_startup."""
+    async def run():
+        scheduler = EveryDayPredictionScheduler(jobstore_engine=engine)
+        started_at = time.perf_counter()
+        scheduler.start()
+        with session_factory() as session:
+            scheduler.reconcile_reminders(session)
+        elapsed = time.perf_counter() - started_at
+
+        jobs_count = len(scheduler.get_jobs(REMINDERS_JOBSTORE))
+        scheduler.shutdown(wait=False)
+        return elapsed, jobs_count
+
+    return asyncio.run(run())
+
+
+def run_boots(tmp_path, users_count: int) -> tuple[float, float, float]:
+    """
+    Первый старт, перезапуск без изменений и перезапуск после продления
+    подписки 1% пользователей. Возвращает время сверки каждого старта.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    with session_factory() as session:
+        fill_users(session, users_count)
+
+    active_count = int(users_count * ACTIVE_SHARE)
+
+    first_boot, jobs_count = boot(engine, session_factory)
+    assert jobs_count == 2 * active_count
+
+    # Перезапуск без изменений - задачи уже в БД
+    restart, jobs_count = boot(engine, session_factory)
+    assert jobs_count == 2 * active_count
+
+    # 1% пользователей продлили подписку
+    changed_count = users_count // 100
+    with session_factory() as session:
+        session.execute(
+            update(User).where(User.user_id < changed_count).values(
+                subscription_end_date=(
+                    datetime.utcnow() + timedelta(days=40)
+                ).strftime(DATETIME_FORMAT)
+            )
+        )
+        session.commit()
+    incremental, jobs_count = boot(engine, session_factory)
+    assert jobs_count == 2 * active_count
+
+    return first_boot, restart, incremental
+
+
+def test_startup_reconciles_reminders(tmp_path):
+    run_boots(tmp_path, USERS_COUNT)
+
+
+@pytest.mark.skipif(
+    BENCHMARK_USERS is None,
+    reason="ASTROBOT_BENCHMARK_USERS is not set"
+)
+@pytest.mark.parametrize(
+    "users_count",
+    [int(users_count) for users_count in (BENCHMARK_USERS or "0").split(",")]
+)
+def test_startup_benchmark(tmp_path, users_count):
+    first_boot, restart, incremental = run_boots(tmp_path, users_count)
+
+    # Перезапуск сверяет только изменившиеся подписки
+    assert restart < first_boot, (
+        f"{users_count} users: first boot {first_boot:.2f} s, "
+        f"restart {restart:.2f} s, restart after 1% changes "
+        f"{incremental:.2f} s"
+    )
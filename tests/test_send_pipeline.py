@@ -0,0 +1,118 @@
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetMe, SendMessage
+
+from src import send_pipeline
+from src.enums import SendPriority
+from src.send_pipeline import SendLimiter, SendPipelineMiddleware
+
+
+MIN_SLEEP = 1e-6
+
+
+class FakeClock:
+    """
+    Время конвейера без настоящих пауз: sleep сдвигает часы и только
+    уступает цикл событий, поэтому результат не зависит от загрузки
+    машины.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self._sleep = asyncio.sleep
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float, result=None):
+        # Настоящая пауза всегда хоть немного сдвигает время
+        self.now += max(delay, MIN_SLEEP)
+        await self._sleep(0)
+        return result
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(
+        send_pipeline,
+        "time",
+        SimpleNamespace(monotonic=clock.monotonic)
+    )
+    monkeypatch.setattr(
+        send_pipeline,
+        "asyncio",
+        SimpleNamespace(**{**vars(asyncio), "sleep": clock.sleep})
+    )
+    return clock
+
+
+def test_global_rate(clock):
+    limiter = SendLimiter(rate=50, private_chat_interval=0)
+
+    async def send_many():
+        started_at = clock.now
+        await asyncio.gather(*[limiter.acquire(user_id) for user_id in range(100)])
+        return clock.now - started_at
+
+    # 50 сразу из полного ведра, ещё 50 - за секунду
+    assert asyncio.run(send_many()) == pytest.approx(1.0, abs=0.05)
+
+
+def test_priorities_and_chat_interval(clock):
+    limiter = SendLimiter(rate=10, private_chat_interval=0.5)
+    order = []
+
+    async def send(name: str, chat_id: int, priority: SendPriority):
+        await limiter.acquire(chat_id, priority)
+        order.append((name, clock.now))
+
+    async def run():
+        limiter.backoff(0.2)  # пустое ведро - все встают в очередь
+        await asyncio.gather(
+            send("broadcast", 1, SendPriority.BROADCAST),
+            send("scheduled", 2, SendPriority.SCHEDULED),
+            send("interactive", 3, SendPriority.INTERACTIVE),
+            send("interactive again", 3, SendPriority.INTERACTIVE),
+        )
+        # Прогноз в чат после ответа - не раньше интервала
+        await send("scheduled after reply", 3, SendPriority.SCHEDULED)
+        await send("scheduled again", 3, SendPriority.SCHEDULED)
+
+    asyncio.run(run())
+    names = [name for name, _ in order]
+    assert names[:2] == ["interactive", "interactive again"]
+    assert names[2:4] == ["scheduled", "broadcast"]
+
+    sent_at = dict(order)
+    # Ответы пользователю интервала чата не ждут, только ведро
+    assert sent_at["interactive again"] - sent_at["interactive"] < 0.5
+    assert sent_at["scheduled after reply"] - sent_at["interactive again"] >= 0.5
+    assert sent_at["scheduled again"] - sent_at["scheduled after reply"] >= 0.5
+
+
+def test_retry_after(clock):
+    limiter = SendLimiter(rate=30)
+    middleware = SendPipelineMiddleware(limiter, max_retries=2)
+    calls = []
+
+    async def make_request(bot, method):
+        calls.append(clock.now)
+        if len(calls) == 1:
+            raise TelegramRetryAfter(method, "Flood control exceeded", 1)
+        return "ok"
+
+    method = SendMessage(chat_id=1, text="text")
+    assert asyncio.run(middleware(make_request, None, method)) == "ok"
+
+    # Повтор - после паузы retry_after, скорость снижена
+    assert calls[1] - calls[0] >= 1
+    assert limiter.rate < 30
+
+    # Запросы без отправки сообщений не ограничиваются
+    assert asyncio.run(middleware(make_request, None, GetMe())) == "ok"
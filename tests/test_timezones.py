@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from src.timezones import timezone_service
+
+
+def test_offset_at_instant():
+    # Москва без перехода на летнее время
+    assert timezone_service.get_offset(55.75, 37.62) == 3
+    # Нью-Йорк: зимнее и летнее время
+    assert timezone_service.get_offset(40.71, -74.0, datetime(2026, 1, 15)) == -5
+    assert timezone_service.get_offset(40.71, -74.0, datetime(2026, 7, 15)) == -4
+    assert timezone_service.get_timezone_name(40.71, -74.0) == "America/New_York"
+
+
+def test_repeated_lookup_hits_cache():
+    timezone_service._get_cell_timezone_name.cache_clear()
+
+    for _ in range(3):
+        assert timezone_service.get_offset(47.98, 37.81) == 3
+    # Соседняя точка в той же ячейке H3
+    timezone_service.get_offset(47.98001, 37.81001)
+
+    cache_info = timezone_service._get_cell_timezone_name.cache_info()
+    assert cache_info.misses == 1
+    assert cache_info.hits == 3
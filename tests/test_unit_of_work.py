@@ -0,0 +1,199 @@
+import asyncio
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from aiogram.types import Update
+from sqlalchemy import create_engine, event, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+import src.routers  # noqa: F401  (порядок импорта как в main.py)
+
+from src.database import crud
+from src.database import unit_of_work as units
+from src.database.models import Base, Location, Promocode, User
+from src.middlewares.session_middleware import SessionMiddleware
+from src.scheduler import EveryDayPredictionScheduler
+
+
+def create_database(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(units, "Session", session_factory)
+    # Счётчик висит на основном движке, тестовому нужен свой
+    event.listen(engine, "before_cursor_execute", units._count_statement)
+
+    with session_factory() as session:
+        session.execute(
+            insert(Location),
+            [{"id": 1, "longitude": 37.6, "latitude": 55.7}]
+        )
+        session.execute(
+            insert(User),
+            [
+                {
+                    "user_id": user_id,
+                    "name": f"user {user_id}",
+                    "birth_location_id": 1,
+                    "current_location_id": 1,
+                }
+                for user_id in (1, 2)
+            ]
+        )
+        session.commit()
+
+    return session_factory
+
+
+def test_unit_of_work_shares_session_and_counts_statements(
+    tmp_path,
+    monkeypatch
+):
+    session_factory = create_database(tmp_path, monkeypatch)
+
+    with units.unit_of_work("test") as session:
+        unit = units.current_unit()
+        user = crud.get_user(1)
+        # Повторное чтение - из карты идентичности, местоположения уже
+        # подгружены тем же запросом
+        assert crud.get_user(1, session) is user
+        assert user.current_location.latitude == 55.7
+        assert unit.statements == 1
+
+        user.name = "renamed"
+
+    assert unit.closed
+    assert units.current_session() is None
+    with session_factory() as session:
+        assert session.get(User, 1).name == "renamed"
+
+    with pytest.raises(RuntimeError):
+        with units.unit_of_work("test"):
+            crud.get_user(2).name = "lost"
+            # Запись crud внутри единицы не фиксируется сама
+            crud.update_user(2, gender="lost")
+            raise RuntimeError
+
+    with session_factory() as session:
+        user = session.get(User, 2)
+        assert user.name == "user 2"
+        assert user.gender is None
+
+    # Вне единицы пользователь отдаётся с местоположениями
+    assert crud.get_user(2).birth_location.longitude == 37.6
+
+
+def test_session_middleware_opens_unit_per_update(tmp_path, monkeypatch):
+    create_database(tmp_path, monkeypatch)
+    middleware = SessionMiddleware()
+    background_sessions = []
+
+    async def background():
+        await asyncio.sleep(0)
+        background_sessions.append(units.current_session())
+
+    async def handler(event, data):
+        assert units.current_session() is data["session"]
+        crud.update_user(1, name=f"update {event.update_id}")
+        # Поток не получает сессию обновления
+        assert await asyncio.to_thread(units.current_session) is None
+        return asyncio.create_task(background())
+
+    async def main():
+        task = await middleware(handler, Update(update_id=7), {})
+        await task
+
+    asyncio.run(main())
+
+    # Задача, пережившая обновление, закрытую сессию не использует
+    assert background_sessions == [None]
+    assert crud.get_user(1).name == "update 7"
+
+
+def test_failed_write_rolls_back_whole_unit(tmp_path, monkeypatch):
+    session_factory = create_database(tmp_path, monkeypatch)
+    with session_factory() as session:
+        session.add(Promocode(promocode="taken"))
+        session.commit()
+
+    with units.unit_of_work("test"):
+        assert crud.update_user(1, name="lost")
+        # Повторный просмотр не ошибка и единицу не откатывает
+        crud.add_viewed_prediction(1, "10.01.2026")
+        crud.add_viewed_prediction(1, "10.01.2026")
+        assert not units.current_unit().failed
+
+        # Хендлер перехватил ошибку записи, но единица всё равно
+        # откатывается целиком
+        with pytest.raises(IntegrityError):
+            crud.add_promocode(Promocode(promocode="taken"))
+
+    with session_factory() as session:
+        assert session.get(User, 1).name == "user 1"
+    assert crud.get_viewed_predictions_by_user(1) == []
+
+
+def test_after_commit_runs_outside_committed_unit(tmp_path, monkeypatch):
+    create_database(tmp_path, monkeypatch)
+    calls = []
+
+    def callback():
+        # Запись единицы уже видна другим соединениям
+        calls.append((units.current_session(), crud.get_user(1).name))
+
+    with units.unit_of_work("test"):
+        crud.update_user(1, name="committed")
+        units.after_commit(callback)
+        assert calls == []
+
+    assert calls == [(None, "committed")]
+
+    with pytest.raises(RuntimeError):
+        with units.unit_of_work("test"):
+            units.after_commit(callback)
+            raise RuntimeError
+
+    # Вне единицы - сразу
+    units.after_commit(callback)
+    assert calls == [(None, "committed")] * 2
+
+
+def test_dispatch_opens_unit_per_send(tmp_path, monkeypatch):
+    session_factory = create_database(tmp_path, monkeypatch)
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    with session_factory() as session:
+        session.execute(
+            update(User).values(
+                prediction_utc_minute=now.hour * 60 + now.minute
+            )
+        )
+        session.commit()
+
+    sends = {}
+
+    async def send_message(self, user_id):
+        sends[user_id] = units.current_session()
+        # Отправки идут вперемешку, записи каждой - в её единице
+        await asyncio.sleep(0)
+        crud.add_viewed_prediction(user_id, "10.01.2026")
+
+    monkeypatch.setattr(EveryDayPredictionScheduler, "send_message", send_message)
+
+    async def run():
+        scheduler = EveryDayPredictionScheduler(
+            jobstore_engine=create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+        )
+        # Догоняет и минуту, начавшуюся во время теста
+        scheduler._last_dispatched_minute = now - timedelta(minutes=2)
+        await scheduler.dispatch_predictions()
+
+    asyncio.run(run())
+
+    assert sorted(sends) == [1, 2]
+    assert None not in sends.values()
+    assert sends[1] is not sends[2]
+    for user_id in (1, 2):
+        assert len(crud.get_viewed_predictions_by_user(user_id)) == 1